@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency and throughput benchmark for FabricDataAgentClient.
+
+Runs ask(), get_run_details() and get_raw_run_response() against the local
+fake server (fake_fabric_server.py) at several concurrency levels and reports
+p50/p95/p99 latency, throughput and errors per method (and, with --phases,
+per client phase). Save a run with --save and pass it to --compare later to
+catch regressions offline; the script exits with status 1 when a p95 grew by
+more than --max-regression. No Fabric tenant or network access is needed.
+
+Usage:
+    python benchmark_client_latency.py --concurrency 1 4 16 --requests 64 --run-time 0.3
+    python benchmark_client_latency.py --save baseline.json
+    python benchmark_client_latency.py --compare baseline.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fabric_data_agent_client import FabricAgentError, FabricDataAgentClient, RateLimitPolicy, TokenBroker
+from fake_fabric_server import FakeCredential, FakeFabricServer, FakeServerConfig
+
+QUESTION = "Who are the top customers by sales?"
+METHODS = ["ask", "get_run_details", "get_raw_run_response"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def is_error(result) -> bool:
+    # ask() raises on failures and timeouts, the detail calls report them in their dict
+    if isinstance(result, dict):
+        return "error" in result or result.get("run_timeout") is not None
+    return False
+
+
+def measure(client: FabricDataAgentClient, method: str, concurrency: int, requests: int, timeout: int) -> dict:
+    """
+    Call one client method `requests` times with `concurrency` callers in flight.
+    """
+    call = getattr(client, method)
+
+    def timed_call(index):
+        start = time.perf_counter()
+        try:
+            # Distinct questions, so concurrent ask() calls are not coalesced into one run
+            failed = is_error(call(f"{QUESTION} ({index})", timeout=timeout))
+        except FabricAgentError:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed_call, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        "method": method,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(1 for _, failed in outcomes if failed),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput": requests / wall
+    }
+
+
+def compare(results: list, baseline_path: str, max_regression: float) -> bool:
+    """
+    Print p95 changes against a saved run; return False if any grew beyond max_regression.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(entry["method"], entry["concurrency"]): entry for entry in json.load(f)["results"]}
+
+    ok = True
+    print(f"\n{'method':<24}{'conc':>6}{'base p95':>12}{'p95':>10}{'change':>9}")
+    for result in results:
+        base = baseline.get((result["method"], result["concurrency"]))
+        if base is None:
+            continue
+        change = result["p95"] / base["p95"] - 1
+        flag = ""
+        if change > max_regression:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{result['method']:<24}{result['concurrency']:>6}{base['p95'] * 1000:>10.1f}ms"
+              f"{result['p95'] * 1000:>8.1f}ms{change:>+8.0%}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark client latency against a local fake Fabric server")
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="callers in flight")
+    parser.add_argument("--requests", type=int, default=32, help="calls per method and concurrency level")
+    parser.add_argument("--timeout", type=int, default=60, help="per-call timeout in seconds")
+    parser.add_argument("--queue-time", type=float, default=0.05, help="seconds a run stays queued")
+    parser.add_argument("--run-time", type=float, default=0.3, help="seconds a run stays in_progress")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--capacity-rps", type=float, help="requests per second the fake capacity serves before 429s")
+    parser.add_argument("--rate-limit", type=float, help="pace the client at this many requests per second")
+    parser.add_argument("--adaptive-concurrency", action="store_true", help="pace the client with the AIMD concurrency limit")
+    parser.add_argument("--run-failure-rate", type=float, default=0.0, help="share of runs that fail")
+    parser.add_argument("--rows", type=int, default=100, help="rows per tool output")
+    parser.add_argument("--steps", type=int, default=2, help="tool call steps per run")
+    parser.add_argument("--phases", action="store_true", help="also print where the time went, per client phase")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="fail when a p95 grew by more than this fraction over --compare")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(queue_time=args.queue_time, run_time=args.run_time, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, capacity_rps=args.capacity_rps,
+                              run_failure_rate=args.run_failure_rate, rows=args.rows, steps=args.steps)
+    results = []
+
+    # Client-side pacing is opt-in, like in the client
+    rate_limit = None
+    if args.rate_limit or args.adaptive_concurrency:
+        rate_limit = RateLimitPolicy(requests_per_second=args.rate_limit or None,
+                                     adaptive_concurrency=args.adaptive_concurrency)
+
+    with FakeFabricServer(config) as server:
+        client = FabricDataAgentClient(
+            tenant_id="local",
+            data_agent_url=server.data_agent_url,
+            token_broker=TokenBroker(FakeCredential(), background_refresh=False),
+            rate_limit=rate_limit
+        )
+        client.ask("warm up")  # assistant creation and connection setup
+
+        print(f"{'method':<24}{'conc':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>9}{'errors':>8}")
+        for method in args.methods:
+            for concurrency in args.concurrency:
+                result = measure(client, method, concurrency, args.requests, args.timeout)
+                results.append(result)
+                print(f"{method:<24}{concurrency:>6}{result['p50'] * 1000:>8.1f}ms{result['p95'] * 1000:>8.1f}ms"
+                      f"{result['p99'] * 1000:>8.1f}ms{result['throughput']:>9.1f}{result['errors']:>8}")
+
+        if args.phases:
+            print(f"\n{'phase':<24}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}")
+            for name, stats in client.get_phase_stats().items():
+                print(f"{name:<24}{stats['count']:>8}{stats['mean'] * 1000:>8.1f}ms"
+                      f"{stats['p50'] * 1000:>8.1f}ms{stats['p95'] * 1000:>8.1f}ms")
+
+        client.close()
+        print(f"\nServer handled {server.state.request_count} requests "
+              f"({server.state.injected_errors} injected errors, {server.state.throttled_requests} throttled)")
+        if client.capacity_limiter is not None:
+            print("Client limiter: " + ", ".join(f"{key}={value}" for key, value in client.capacity_limiter.stats().items()
+                                                 if key != "endpoint"))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Results saved to {args.save}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        print(f"p95 latency regressed by more than {args.max_regression:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
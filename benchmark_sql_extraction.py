@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for SQL and data extraction from run steps.
+
+Compares the previous two-pass flow used by get_run_details() (per-tool-call
+SQL and data extraction followed by a regex pass over every step) with the
+single-pass _analyze_run_steps() on large synthetic tool outputs. The
+previous flow is kept here, it is no longer part of the client. No Fabric
+tenant or network access is needed.
+
+Usage:
+    python benchmark_sql_extraction.py --rows 20000 --steps 4 --repeat 5
+"""
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+from fabric_data_agent_client import FabricDataAgentClient
+
+
+def build_steps(rows: int, steps: int, with_sql: bool) -> list:
+    """
+    Build run steps shaped like the OpenAI SDK objects, each with one large tool output.
+    """
+    records = [
+        {"CustomerKey": i, "Customer": f"Customer {i}", "City": f"City {i % 97}", "TotalSales": round(i * 1.37, 2)}
+        for i in range(rows)
+    ]
+    sql = "SELECT TOP 10 Customer, City, SUM(Sales) AS TotalSales FROM dbo.FactSales GROUP BY Customer, City"
+    step_list = []
+    for _ in range(steps):
+        arguments = json.dumps({"sql": sql} if with_sql else {"question": "top customers"})
+        output = json.dumps(records)
+        tool_call = SimpleNamespace(
+            id="call_1",
+            type="function",
+            function=SimpleNamespace(name="query_lakehouse", arguments=arguments, output=output),
+            output=output
+        )
+        step_list.append(SimpleNamespace(step_details=SimpleNamespace(type="tool_calls", tool_calls=[tool_call])))
+    return step_list
+
+
+def legacy_extract_structured_data_from_output(client: FabricDataAgentClient, tool_call) -> list:
+    """
+    Parse a tool call output again to format its data preview.
+    """
+    if not getattr(tool_call, 'output', None):
+        return []
+    output_str = str(tool_call.output)
+    try:
+        return client._format_parsed_output(json.loads(output_str))
+    except json.JSONDecodeError:
+        return client._extract_data_preview(output_str)
+
+
+def legacy_extract_sql_queries(client: FabricDataAgentClient, steps) -> list:
+    """
+    The regex pass over the arguments, output and details of every step.
+    """
+    sql_queries = []
+
+    for step in steps:
+        if hasattr(step, 'step_details') and step.step_details:
+            step_details = step.step_details
+            if hasattr(step_details, 'tool_calls') and step_details.tool_calls:
+                for tool_call in step_details.tool_calls:
+                    if hasattr(tool_call, 'function') and tool_call.function:
+                        if hasattr(tool_call.function, 'arguments'):
+                            sql_queries.extend(client._find_sql_in_text(str(tool_call.function.arguments)))
+                    if hasattr(tool_call, 'output') and tool_call.output:
+                        sql_queries.extend(client._find_sql_in_text(str(tool_call.output)))
+            sql_queries.extend(client._find_sql_in_text(str(step_details)))
+
+    return list(dict.fromkeys(sql_queries))
+
+
+def legacy_extract_sql_queries_with_data(client: FabricDataAgentClient, steps) -> dict:
+    """
+    The per-tool-call extraction used before the single-pass extractor: arguments,
+    SQL and data are extracted by three helpers that each stringify and parse
+    the output again.
+    """
+    sql_queries = []
+    data_previews = []
+    data_retrieval_query = None
+    data_retrieval_query_index = None
+
+    for step in steps:
+        if hasattr(step, 'step_details') and step.step_details:
+            step_details = step.step_details
+            if hasattr(step_details, 'tool_calls') and step_details.tool_calls:
+                for tool_call in step_details.tool_calls:
+                    sql_from_args = client._extract_sql_from_function_args(tool_call)
+                    if sql_from_args:
+                        sql_queries.extend(sql_from_args)
+                    sql_from_output = client._extract_sql_from_output(tool_call)
+                    if sql_from_output:
+                        sql_queries.extend(sql_from_output)
+                    data_preview = legacy_extract_structured_data_from_output(client, tool_call)
+                    if data_preview and (sql_from_args or sql_from_output):
+                        all_sql_this_call = sql_from_args + sql_from_output
+                        data_retrieval_query = all_sql_this_call[-1] if all_sql_this_call else None
+                        data_retrieval_query_index = len(sql_queries)
+                    data_previews.append(data_preview)
+
+    return {
+        "queries": list(dict.fromkeys(sql_queries)),
+        "data_previews": data_previews,
+        "data_retrieval_query": data_retrieval_query,
+        "data_retrieval_query_index": data_retrieval_query_index
+    }
+
+
+def two_pass(client: FabricDataAgentClient, steps) -> dict:
+    """
+    The extraction flow get_run_details() used before the single-pass extractor.
+    """
+    analysis = legacy_extract_sql_queries_with_data(client, steps)
+    if not analysis["queries"]:
+        regex_queries = legacy_extract_sql_queries(client, steps)
+        if regex_queries:
+            analysis["queries"] = regex_queries
+    return analysis
+
+
+def single_pass(client: FabricDataAgentClient, steps) -> dict:
+    analysis = client._analyze_run_steps(steps)
+    if not analysis["queries"]:
+        analysis["queries"] = analysis["fallback_queries"]
+    return analysis
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run step SQL extraction")
+    parser.add_argument("--rows", type=int, default=20000, help="rows per tool output")
+    parser.add_argument("--steps", type=int, default=4, help="number of tool call steps")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions, best time is reported")
+    args = parser.parse_args()
+
+    # The extractors do not touch authentication state, so skip __init__ (and sign-in)
+    client = FabricDataAgentClient.__new__(FabricDataAgentClient)
+
+    print(f"{'case':<28}{'payload':>12}{'two-pass':>12}{'single-pass':>14}{'speedup':>10}")
+    for with_sql in (True, False):
+        steps = build_steps(args.rows, args.steps, with_sql)
+        payload_mb = sum(len(step.step_details.tool_calls[0].output) for step in steps) / 1e6
+
+        assert two_pass(client, steps)["queries"] == single_pass(client, steps)["queries"]
+
+        old = best_of(lambda: two_pass(client, steps), args.repeat)
+        new = best_of(lambda: single_pass(client, steps), args.repeat)
+        case = "SQL in arguments" if with_sql else "no SQL (regex fallback)"
+        print(f"{case:<28}{payload_mb:>10.1f}MB{old * 1000:>10.1f}ms{new * 1000:>12.1f}ms{old / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for SQL detection in large tool outputs.
+
+Times the linear-time statement scanner behind _find_sql_in_text() on 1-50 MB
+inputs and the old backtracking regexes (_find_sql_in_text_regex()) on small
+inputs, and reports the per-character cost and the scaling exponent of each
+(1.0 is linear, 2.0 quadratic). No Fabric tenant or network access is needed.
+
+Usage:
+    python benchmark_sql_scanner.py --sizes 1 5 10 25 50 --legacy-sizes 0.05 0.1 0.2
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+
+from fabric_data_agent_client import FabricDataAgentClient
+
+SQL = "SELECT TOP 10 Customer, SUM(Sales) AS TotalSales FROM dbo.FactSales WHERE City = 'Paris' GROUP BY Customer"
+
+
+def build_text(kind: str, size_mb: float) -> str:
+    """
+    Build a synthetic output of roughly ``size_mb`` megabytes.
+
+    - rows: JSON result rows with a generated SQL value every 1000 rows
+    - prose: "select" in every row and no FROM, the worst case for the old regexes
+    - statements: semicolon separated SQL statements back to back
+    """
+    size = int(size_mb * 1_000_000)
+    if kind == "rows":
+        rows = [{"Customer": f"Customer {i}", "City": f"City {i % 97}", "TotalSales": round(i * 1.37, 2)}
+                for i in range(1000)]
+        unit = json.dumps({"sql": SQL, "rows": rows})
+    elif kind == "prose":
+        unit = json.dumps({"note": "please select the best rows", "Customer": "Contoso", "TotalSales": 1.5}) + ", "
+    else:
+        unit = SQL + ";\n"
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def timed(func, text: str, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        queries = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(queries)
+
+
+def exponent(points: list) -> float:
+    """
+    Log-log slope between the smallest and largest input.
+    """
+    (size_a, time_a), (size_b, time_b) = points[0], points[-1]
+    return math.log(time_b / time_a) / math.log(size_b / size_a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQL detection on large inputs")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10, 25, 50], help="scanner input sizes in MB")
+    parser.add_argument("--legacy-sizes", type=float, nargs="+", default=[0.05, 0.1, 0.2],
+                        help="input sizes in MB for the old regexes (they grow quadratically)")
+    parser.add_argument("--kinds", nargs="+", default=["rows", "prose", "statements"],
+                        choices=["rows", "prose", "statements"])
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, best time is reported")
+    parser.add_argument("--max-exponent", type=float, default=1.3,
+                        help="fail when the scanner's scaling exponent exceeds this")
+    args = parser.parse_args()
+
+    # SQL detection does not touch authentication state, so skip __init__ (and sign-in)
+    client = FabricDataAgentClient.__new__(FabricDataAgentClient)
+    methods = [("scanner", client._find_sql_in_text, args.sizes)]
+    if args.legacy_sizes:
+        methods.append(("legacy regex", client._find_sql_in_text_regex, args.legacy_sizes))
+
+    failed = False
+    print(f"{'input':<12}{'method':<14}{'size':>9}{'time':>11}{'ns/char':>10}{'MB/s':>9}{'queries':>9}")
+    for kind in args.kinds:
+        for name, func, sizes in methods:
+            points = []
+            for size_mb in sizes:
+                text = build_text(kind, size_mb)
+                elapsed, found = timed(func, text, args.repeat)
+                points.append((len(text), elapsed))
+                print(f"{kind:<12}{name:<14}{size_mb:>7.2f}MB{elapsed * 1000:>9.1f}ms"
+                      f"{elapsed * 1e9 / len(text):>10.1f}{len(text) / 1e6 / elapsed:>9.1f}{found:>9}")
+            if len(points) > 1:
+                slope = exponent(points)
+                print(f"{kind:<12}{name:<14}scaling exponent {slope:.2f}")
+                if name == "scanner" and slope > args.max_exponent:
+                    failed = True
+        print()
+
+    if failed:
+        print(f"Scanner time grew faster than size^{args.max_exponent}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
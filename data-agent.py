@@ -1,4 +1,7 @@
-from fabric_data_agent_client import FabricDataAgentClient
+from fabric_data_agent_client import FabricDataAgentClient, configure_logging
+
+# Show sign-in and progress messages
+configure_logging()
 
 # Initialize the client (will open browser for authentication)
 client = FabricDataAgentClient(
@@ -8,6 +8,10 @@ of the Fabric environment using interactive browser authentication.
 Requirements:
 - azure-identity
 - openai
+- httpx (installed with openai, used for the pooled connections)
+- h2 (optional, only when HTTP/2 is enabled in TransportConfig)
+- numpy, pandas, pyarrow (optional, for typed result tables and their exports)
+- opentelemetry-api (optional, for OpenTelemetrySpanExporter)
 - python-dotenv (optional, for environment variables)
 
 Usage:
@@ -18,12 +22,38 @@ Usage:
 
 import time
 import uuid
+import atexit
+import email.utils
+import logging
+import logging.handlers
+import sys
+import bisect
+import contextlib
+import functools
+import inspect
+import queue
+import weakref
 import json
-import os, requests
+import random
+import re
+import hashlib
+import sqlite3
+import os
+import asyncio
+import threading
+import contextvars
+import math
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import warnings
-from typing import Optional
+from dataclasses import dataclass, asdict, field
+from typing import Any, Optional
+import httpx
+from azure.core.credentials import AccessToken
 from azure.identity import InteractiveBrowserCredential
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, BadRequestError, NotFoundError
 
 # Suppress OpenAI Assistants API deprecation warnings
 # (Fabric Data Agents don't support the newer Responses API yet)
@@ -40,109 +70,5447 @@ try:
 except ImportError:
     pass
 
+# Optional: NumPy backs ResultTable columns when installed (array.array otherwise)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SQL extraction: keys and patterns are compiled once at import time
+_SQL_ARG_KEYS = ('sql', 'query', 'sql_query', 'statement', 'command', 'code')
+_SQL_OUTPUT_KEYS = _SQL_ARG_KEYS + ('generated_code',)
+_SQL_ARG_KEYWORDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+_SQL_OUTPUT_KEYWORDS = _SQL_ARG_KEYWORDS + ('FROM',)
+_SQL_ARG_STRING_PATTERN = re.compile(r'"(?:sql|query|statement|code)"\s*:\s*"([^"]+)"', re.IGNORECASE)
+_SQL_OUTPUT_KEY_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'"(?:sql|query|statement|code|generated_code)"\s*:\s*"([^"]+)"',
+        r"'(?:sql|query|statement|code|generated_code)'\s*:\s*'([^']+)'"
+    )
+]
+# Statement patterns used before the linear-time scanner, kept as a fallback
+_SQL_OUTPUT_PATTERNS = _SQL_OUTPUT_KEY_PATTERNS + [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+        r'(SELECT\s+.*?FROM\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
+        r'(INSERT\s+INTO\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
+        r'(UPDATE\s+.*?SET\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
+        r'(DELETE\s+FROM\s+.*?)(?=\s*[;}"\'\n]|\s*$)'
+    )
+]
+_SQL_TEXT_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+        r'(SELECT\s+.*?FROM\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\)|\s*,)',
+        r'(INSERT\s+INTO\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
+        r'(UPDATE\s+.*?SET\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
+        r'(DELETE\s+FROM\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
+        r'(CREATE\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
+        r'(ALTER\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
+        r'(DROP\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))'
+    )
+]
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Linear-time SQL statement scanner. Statement keywords are located with
+# str.find on an upper-cased copy and confirmed with an anchored pattern, and
+# each statement is then
+# walked token by token (quotes, comments, parentheses) up to its boundary, so
+# every character is looked at a bounded number of times.
+_SQL_MAX_STATEMENT_LENGTH = 20000
+_SQL_REGEX_FALLBACK_MAX_CHARS = 16 * 1024
+_SQL_ESCAPE_PATTERN = re.compile(r'\\([nrt"\'\\])')
+_SQL_ESCAPES = {'n': ' ', 'r': ' ', 't': ' ', '"': '"', "'": "'", '\\': '\\'}
+_SQL_SPACE = r'(?:\s|\\[NRT])+'
+_SQL_STATEMENT_START = re.compile(
+    r'(?<![\w.])(?:(?:SELECT|UPDATE|INSERT{0}INTO|DELETE{0}FROM|(?:CREATE|ALTER|DROP){0}TABLE)(?=\s|\\[NRT]|\()'
+    r'|WITH{0}\w+{0}AS(?=(?:\s|\\[NRT])*\())'.format(_SQL_SPACE),
+    re.IGNORECASE
+)
+_SQL_STATEMENT_KEYWORDS = ('SELECT', 'UPDATE', 'INSERT', 'DELETE', 'CREATE', 'ALTER', 'DROP', 'WITH')
+# Keyword searches run on upper-cased windows of the text, never on a copy of the whole output
+_SQL_STATEMENT_HINT = re.compile('|'.join(_SQL_STATEMENT_KEYWORDS))
+_SQL_OUTPUT_KEYWORD_PATTERN = re.compile('|'.join(_SQL_OUTPUT_KEYWORDS))
+_SQL_SCAN_WINDOW = 64 * 1024
+_SQL_STATEMENT_TOKENS = re.compile(r'--|/\*|\*/|\\.|[;\'"(){}\n]', re.DOTALL)
+_SQL_CONTINUATION_LINE = re.compile(
+    r'[ \t]+[^\s\\]|(?:FROM|WHERE|GROUP|ORDER|HAVING|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|OUTER|ON|AND|OR|NOT'
+    r'|UNION|EXCEPT|INTERSECT|LIMIT|OFFSET|FETCH|SET|VALUES|SELECT|AS|CASE|WHEN|THEN|ELSE|END)\b|[(),*+\-=<>]',
+    re.IGNORECASE
+)
+_SQL_REQUIRED_CLAUSES = {
+    'SELECT': re.compile(r'(?:(?<!\w)|(?<=\\[NRT]))FROM(?!\w)', re.IGNORECASE),
+    'UPDATE': re.compile(r'(?:(?<!\w)|(?<=\\[NRT]))SET(?!\w)', re.IGNORECASE)
+}
 
-class FabricDataAgentClient:
+
+def _sql_statement_end(text: str, start: int, limit: int, enclosure: Optional[str]) -> Optional[int]:
     """
-    Client for calling Microsoft Fabric Data Agents from external applications.
+    Find where the SQL statement starting at ``start`` ends.
+
+    The statement ends at a ``;``, an unmatched ``)`` or ``}``, a line break not
+    followed by a continuation line (indented, or starting with a clause keyword), or
+    the quote that closes the string the statement is embedded in (``enclosure``,
+    e.g. the ``"`` of a JSON value). Quoted literals and comments are skipped, and
+    inside an embedded string the escaped quotes (``\\"``) delimit SQL literals.
+
+    Returns:
+        int: End offset, or None when no boundary is found before ``limit``
+    """
+    escaped_enclosure = enclosure[-1] if enclosure and len(enclosure) == 2 else None
+    if enclosure is None:
+        quote_tokens = ("'", '"')
+    elif enclosure == '"':
+        quote_tokens = ("'", "\\'", '\\"')
+    elif enclosure == "'":
+        quote_tokens = ('"', '\\"', "\\'")
+    else:
+        quote_tokens = ("'" if escaped_enclosure == '"' else '"',)
+    newline_tokens = ('\n', '\\n')
+
+    depth = 0
+    literal = None
+    comment = None
+    pos = start
+    while True:
+        match = _SQL_STATEMENT_TOKENS.search(text, pos, limit)
+        if not match:
+            return limit if limit == len(text) else None
+        token = match.group()
+        pos = match.end()
+
+        # The end of the enclosing string ends the statement whatever state we are in
+        if token == enclosure or token == escaped_enclosure:
+            return match.start()
+
+        if comment == '--':
+            if token in newline_tokens:
+                comment = None
+            continue
+        if comment == '/*':
+            if token == '*/':
+                comment = None
+            continue
+        if literal:
+            if token == literal:
+                literal = None
+            continue
+
+        if token in quote_tokens:
+            literal = token
+        elif token == '--' or token == '/*':
+            comment = token
+        elif token == '(':
+            depth += 1
+        elif token == ')':
+            if depth == 0:
+                return match.start()
+            depth -= 1
+        elif token == ';' or token == '}':
+            return match.start()
+        elif token in newline_tokens and not _SQL_CONTINUATION_LINE.match(text, pos, limit):
+            return match.start()
+
+
+def _iter_keyword_hits(text: str, pattern: re.Pattern):
+    """
+    Yield the offsets of ``pattern`` matches in ``text``, in order, ignoring case.
+
+    Only one window of ``_SQL_SCAN_WINDOW`` characters is upper-cased at a time,
+    so memory stays bounded however large the text is. Windows overlap by the
+    longest keyword so that keywords spanning a window boundary are still found.
+    """
+    overlap = len(max(pattern.pattern.split('|'), key=len)) - 1
+    length = len(text)
+    for offset in range(0, length, _SQL_SCAN_WINDOW):
+        limit = min(_SQL_SCAN_WINDOW, length - offset)
+        window = text[offset:offset + limit + overlap].upper()
+        for hit in pattern.finditer(window):
+            if hit.start() >= limit:
+                break
+            yield offset + hit.start()
+
+
+def _next_sql_statement_start(text: str, pos: int, hits):
+    """
+    Return the match of the first SQL statement start at or after ``pos``, or None.
+
+    ``hits`` is the forward-only iterator of keyword offsets shared by one scan.
+    """
+    for start in hits:
+        if start < pos:
+            continue
+        match = _SQL_STATEMENT_START.match(text, start)
+        if match:
+            return match
+    return None
+
+
+def _scan_sql_statements(text: str, max_statement_length: int = _SQL_MAX_STATEMENT_LENGTH):
+    """
+    Yield the SQL statements found in free text or stringified tool output.
+
+    Runs in time linear in ``len(text)``: statement starts come from forward-only
+    keyword searches, scanning resumes after each statement, and a statement
+    without a boundary within ``max_statement_length`` characters is skipped.
+    Statements are returned as they appear in the text (not unescaped).
+    Keywords are matched case-insensitively one window at a time (see
+    ``_iter_keyword_hits``), so the text is never copied as a whole.
+    """
+    length = len(text)
+    hits = _iter_keyword_hits(text, _SQL_STATEMENT_HINT)
+    pos = 0
+    while True:
+        match = _next_sql_statement_start(text, pos, hits)
+        if not match:
+            return
+        start = match.start()
+        limit = min(length, start + max_statement_length)
+
+        # Statements embedded in a JSON value or Python repr end with that string
+        enclosure = None
+        if start > 0 and text[start - 1] in '"\'':
+            enclosure = text[start - 1]
+            if start > 1 and text[start - 2] == '\\':
+                enclosure = '\\' + enclosure
+
+        end = _sql_statement_end(text, match.end(), limit, enclosure)
+        if end is None:
+            pos = limit
+            continue
+        pos = max(end, match.end())
+
+        keyword = match.group().split(None, 1)[0].split('\\', 1)[0].upper()
+        required = _SQL_REQUIRED_CLAUSES.get(keyword)
+        if required and not required.search(text, match.end(), end):
+            continue
+        yield text[start:end].rstrip()
+
+
+def _clean_sql_statement(statement: str) -> str:
+    """
+    Undo JSON/repr escaping in an extracted statement and normalize its whitespace.
+    """
+    statement = _SQL_ESCAPE_PATTERN.sub(lambda match: _SQL_ESCAPES[match.group(1)], statement)
+    return _WHITESPACE_PATTERN.sub(' ', statement).strip()
+
+
+# JSON value scanner for data previews. Values are decoded in place with
+# raw_decode (no copied slices), and bracket matching, which skips whole strings
+# and runs of non-bracket characters with one regex match per bracket, is only
+# used to step over text that is not valid JSON.
+_JSON_OPENER = re.compile(r'[\[{]')
+_JSON_SKIP = re.compile(r'(?:[^\[\]{}"]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_JSON_WHITESPACE = re.compile(r'\s*')
+_JSON_CLOSERS = {'[': ']', '{': '}'}
+_JSON_DECODER = json.JSONDecoder()
+# Tool outputs at least this large are previewed row by row instead of with json.loads
+_STREAMING_OUTPUT_MIN_CHARS = 1024 * 1024
+
+
+def _match_json_brackets(text: str, start: int) -> tuple:
+    """
+    Match the bracket at ``start`` in one forward pass, ignoring brackets in JSON strings.
+
+    Returns:
+        tuple: (spans, end) where spans are the ``(start, end)`` offsets of the
+               complete arrays and objects directly inside, and end is where
+               scanning can resume. A bracket that is never closed (or is closed
+               by the wrong bracket) ends at the point the scan gave up, and the
+               complete values found at any depth inside it are returned.
+    """
+    length = len(text)
+    stack = [(text[start], start, [])]
+    pos = start + 1
+    while True:
+        pos = _JSON_SKIP.match(text, pos).end()
+        # End of text, or a string that is never terminated
+        if pos >= length or text[pos] == '"':
+            break
+        char = text[pos]
+        pos += 1
+        if char in _JSON_CLOSERS:
+            stack.append((char, pos - 1, []))
+        elif char == _JSON_CLOSERS[stack[-1][0]]:
+            _, span_start, children = stack.pop()
+            if not stack:
+                return children, pos
+            stack[-1][2].append((span_start, pos))
+        else:
+            break
+    return [span for _, _, children in stack for span in children], pos
+
+
+def _decode_json_value(text: str, start: int, max_rows: Optional[int] = None) -> tuple:
+    """
+    Decode the JSON array or object starting at ``start`` without copying the text.
+
+    With ``max_rows`` an array is decoded element by element and decoding stops
+    after that many rows, so the rest of a large result is never parsed.
+
+    Returns:
+        tuple: (value, end), end is None when decoding stopped at max_rows
+
+    Raises:
+        ValueError: If the text at ``start`` is not valid JSON
+    """
+    if max_rows is None or text[start] != '[':
+        return _JSON_DECODER.raw_decode(text, start)
+
+    rows = []
+    row_iter = _iter_json_rows(text, start)
+    try:
+        while len(rows) < max_rows:
+            rows.append(next(row_iter))
+    except StopIteration as stop:
+        return rows, stop.value
+    return rows, None
+
+
+def _iter_json_rows(text: str, start: int):
+    """
+    Decode the elements of the JSON array starting at ``start`` one at a time.
+
+    Only the current element is materialized, so memory stays proportional to
+    one row however large the array is. The generator returns the offset just
+    past the array.
+
+    Raises:
+        ValueError: If the array is not valid JSON (the rows before the error are yielded)
+    """
+    pos = _JSON_WHITESPACE.match(text, start + 1).end()
+    if text[pos:pos + 1] == ']':
+        return pos + 1
+    while True:
+        row, pos = _JSON_DECODER.raw_decode(text, pos)
+        yield row
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        separator = text[pos:pos + 1]
+        if separator == ']':
+            return pos + 1
+        if separator != ',':
+            raise ValueError(f"Expected ',' or ']' at {pos}")
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+
+
+def _starts_with_record(text: str, start: int) -> bool:
+    """
+    Check whether the JSON array at ``start`` begins with an object (a record).
+    """
+    pos = _JSON_WHITESPACE.match(text, start + 1).end()
+    if text[pos:pos + 1] != '{':
+        return False
+    try:
+        return isinstance(_JSON_DECODER.raw_decode(text, pos)[0], dict)
+    except (ValueError, RecursionError):
+        return False
+
+
+def _find_member_rows(text: str, start: int) -> Optional[int]:
+    """
+    Find the first member of the JSON object at ``start`` whose value is an array of records.
+
+    Member values are stepped over with bracket matching, not decoded.
+    """
+    pos = _JSON_WHITESPACE.match(text, start + 1).end()
+    while text[pos:pos + 1] == '"':
+        try:
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+        except ValueError:
+            return None
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != ':':
+            return None
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        
+        value_start = text[pos:pos + 1]
+        if value_start == '[' and _starts_with_record(text, pos):
+            return pos
+        if value_start in _JSON_CLOSERS:
+            pos = _match_json_brackets(text, pos)[1]
+        else:
+            try:
+                _, pos = _JSON_DECODER.raw_decode(text, pos)
+            except ValueError:
+                return None
+        
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        if text[pos:pos + 1] != ',':
+            return None
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+    return None
+
+
+def _find_json_rows(text: str, pos: int = 0) -> Optional[int]:
+    """
+    Find the offset of the first JSON array of records in a tool output.
+
+    The output may be an array of records, an object holding one as a member
+    value, or free text containing either. Everything else is stepped over with
+    bracket matching, so at most the first record of each candidate is decoded.
+    """
+    while True:
+        match = _JSON_OPENER.search(text, pos)
+        if not match:
+            return None
+        start = match.start()
+        if match.group() == '[':
+            if _starts_with_record(text, start):
+                return start
+        else:
+            rows_start = _find_member_rows(text, start)
+            if rows_start is not None:
+                return rows_start
+        pos = _match_json_brackets(text, start)[1]
+
+
+def iter_output_rows(output):
+    """
+    Iterate the records of a tool call output lazily, one decoded row at a time.
+
+    Works on the output text in place: no full json.loads and no copies, so
+    memory stays proportional to the rows the caller holds on to.
+
+    Args:
+        output: A tool call output (usually the string from the run steps)
+
+    Yields:
+        dict: One record per row; nothing when the output holds no records
+
+    Raises:
+        ValueError: If the records array is malformed after the rows already yielded
+    """
+    text = output if isinstance(output, str) else str(output)
+    start = _find_json_rows(text)
+    if start is not None:
+        yield from _iter_json_rows(text, start)
+
+
+def _stream_rows(rows, sink, batch_size: int) -> int:
+    """
+    Feed rows to ``sink`` in lists of up to ``batch_size`` rows and return the row count.
+    """
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        sink(batch)
+        count += len(batch)
+
+
+class JsonLinesSink:
+    """
+    Row sink for stream_result_rows() that appends each batch to a JSON Lines file.
     
-    This client handles:
-    - Interactive browser authentication with Azure AD
-    - Automatic token refresh
-    - Bearer token management for API calls
-    - Proper cleanup of resources
+    Any callable that accepts a list of row dicts works as a sink, e.g. a
+    function appending ``pandas.DataFrame(batch)`` to a list of frames.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+    
+    def __call__(self, rows: list):
+        with open(self.path, "a", encoding="utf-8") as sink_file:
+            sink_file.writelines(json.dumps(row, default=str) + "\n" for row in rows)
+        self.rows_written += len(rows)
+
+
+def _iter_json_values(text: str, max_rows: Optional[int] = None):
+    """
+    Yield the decoded top-level JSON arrays and objects found in free text.
+
+    Each top-level bracket is decoded in place. When that fails, bracket matching
+    steps over the candidate and the complete values inside it (e.g. the array
+    in a Python repr of a dict) are decoded instead, so the text is traversed a
+    bounded number of times. Arrays stop after ``max_rows`` rows when it is given.
+    """
+    pos = 0
+    while True:
+        match = _JSON_OPENER.search(text, pos)
+        if not match:
+            return
+        start = match.start()
+        try:
+            value, end = _decode_json_value(text, start, max_rows)
+        except (ValueError, RecursionError):
+            spans, pos = _match_json_brackets(text, start)
+            for span_start, _ in spans:
+                try:
+                    yield _decode_json_value(text, span_start, max_rows)[0]
+                except (ValueError, RecursionError):
+                    continue
+            continue
+        
+        yield value
+        # Only the first rows were decoded; find the end of the array before moving on
+        pos = end if end is not None else _match_json_brackets(text, start)[1]
+
+
+FABRIC_SCOPE = "https://api.fabric.microsoft.com/.default"
+
+# Page size for the cursor-paginated list endpoints (the API maximum) and the
+# number of threads whose message cursor is remembered
+_PAGE_SIZE = 100
+_MAX_MESSAGE_CURSORS = 4096
+
+
+def _has_next_page(page, options: dict) -> bool:
+    """
+    Whether a cursor page is followed by another one.
+    
+    Early openai 1.x pages do not carry has_more; for those, a page that came
+    back full (with an id to continue after) may have a successor.
+    """
+    if not page.data:
+        return False
+    has_more = getattr(page, "has_more", None)
+    if has_more is not None:
+        return has_more
+    return len(page.data) >= options.get("limit", 20) and getattr(page.data[-1], "id", None) is not None
+
+
+def _iter_cursor_pages(list_page, **options):
+    """
+    Yield the items of a cursor-paginated list endpoint (run steps, messages).
+    
+    The next page is only requested once the previous one has been consumed,
+    so a caller that stops early never fetches the rest.
+    
+    Args:
+        list_page (callable): The SDK list method, e.g. client.beta.threads.runs.steps.list
+        **options: Arguments for list_page; "after" is advanced from page to page
+    """
+    while True:
+        page = list_page(**options)
+        yield from page.data
+        if not _has_next_page(page, options):
+            return
+        options["after"] = page.data[-1].id
+
+
+async def _aiter_cursor_pages(list_page, **options):
+    """
+    Async version of _iter_cursor_pages() for the AsyncOpenAI list methods.
+    """
+    while True:
+        page = await list_page(**options)
+        for item in page.data:
+            yield item
+        if not _has_next_page(page, options):
+            return
+        options["after"] = page.data[-1].id
+
+# ActivityId of the client call in progress, shared by every request that call makes
+_current_activity_id = contextvars.ContextVar("fabric_activity_id", default=None)
+
+# Status, warnings and errors go to this logger; it stays silent until the
+# application configures logging, e.g. with configure_logging()
+logger = logging.getLogger("fabric_data_agent_client")
+logger.addHandler(logging.NullHandler())
+
+# Structured fields every record of this module carries (None when not applicable)
+_LOG_FIELDS = ("activity_id", "thread_id", "run_id", "phase", "elapsed")
+
+
+class _LogContextFilter(logging.Filter):
+    """
+    Stamps records with the ActivityId of the call in progress and fills in the
+    structured fields a call site did not pass.
+    
+    Logger filters only run for records that pass the level check, so a
+    disabled message costs no more than that check.
+    """
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name in _LOG_FIELDS:
+            if not hasattr(record, name):
+                setattr(record, name, None)
+        if record.activity_id is None:
+            record.activity_id = _current_activity_id.get()
+        return True
+
+
+logger.addFilter(_LogContextFilter())
+
+
+class StructuredLogFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, with the structured fields
+    (activity_id, thread_id, run_id, phase, elapsed) as keys when set.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for name in _LOG_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_log_listener = None
+_log_handler = None
+_log_config_lock = threading.Lock()
+
+
+def configure_logging(level: int = logging.INFO, quiet: bool = False, structured: bool = False,
+                      stream=None) -> logging.handlers.QueueListener:
+    """
+    Write this module's log records to a stream from a background thread.
+    
+    Request threads (and the event loop) only put records on an in-memory
+    queue; a QueueListener thread formats and writes them, so logging never
+    blocks a call on I/O. Records are no longer passed on to the root
+    logger's handlers. Calling it again replaces the previous setup.
+    
+    Args:
+        level (int): Lowest level written; logging.DEBUG adds every run status poll
+        quiet (bool): Only write warnings and errors
+        structured (bool): Write JSON lines with the structured fields instead of plain messages
+        stream: Where to write, sys.stdout by default
+        
+    Returns:
+        QueueListener: The running listener; it is stopped at interpreter exit
+    """
+    global _log_listener, _log_handler
+    
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(StructuredLogFormatter() if structured else logging.Formatter("%(message)s"))
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    
+    with _log_config_lock:
+        if _log_listener is not None:
+            logger.removeHandler(_log_handler)
+            _stop_listener(_log_listener)
+        logger.setLevel(logging.WARNING if quiet else level)
+        logger.addHandler(queue_handler)
+        # Records are written by the listener; passing them on to the root logger would print them twice
+        logger.propagate = False
+        listener.start()
+        _log_listener, _log_handler = listener, queue_handler
+    return listener
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    # Before Python 3.12 stop() fails on a listener that was already stopped
+    if listener._thread is not None:
+        listener.stop()
+
+
+@atexit.register
+def _stop_log_listener():
+    # Write out what is still queued
+    with _log_config_lock:
+        if _log_listener is not None:
+            _stop_listener(_log_listener)
+
+
+@dataclass
+class TransportConfig:
+    """
+    Connection pool settings for the HTTP transport a client keeps open.
+    
+    Attributes:
+        max_connections (int): Maximum number of concurrent connections
+        max_keepalive_connections (int): Idle connections kept open for reuse
+        keepalive_expiry (float): Seconds an idle connection is kept alive
+        http2 (bool): Negotiate HTTP/2 (requires the optional h2 package)
+        timeout (float): Default network timeout in seconds
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    timeout: float = 60.0
+
+
+class TransportStats:
     """
+    Thread-safe counters showing how often requests reuse pooled connections.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+    
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+    
+    def trace(self, event_name: str, info: dict):
+        """
+        httpcore trace hook; a TCP connect means the request could not reuse a connection.
+        """
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
     
-    def __init__(self, tenant_id: str, data_agent_url: str):
+    async def atrace(self, event_name: str, info: dict):
+        """
+        Async flavour of trace() for httpx.AsyncClient.
+        """
+        self.trace(event_name, info)
+    
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Request, new connection and reused connection counts
+        """
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0
+            }
+
+
+class FabricAgentError(Exception):
+    """
+    Base class of the errors raised for failed Fabric Data Agent calls.
+
+    Attributes:
+        status_code (int, optional): HTTP status of the failed request, if it got one
+        retry_after (float, optional): Seconds the service asked callers to wait
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FabricThrottledError(FabricAgentError):
+    """
+    The service kept answering 429 (capacity throttled) after the retries.
+    """
+
+
+class FabricServiceError(FabricAgentError):
+    """
+    The service answered with an error status (5xx after the retries, or a 4xx).
+    """
+
+
+class FabricConnectionError(FabricAgentError):
+    """
+    The request did not get a response (connection failure or network timeout).
+    """
+
+
+class CircuitOpenError(FabricAgentError):
+    """
+    Raised without sending the request while an endpoint's circuit breaker is open.
+
+    Attributes:
+        endpoint (str): The throttled or failing endpoint
+    """
+
+    def __init__(self, endpoint: str, retry_after: Optional[float]):
+        super().__init__(f"Circuit open for {endpoint}, retry in {retry_after:.1f} seconds",
+                         retry_after=retry_after)
+        self.endpoint = endpoint
+
+
+def _to_fabric_error(error: Exception) -> FabricAgentError:
+    """
+    Translate an exception from the OpenAI SDK or httpx into the matching FabricAgentError.
+    """
+    cause = error
+    while cause is not None:
+        if isinstance(cause, FabricAgentError):
+            return cause
+        cause = cause.__cause__
+
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        retry_after = _parse_retry_after(response.headers)
+        error_class = FabricThrottledError if status_code == 429 else FabricServiceError
+        return error_class(str(error), status_code=status_code, retry_after=retry_after)
+    if isinstance(error, (APIConnectionError, httpx.TransportError)):
+        return FabricConnectionError(str(error))
+    return FabricAgentError(str(error))
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """
+    Seconds to wait from retry-after-ms or Retry-After (delta seconds or an HTTP date).
+    """
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Methods that can be repeated without changing the outcome
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+# Connection failures that happen before any byte of the request was sent
+_UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retry and circuit breaker settings applied to every HTTP request of a client.
+
+    Throttling (429), request timeouts (408) and server errors (5xx) are retried
+    with exponential backoff and jitter, waiting at least as long as the
+    Retry-After (or retry-after-ms) header asks. Requests that are not
+    idempotent - the POSTs creating messages, runs and assistants - are only
+    retried when the service cannot have acted on them: a 429, or a
+    connection that failed before the request was sent. No retry is started
+    that would begin after the deadline of the call that sent the request.
+
+    Attributes:
+        max_attempts (int): Attempts per request, the first one included
+        initial_delay (float): Backoff before the first retry in seconds
+        multiplier (float): Growth factor applied after each retry
+        max_delay (float): Upper bound for a single backoff
+        jitter (float): Relative random spread applied to each backoff (0.1 = +/-10%)
+        max_retry_after (float): Longest Retry-After waited for; a longer one fails the request at once
+        retry_statuses (tuple): HTTP statuses that are retried
+        retry_non_idempotent (bool): Also retry POSTs after 5xx and read errors (they may run twice)
+        circuit_failure_threshold (int): Consecutive failed requests (after retries) that open an endpoint's circuit breaker
+        circuit_reset_timeout (float): Seconds a circuit stays open before a probe request is let through
+    """
+    max_attempts: int = 4
+    initial_delay: float = 0.5
+    multiplier: float = 2.0
+    max_delay: float = 20.0
+    jitter: float = 0.25
+    max_retry_after: float = 60.0
+    retry_statuses: tuple = (408, 429, 500, 502, 503, 504)
+    retry_non_idempotent: bool = False
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+
+    def is_idempotent(self, request: httpx.Request) -> bool:
+        # Cancelling a run twice has the same effect as cancelling it once
+        return request.method in _IDEMPOTENT_METHODS or request.url.path.endswith("/cancel")
+
+    def should_retry(self, request: httpx.Request, attempt: int, status_code: Optional[int] = None,
+                     error: Optional[Exception] = None) -> bool:
+        """
+        Whether a failed attempt (0-based) is retried, given its status code or transport error.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        if status_code is not None and status_code not in self.retry_statuses:
+            return False
+        if self.retry_non_idempotent or self.is_idempotent(request):
+            return True
+        # The service rejected or never received it, so it did not act on it
+        return status_code == 429 or isinstance(error, _UNSENT_REQUEST_ERRORS)
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Backoff before retrying after a failed attempt (0-based).
+
+        Returns:
+            float: Seconds to wait, or None when Retry-After asks for more than max_retry_after
+        """
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        delay = min(self.initial_delay * self.multiplier ** attempt, self.max_delay)
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Fails requests to an endpoint fast while it is throttled or failing.
+
+    After circuit_failure_threshold consecutive requests failed for good
+    (throttling, server errors or connection errors that outlasted their
+    retries) the circuit opens: requests raise CircuitOpenError without being
+    sent, for as long as the last Retry-After asked, or circuit_reset_timeout
+    seconds without one. Then a single probe request is let through, without
+    retries; its success closes the circuit, its failure opens it again. A
+    probe that never reports back is replaced after reset_timeout.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.open_until = None
+        self.probe_started = None
+        self.rejected_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.open_until is None:
+                return "closed"
+            return "half_open" if self._can_probe(time.time()) else "open"
+
+    def _can_probe(self, now: float) -> bool:
+        return now >= self.open_until and (self.probe_started is None or
+                                           now - self.probe_started > self.reset_timeout)
+
+    def before_request(self) -> bool:
+        """
+        Returns:
+            bool: Whether the request is the probe of a half-open circuit; probes are not
+                  retried, so their outcome is recorded before anything else is let through
+        
+        Raises:
+            CircuitOpenError: While the circuit is open, or another probe is in flight
+        """
+        with self._lock:
+            if self.open_until is None:
+                return False
+            now = time.time()
+            if self._can_probe(now):
+                self.probe_started = now
+                return True
+            self.rejected_count += 1
+            retry_after = max(self.open_until - now, 0.0)
+        raise CircuitOpenError(self.endpoint, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = None
+            self.probe_started = None
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.failures += 1
+            if self.open_until is not None or self.failures >= self.failure_threshold:
+                was_open = self.open_until is not None
+                self.open_until = time.time() + (self.reset_timeout if retry_after is None else retry_after)
+                self.probe_started = None
+                if not was_open:
+                    logger.warning("🚧 Circuit opened for %s after %d consecutive failures",
+                                   self.endpoint, self.failures, extra={"phase": "circuit"})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "endpoint": self.endpoint,
+                "consecutive_failures": self.failures,
+                "rejected_count": self.rejected_count,
+                "open_until": self.open_until
+            }
+
+
+_circuit_breakers = {}
+_endpoint_registry_lock = threading.Lock()
+_WORKSPACE_PATTERN = re.compile(r"/v1/workspaces/[^/]+", re.IGNORECASE)
+
+
+def _endpoint_key(url: str) -> str:
+    """
+    Host and workspace of a URL (just the host for other URLs); throttling applies per workspace capacity.
+    """
+    parsed = httpx.URL(url)
+    workspace = _WORKSPACE_PATTERN.match(parsed.path)
+    return parsed.host + (workspace.group(0).lower() if workspace else "")
+
+
+def get_circuit_breaker(url: str, policy: Optional[RetryPolicy] = None) -> CircuitBreaker:
+    """
+    Get the circuit breaker shared by every client calling the same endpoint.
+
+    Throttling applies to a workspace's capacity, so the endpoint is the host
+    and workspace of the URL (just the host for other URLs).
+
+    The first policy for an endpoint creates its breaker; a later policy with
+    different circuit settings is ignored with a warning.
+
+    Args:
+        url (str): A Data Agent URL or any request URL of it
+        policy (RetryPolicy, optional): Settings used when the breaker is created
+
+    Returns:
+        CircuitBreaker: The endpoint's breaker
+    """
+    endpoint = _endpoint_key(url)
+    with _endpoint_registry_lock:
+        breaker = _circuit_breakers.get(endpoint)
+        if breaker is None:
+            settings = policy or RetryPolicy()
+            breaker = CircuitBreaker(endpoint, settings.circuit_failure_threshold, settings.circuit_reset_timeout)
+            _circuit_breakers[endpoint] = breaker
+        elif policy is not None and (policy.circuit_failure_threshold, policy.circuit_reset_timeout) != \
+                (breaker.failure_threshold, breaker.reset_timeout):
+            logger.warning("⚠️ %s already has a circuit breaker (threshold %d, reset %.1fs); "
+                           "ignoring the different circuit settings of this RetryPolicy",
+                           endpoint, breaker.failure_threshold, breaker.reset_timeout)
+        return breaker
+
+
+@dataclass
+class RateLimitPolicy:
+    """
+    Client-side pacing of the requests sent to one Fabric capacity.
+
+    Pacing is opt-in: clients only use a limiter when given a policy
+    (rate_limit=RateLimitPolicy()). Every request first takes a token from a token bucket refilled at
+    requests_per_second, then a slot from an adaptive (AIMD) concurrency
+    limit: each success adds 1/limit slots (one slot per limit successes),
+    while a 429/503, a timeout or a latency spike multiplies the limit by
+    decrease_factor. A Retry-After on a throttled response also holds the
+    bucket, so every client of the workspace waits instead of each one
+    getting throttled in turn.
+
+    Attributes:
+        requests_per_second (float, optional): Token refill rate; None disables the token bucket
+        burst (int): Bucket size, the requests that may go out at once after an idle period
+        adaptive_concurrency (bool): Whether the AIMD concurrency limit is applied
+        initial_concurrency (int): Requests in flight allowed before any feedback
+        min_concurrency (int): Floor the limit never drops below
+        max_concurrency (int): Ceiling the limit never grows above
+        decrease_factor (float): Multiplier applied to the limit on throttling or a latency spike
+        decrease_cooldown (float): Seconds between two decreases, so one burst of 429s cuts once
+        latency_tolerance (float): A response slower than this multiple of the latency baseline is a spike
+        min_spike (float): Smallest increase in seconds over the baseline treated as a spike
+    """
+    requests_per_second: Optional[float] = 50.0
+    burst: int = 50
+    adaptive_concurrency: bool = True
+    initial_concurrency: int = 32
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+    decrease_factor: float = 0.5
+    decrease_cooldown: float = 1.0
+    latency_tolerance: float = 3.0
+    min_spike: float = 0.25
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by sync and async callers.
+
+    Callers reserve a token and sleep until it is theirs, so waiters are
+    served in arrival order without a background refill task.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.wait_count = 0
+        self.wait_time = 0.0
+
+    def _reserve(self) -> float:
+        """
+        Take a token, possibly borrowing against the refill.
+
+        Returns:
+            float: Seconds until the token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+            if delay > 0:
+                self.wait_count += 1
+                self.wait_time += delay
+            return delay
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """
+        Hold every request for `seconds`, e.g. for a Retry-After of the service.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit adjusted by additive increase / multiplicative decrease.
+
+    Sync callers block on a threading.Event and async callers await a future
+    on their own loop, so one limiter can be shared across threads and loops.
+    """
+
+    def __init__(self, policy: RateLimitPolicy):
+        self.policy = policy
+        self.limit = float(policy.initial_concurrency)
+        self.in_flight = 0
+        self.baseline = None
+        self.samples = 0
+        self.decrease_count = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return
+                event = threading.Event()
+                self._waiters.append(event.set)
+            event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return
+                future = loop.create_future()
+                self._waiters.append(functools.partial(loop.call_soon_threadsafe, _set_pending_future, future))
+            await future
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """
+        Free a slot and adjust the limit.
+
+        Args:
+            latency (float, optional): Response time of the request, None when it got no response
+            overloaded (bool): The service throttled the request or it timed out
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self._adjust(latency, overloaded, time.monotonic())
+            # Wake everyone; whoever finds a free slot takes it, so a cancelled waiter cannot strand one
+            waiters, self._waiters = self._waiters, []
+        for wake in waiters:
+            wake()
+
+    def _adjust(self, latency: Optional[float], overloaded: bool, now: float):
+        policy = self.policy
+        spike = (latency is not None and self.baseline is not None and self.samples >= 10 and
+                 latency > self.baseline * policy.latency_tolerance and
+                 latency - self.baseline > policy.min_spike)
+        if overloaded or spike:
+            if now - self._last_decrease >= policy.decrease_cooldown:
+                self.limit = max(float(policy.min_concurrency), self.limit * policy.decrease_factor)
+                self._last_decrease = now
+                self.decrease_count += 1
+                logger.debug("Concurrency limit cut to %d (%s)", int(self.limit),
+                             "throttled" if overloaded else "latency spike", extra={"phase": "rate_limit"})
+        elif latency is not None:
+            self.limit = min(float(policy.max_concurrency), self.limit + 1 / self.limit)
+        if latency is not None and not overloaded:
+            # Slow EWMA, so a lasting change of response times becomes the new normal
+            self.baseline = latency if self.baseline is None else self.baseline + 0.1 * (latency - self.baseline)
+            self.samples += 1
+
+
+def _set_pending_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class CapacityLimiter:
+    """
+    Token bucket and adaptive concurrency limit for one workspace, shared by
+    every client calling it (see get_capacity_limiter()).
+    """
+
+    def __init__(self, endpoint: str, policy: Optional[RateLimitPolicy] = None):
+        self.endpoint = endpoint
+        self.policy = policy or RateLimitPolicy()
+        self.bucket = (TokenBucket(self.policy.requests_per_second, self.policy.burst)
+                       if self.policy.requests_per_second else None)
+        self.concurrency = AdaptiveConcurrencyLimiter(self.policy) if self.policy.adaptive_concurrency else None
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait for a token and a concurrency slot.
+
+        Returns:
+            float: perf_counter() when the request was let through, to pass to release()
+        """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        return time.perf_counter()
+
+    async def acquire_async(self) -> float:
+        if self.bucket is not None:
+            await self.bucket.acquire_async()
+        if self.concurrency is not None:
+            await self.concurrency.acquire_async()
+        return time.perf_counter()
+
+    def release(self, started: float, response: Optional[httpx.Response] = None,
+                error: Optional[BaseException] = None):
+        """
+        Report the outcome of a request let through by acquire().
+
+        Args:
+            started (float): The value acquire() returned
+            response (httpx.Response, optional): The response, if one arrived
+            error (Exception, optional): The transport error, if the request failed
+        """
+        latency = None
+        overloaded = isinstance(error, httpx.TimeoutException)
+        if response is not None:
+            latency = time.perf_counter() - started
+            if response.status_code in (429, 503):
+                overloaded = True
+                with self._lock:
+                    self.throttled_count += 1
+                retry_after = _parse_retry_after(response.headers)
+                if retry_after and self.bucket is not None:
+                    self.bucket.pause(retry_after)
+        if self.concurrency is not None:
+            self.concurrency.release(latency, overloaded)
+
+    def stats(self) -> dict:
+        stats = {"endpoint": self.endpoint, "throttled_count": self.throttled_count}
+        if self.bucket is not None:
+            stats["rate_limit_waits"] = self.bucket.wait_count
+            stats["rate_limit_wait_time"] = self.bucket.wait_time
+        if self.concurrency is not None:
+            stats["concurrency_limit"] = int(self.concurrency.limit)
+            stats["in_flight"] = self.concurrency.in_flight
+            stats["concurrency_decreases"] = self.concurrency.decrease_count
+            stats["latency_baseline"] = self.concurrency.baseline
+        return stats
+
+
+_capacity_limiters = {}
+
+
+def get_capacity_limiter(url: str, policy: Optional[RateLimitPolicy] = None) -> CapacityLimiter:
+    """
+    Get the rate and concurrency limiter shared by every client calling the same workspace.
+
+    The first policy for a workspace creates its limiter; a later, different
+    policy is ignored with a warning.
+
+    Args:
+        url (str): A Data Agent URL or any request URL of it
+        policy (RateLimitPolicy, optional): Settings used when the limiter is created
+
+    Returns:
+        CapacityLimiter: The workspace's limiter
+    """
+    endpoint = _endpoint_key(url)
+    with _endpoint_registry_lock:
+        limiter = _capacity_limiters.get(endpoint)
+        if limiter is None:
+            limiter = CapacityLimiter(endpoint, policy)
+            _capacity_limiters[endpoint] = limiter
+        elif policy is not None and policy != limiter.policy:
+            logger.warning("⚠️ %s already has a capacity limiter with %s; ignoring the different RateLimitPolicy",
+                           endpoint, limiter.policy)
+        return limiter
+
+
+class _RetryTransport(httpx.BaseTransport):
+    """
+    httpx transport that retries transient failures of the wrapped transport
+    following a RetryPolicy, guards the endpoint with its CircuitBreaker and
+    paces each attempt through the workspace's CapacityLimiter, if any.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, policy: RetryPolicy, breaker: CircuitBreaker,
+                 limiter: Optional[CapacityLimiter] = None):
+        self._transport = transport
+        self.policy = policy
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            probe = self.breaker.before_request()
+            started = self.limiter.acquire() if self.limiter is not None else None
+            response = error = None
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(started, response, error)
+            if error is not None:
+                delay = self.policy.get_delay(attempt)
+                if (probe or not self.policy.should_retry(request, attempt, error=error)
+                        or not _retry_before_deadline(request, delay)):
+                    self.breaker.record_failure()
+                    raise error
+                _log_retry(request, attempt, delay, type(error).__name__)
+            else:
+                if response.status_code not in self.policy.retry_statuses:
+                    self.breaker.record_success()
+                    return response
+                retry_after = _parse_retry_after(response.headers)
+                delay = self.policy.get_delay(attempt, retry_after)
+                if (probe or delay is None
+                        or not self.policy.should_retry(request, attempt, status_code=response.status_code)
+                        or not _retry_before_deadline(request, delay)):
+                    self.breaker.record_failure(retry_after)
+                    return response
+                # Drain the short error body so the connection goes back to the pool
+                response.read()
+                response.close()
+                _log_retry(request, attempt, delay, response.status_code)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """
+    Async flavour of _RetryTransport for httpx.AsyncClient.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, policy: RetryPolicy, breaker: CircuitBreaker,
+                 limiter: Optional[CapacityLimiter] = None):
+        self._transport = transport
+        self.policy = policy
+        self.breaker = breaker
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            probe = self.breaker.before_request()
+            started = await self.limiter.acquire_async() if self.limiter is not None else None
+            response = error = None
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(started, response, error)
+            if error is not None:
+                delay = self.policy.get_delay(attempt)
+                if (probe or not self.policy.should_retry(request, attempt, error=error)
+                        or not _retry_before_deadline(request, delay)):
+                    self.breaker.record_failure()
+                    raise error
+                _log_retry(request, attempt, delay, type(error).__name__)
+            else:
+                if response.status_code not in self.policy.retry_statuses:
+                    self.breaker.record_success()
+                    return response
+                retry_after = _parse_retry_after(response.headers)
+                delay = self.policy.get_delay(attempt, retry_after)
+                if (probe or delay is None
+                        or not self.policy.should_retry(request, attempt, status_code=response.status_code)
+                        or not _retry_before_deadline(request, delay)):
+                    self.breaker.record_failure(retry_after)
+                    return response
+                await response.aread()
+                await response.aclose()
+                _log_retry(request, attempt, delay, response.status_code)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _retry_before_deadline(request: httpx.Request, delay: float) -> bool:
+    """
+    Whether a retry after delay seconds starts before the deadline of the call that sent the request.
+    """
+    deadline = request.extensions.get("deadline")
+    return deadline is None or time.time() + delay < deadline
+
+
+def _log_retry(request: httpx.Request, attempt: int, delay: float, reason):
+    logger.warning("🔁 %s %s failed (%s), retrying in %.2f seconds (attempt %d)",
+                   request.method, request.url.path, reason, delay, attempt + 2,
+                   extra={"phase": "retry", "elapsed": delay})
+
+
+# Innermost open span of the traced call in progress, as a (call trace, span) pair
+_current_span = contextvars.ContextVar("fabric_span", default=None)
+
+# Upper bounds in seconds of the phase latency histogram buckets; the last bucket is open-ended
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+_MAX_EXPORTED_SPAN_CONTEXTS = 4096
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+@dataclass
+class Span:
+    """
+    One timed phase of a client call, shaped like an OpenTelemetry span.
+
+    The trace id is the call's ActivityId (the UUID sent in the ActivityId
+    header, as 32 hex digits), so spans line up with the service-side logs of
+    the same requests.
+
+    Attributes:
+        name (str): The client call (e.g. "ask") or phase (e.g. "thread.lookup", "run.in_progress")
+        trace_id (str): ActivityId of the call as 32 hex digits
+        span_id (str): 16 hex digits
+        parent_span_id (str, optional): The enclosing span, None for the call itself
+        start_time (float): Wall-clock start in seconds since the epoch
+        duration (float): Seconds the phase took
+        attributes (dict): Details such as the thread or run id
+        status (str): "ok" or "error"
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time: float = 0.0
+    duration: float = 0.0
+    attributes: dict = field(default_factory=dict)
+    status: str = "ok"
+
+    @property
+    def end_time(self) -> float:
+        return self.start_time + self.duration
+
+    def to_otlp(self) -> dict:
+        """
+        Return the span in the OTLP/JSON span layout.
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(int(self.start_time * 1e9)),
+            "endTimeUnixNano": str(int(self.end_time * 1e9)),
+            "attributes": [{"key": key, "value": {"stringValue": str(value)}} for key, value in self.attributes.items()],
+            "status": {"code": 2 if self.status == "error" else 1}
+        }
+
+
+@dataclass
+class CallTiming:
+    """
+    Timing record of one client call: where its time went, phase by phase.
+
+    Thread deletes run in the background after the call returns, so they are
+    exported as separate spans of the same trace rather than listed here.
+
+    Attributes:
+        operation (str): The client method, e.g. "ask"
+        activity_id (str): ActivityId sent with every request of the call
+        start_time (float): Wall-clock start in seconds since the epoch
+        duration (float): Seconds the whole call took
+        phases (dict): Seconds per phase name, summed when a phase repeats
+        spans (list): Every finished Span of the call, the call's own span first
+        status (str): "ok", or "error" when the call raised
+    """
+    operation: str
+    activity_id: str
+    start_time: float
+    duration: float
+    phases: dict
+    spans: list
+    status: str = "ok"
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency histogram with fixed bucket bounds (the OpenTelemetry
+    explicit bucket layout), so recording costs the same however many calls are seen.
+    """
+
+    def __init__(self, bounds: tuple = _LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def _percentile(self, pct: float) -> Optional[float]:
+        """
+        Estimate a percentile as the upper bound of the bucket holding it, clamped to min/max.
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return max(self.min, min(upper, self.max))
+        return self.max
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Count, sum, min, max, mean, estimated p50/p95/p99 and the bucket counts
+        """
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "min": self.min,
+                "max": self.max,
+                "mean": self.sum / self.count if self.count else None,
+                "p50": self._percentile(50),
+                "p95": self._percentile(95),
+                "p99": self._percentile(99),
+                "bounds": list(self.bounds),
+                "bucket_counts": list(self.bucket_counts)
+            }
+
+
+class InMemorySpanExporter:
+    """
+    Keeps finished spans and call timings in memory, e.g. to assert on phase timings in tests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+        self._calls = []
+
+    def export(self, spans: list):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def export_call(self, timing: CallTiming):
+        with self._lock:
+            self._calls.append(timing)
+
+    def get_finished_spans(self, name: Optional[str] = None, trace_id: Optional[str] = None) -> list:
+        """
+        Args:
+            name (str, optional): Only spans of this call or phase
+            trace_id (str, optional): Only spans of this trace (ActivityId as 32 hex digits)
+
+        Returns:
+            list: Finished Span objects in export order
+        """
+        with self._lock:
+            return [span for span in self._spans
+                    if (name is None or span.name == name) and (trace_id is None or span.trace_id == trace_id)]
+
+    def get_call_timings(self, operation: Optional[str] = None) -> list:
+        """
+        Returns:
+            list: CallTiming records of finished calls, optionally of one operation only
+        """
+        with self._lock:
+            return [timing for timing in self._calls if operation is None or timing.operation == operation]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._calls.clear()
+
+
+class OpenTelemetrySpanExporter:
+    """
+    Replays finished spans into an OpenTelemetry tracer, keeping the ActivityId as trace id.
+
+    Spans are recreated with their original start and end times; the call span
+    is started under a remote parent carrying the ActivityId, so every phase
+    (including background thread deletes) lands in that one trace.
+
+    Raises:
+        ImportError: If opentelemetry-api is not installed
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("fabric_data_agent_client")
+        self._lock = threading.Lock()
+        # Our span id -> exported OpenTelemetry SpanContext, for children exported later
+        self._span_contexts = OrderedDict()
+
+    def export(self, spans: list):
+        trace = self._trace
+        with self._lock:
+            for span in spans:  # parents come before their children
+                parent = self._span_contexts.get(span.parent_span_id)
+                if parent is None:
+                    parent = trace.SpanContext(
+                        trace_id=int(span.trace_id, 16),
+                        span_id=int(span.parent_span_id or span.span_id, 16),
+                        is_remote=True,
+                        trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+                    )
+                otel_span = self._tracer.start_span(
+                    span.name,
+                    context=trace.set_span_in_context(trace.NonRecordingSpan(parent)),
+                    start_time=int(span.start_time * 1e9),
+                    attributes=span.attributes
+                )
+                if span.status == "error":
+                    otel_span.set_status(trace.Status(trace.StatusCode.ERROR))
+                otel_span.end(end_time=int(span.end_time * 1e9))
+
+                self._span_contexts[span.span_id] = otel_span.get_span_context()
+                while len(self._span_contexts) > _MAX_EXPORTED_SPAN_CONTEXTS:
+                    self._span_contexts.popitem(last=False)
+
+
+class _CallTrace:
+    """
+    The spans of one client call. Spans that finish after the call (background
+    thread deletes) are exported on their own.
+    """
+
+    def __init__(self, operation: str):
+        activity_id = uuid.uuid4()
+        self.root = Span(operation, activity_id.hex, _new_span_id(), start_time=time.time(),
+                         attributes={"fabric.activity_id": str(activity_id)})
+        self.spans = []
+        self.open = True
+        self.lock = threading.Lock()
+        # Wall-clock deadline of the call, passed to the retrying transport
+        self.deadline = None
+
+
+class PhaseTracer:
+    """
+    Times client calls and their phases as spans and aggregates them per phase.
+
+    Each client call (ask(), get_run_details(), ...) is one span whose trace id
+    is the call's ActivityId. Its phases are child spans: "token",
+    "assistants.create", "thread.lookup", "messages.create", "runs.create",
+    "run.queued", "run.in_progress", "runs.cancel", "runs.steps.list",
+    "messages.list" and "thread.delete". Finished calls are handed to the
+    exporters, and every span is added to a latency histogram per name.
+
+    Attributes:
+        exporters (list): Objects with export(spans) and, optionally, export_call(timing)
+    """
+
+    def __init__(self, exporters: Optional[list] = None, buckets: tuple = _LATENCY_BUCKETS):
+        self.exporters = list(exporters or [])
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def start_span(self, name: str, parent: Optional[tuple] = None, attributes: Optional[dict] = None) -> tuple:
+        """
+        Open a span without making it current.
+
+        Args:
+            name (str): Phase name
+            parent (tuple, optional): (call trace, span) pair to nest under; the current span by default
+            attributes (dict, optional): Span attributes
+
+        Returns:
+            tuple: The call trace (None outside a traced call), the span and its perf_counter start
+        """
+        call, parent_span = parent or _current_span.get() or (None, None)
+        if parent_span is not None:
+            trace_id = parent_span.trace_id
+        else:
+            activity_id = _current_activity_id.get()
+            trace_id = uuid.UUID(activity_id).hex if activity_id else uuid.uuid4().hex
+        span = Span(name, trace_id, _new_span_id(), parent_span.span_id if parent_span else None,
+                    start_time=time.time(), attributes=dict(attributes or {}))
+        return call, span, time.perf_counter()
+
+    def end_span(self, opened: tuple, error: bool = False):
+        call, span, started = opened
+        span.duration = time.perf_counter() - started
+        if error:
+            span.status = "error"
+        self._finish(call, span)
+
+    @contextlib.contextmanager
+    def activate(self, call: Optional[_CallTrace], span: Span):
+        """
+        Make a span current, and its trace id the ActivityId of the requests made meanwhile.
+        """
+        token = _current_span.set((call, span))
+        activity_token = _current_activity_id.set(str(uuid.UUID(span.trace_id)))
+        try:
+            yield span
+        finally:
+            _current_activity_id.reset(activity_token)
+            _current_span.reset(token)
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Optional[tuple] = None, attributes: Optional[dict] = None):
+        """
+        Time a phase of the current call.
+
+        Args:
+            name (str): Phase name
+            parent (tuple, optional): (call trace, span) pair captured in another context,
+                                      e.g. by a background thread delete
+            attributes (dict, optional): Span attributes
+
+        Yields:
+            Span: The open span; attributes may still be added
+        """
+        opened = self.start_span(name, parent, attributes)
+        try:
+            with self.activate(*opened[:2]):
+                yield opened[1]
+        except Exception:
+            self.end_span(opened, error=True)
+            raise
+        self.end_span(opened)
+
+    def record_span(self, name: str, start_time: float, end_time: float, attributes: Optional[dict] = None):
+        """
+        Record a phase that was observed rather than wrapped, e.g. the time a run spent queued.
+        """
+        call, span, _ = self.start_span(name, attributes=attributes)
+        span.start_time = start_time
+        span.duration = max(0.0, end_time - start_time)
+        self._finish(call, span)
+
+    def start_call(self, operation: str) -> tuple:
+        """
+        Open the span of a client call; inside another traced call it is one of that call's phases.
+
+        Returns:
+            tuple: As start_span(); pass it to activate() and end_call()
+        """
+        if _current_span.get() is not None:
+            return self.start_span(operation)
+        call = _CallTrace(operation)
+        return call, call.root, time.perf_counter()
+
+    def end_call(self, opened: tuple, error: bool = False) -> Optional[CallTiming]:
+        """
+        Close a call opened with start_call() and export it.
+
+        Returns:
+            CallTiming: The call's timing record, None for a call nested in another
+        """
+        call, span, started = opened
+        if call is None or span is not call.root:
+            self.end_span(opened, error)
+            return None
+
+        span.duration = time.perf_counter() - started
+        if error:
+            span.status = "error"
+        self._histogram(span.name).record(span.duration)
+        with call.lock:
+            call.open = False
+            spans = [span] + call.spans
+
+        phases = {}
+        for phase in spans[1:]:
+            phases[phase.name] = phases.get(phase.name, 0.0) + phase.duration
+        timing = CallTiming(
+            operation=span.name,
+            activity_id=span.attributes["fabric.activity_id"],
+            start_time=span.start_time,
+            duration=span.duration,
+            phases=phases,
+            spans=spans,
+            status=span.status
+        )
+        self._export(spans, timing)
+        return timing
+
+    @contextlib.contextmanager
+    def call(self, operation: str, on_end=None):
+        """
+        Time a whole client call.
+
+        Args:
+            operation (str): The client method
+            on_end (callable, optional): Called with the CallTiming when the call ends
+                                         (not for a call nested in another)
+
+        Yields:
+            Span: The call's span
+        """
+        opened = self.start_call(operation)
+        error = False
+        try:
+            with self.activate(*opened[:2]):
+                yield opened[1]
+        except Exception:
+            error = True
+            raise
+        finally:
+            timing = self.end_call(opened, error)
+            if timing is not None and on_end is not None:
+                on_end(timing)
+
+    def _finish(self, call: Optional[_CallTrace], span: Span):
+        self._histogram(span.name).record(span.duration)
+        if call is not None:
+            with call.lock:
+                if call.open:
+                    call.spans.append(span)
+                    return
+        self._export([span])
+
+    def _export(self, spans: list, timing: Optional[CallTiming] = None):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+                if timing is not None and hasattr(exporter, "export_call"):
+                    exporter.export_call(timing)
+            except Exception as e:
+                logger.warning("⚠️ Warning: Span exporter %s failed: %s", type(exporter).__name__, e)
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram(self.buckets))
+        return histogram
+
+    def get_phase_stats(self) -> dict:
+        """
+        Returns:
+            dict: Histogram snapshot per call and phase name
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _traced_call(operation: str):
+    """
+    Decorator timing a client call - plain, async or a (async) generator - with
+    the owner's tracer and storing the CallTiming as the owner's last_call_timing.
+
+    Generators are timed from the first to the last item; the call's span is
+    only current while the generator runs, not while the caller holds an item.
+    """
+    def decorate(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def wrapper(self, *args, **kwargs):
+                tracer = self.tracer
+                opened = tracer.start_call(operation)
+                generator = func(self, *args, **kwargs)
+                error = False
+                try:
+                    while True:
+                        with tracer.activate(*opened[:2]):
+                            try:
+                                item = await generator.__anext__()
+                            except StopAsyncIteration:
+                                break
+                        yield item
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    await generator.aclose()
+                    timing = tracer.end_call(opened, error)
+                    if timing is not None:
+                        self.last_call_timing = timing
+        elif inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                tracer = self.tracer
+                opened = tracer.start_call(operation)
+                generator = func(self, *args, **kwargs)
+                error = False
+                try:
+                    while True:
+                        with tracer.activate(*opened[:2]):
+                            try:
+                                item = next(generator)
+                            except StopIteration:
+                                break
+                        yield item
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    generator.close()
+                    timing = tracer.end_call(opened, error)
+                    if timing is not None:
+                        self.last_call_timing = timing
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(self, *args, **kwargs):
+                with self.tracer.call(operation, on_end=lambda timing: setattr(self, "last_call_timing", timing)):
+                    return await func(self, *args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                with self.tracer.call(operation, on_end=lambda timing: setattr(self, "last_call_timing", timing)):
+                    return func(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class AssistantCache:
+    """
+    Cache of assistant ids per data agent URL, optionally persisted to a JSON file.
+    
+    Fabric Data Agents ignore the assistant's model and instructions, so one
+    assistant id can be reused for every run against the same agent URL.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path (str, optional): JSON file used to share assistant ids across processes
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = self._load()
+    
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("⚠️ Warning: Could not read assistant cache %s: %s", self.path, e)
+            return {}
+    
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            # Write to a temp file and swap it in so readers never see a partial file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._ids, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("⚠️ Warning: Could not write assistant cache %s: %s", self.path, e)
+    
+    def get(self, data_agent_url: str) -> Optional[str]:
+        with self._lock:
+            return self._ids.get(data_agent_url)
+    
+    def set(self, data_agent_url: str, assistant_id: str):
+        with self._lock:
+            self._ids[data_agent_url] = assistant_id
+            self._save()
+    
+    def invalidate(self, data_agent_url: str, assistant_id: Optional[str] = None):
+        """
+        Drop the cached id for a data agent URL (only if it still matches assistant_id, when given).
+        """
+        with self._lock:
+            if assistant_id is None or self._ids.get(data_agent_url) == assistant_id:
+                self._ids.pop(data_agent_url, None)
+                self._save()
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookups: case, whitespace and trailing punctuation are ignored.
+    
+    Args:
+        question (str): The question as asked
+        
+    Returns:
+        str: The normalized question
+    """
+    return re.sub(r"\s+", " ", question.casefold()).strip().rstrip("?.! ")
+
+
+class AnswerCache:
+    """
+    Base class for ask() answer caches with TTL and LRU eviction.
+    
+    Subclasses implement _get(), _set() and _clear(); hit/miss counting and
+    key building live here.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600):
+        """
+        Args:
+            max_entries (int): Maximum number of answers kept; least recently used are evicted first
+            ttl (float, optional): Seconds an answer stays valid, None for no expiry
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(data_agent_url: str, question: str) -> str:
+        """
+        Build the cache key for a question asked to a data agent.
+        """
+        return hashlib.sha256(f"{data_agent_url}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+    
+    def _is_expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns:
+            str: The cached answer, or None on a miss
+        """
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+    
+    def set(self, key: str, value: str):
+        self._set(key, value)
+    
+    def clear(self):
+        self._clear()
+    
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Hit, miss and eviction counts plus the hit ratio
+        """
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+    
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+    
+    def _set(self, key: str, value: str):
+        raise NotImplementedError
+    
+    def _clear(self):
+        raise NotImplementedError
+
+
+class MemoryAnswerCache(AnswerCache):
+    """
+    In-process answer cache backed by an OrderedDict in LRU order.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600):
+        super().__init__(max_entries, ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self._is_expired(stored_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def _set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskAnswerCache(AnswerCache):
+    """
+    Answer cache stored in a SQLite file, shared by every process that opens the same path.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 10000, ttl: Optional[float] = 3600):
+        """
+        Args:
+            path (str): SQLite database file
+            max_entries (int): Maximum number of answers kept; least recently used are evicted first
+            ttl (float, optional): Seconds an answer stays valid, None for no expiry
+        """
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+    
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, stored_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self._is_expired(stored_at):
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (time.time(), key))
+            return value
+    
+    def _set(self, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+    
+    def _clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls while they are in flight.
+    
+    The first caller of a key runs the call; callers arriving with the same
+    key before it finishes wait for it and get the same result or exception.
+    Sync callers share a concurrent.futures.Future; async callers share a
+    task on their event loop, which is cancelled only once every caller
+    waiting for it has been cancelled or has timed out. A waiting caller
+    gives up after its own timeout with TimeoutError, while the call goes on
+    for the others.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.call_count = 0
+        self.coalesced_count = 0
+    
+    @staticmethod
+    def make_key(data_agent_url: str, question: str, thread_name: Optional[str] = None) -> tuple:
+        """
+        Build the coalescing key of a question asked to a data agent in a thread scope.
+        """
+        return (data_agent_url, normalize_question(question), thread_name)
+    
+    def do(self, key, func, timeout: Optional[float] = None):
+        """
+        Run func(), or wait for the identical call already in flight.
+        
+        Args:
+            key: Identity of the call, e.g. from make_key()
+            func (callable): The call to run when none with this key is in flight
+            timeout (float, optional): Seconds to wait for a call already in flight
+            
+        Returns:
+            The result of the call
+            
+        Raises:
+            TimeoutError: When the call in flight did not finish within timeout
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.call_count += 1
+            else:
+                self.coalesced_count += 1
+        
+        if not leader:
+            logger.info("🔗 Waiting for the identical question already in flight", extra={"phase": "coalesce"})
+            try:
+                return future.result(timeout)
+            except FuturesTimeoutError:
+                raise TimeoutError(f"Identical call still in flight after {timeout} seconds") from None
+        
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+    
+    async def do_async(self, key, func, timeout: Optional[float] = None):
+        """
+        Await func(), or the identical call already in flight on this event loop.
+        
+        Args:
+            key: Identity of the call, e.g. from make_key()
+            func (callable): Coroutine function to run when none with this key is in flight
+            timeout (float, optional): Seconds to wait for a call already in flight
+            
+        Returns:
+            The result of the call
+            
+        Raises:
+            TimeoutError: When the call in flight did not finish within timeout
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            entry = self._tasks.get(task_key)
+            leader = entry is None
+            if leader:
+                entry = self._tasks[task_key] = [loop.create_task(func()), 0]
+                entry[0].add_done_callback(functools.partial(self._forget_task, task_key))
+                self.call_count += 1
+            else:
+                self.coalesced_count += 1
+                logger.info("🔗 Waiting for the identical question already in flight", extra={"phase": "coalesce"})
+            entry[1] += 1
+        
+        task = entry[0]
+        try:
+            if leader or timeout is None:
+                return await asyncio.shield(task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                if task.done():
+                    raise  # The call itself timed out
+                self._stop_waiting(task_key, entry)
+                raise TimeoutError(f"Identical call still in flight after {timeout} seconds") from None
+        except asyncio.CancelledError:
+            self._stop_waiting(task_key, entry)
+            raise
+    
+    def _stop_waiting(self, task_key, entry):
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                # Nobody waits anymore; later callers start a new call instead of joining this one
+                if self._tasks.get(task_key) is entry:
+                    del self._tasks[task_key]
+                entry[0].cancel()
+    
+    def _forget_task(self, task_key, task):
+        with self._lock:
+            entry = self._tasks.get(task_key)
+            if entry is not None and entry[0] is task:
+                del self._tasks[task_key]
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "calls": self.call_count,
+                "coalesced": self.coalesced_count
+            }
+
+
+# Run statuses after which a run no longer consumes capacity
+_FINAL_RUN_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+
+@dataclass
+class PollStrategy:
+    """
+    Delay schedule used while waiting for a run to leave queued/in_progress.
+    
+    Starts with a fast first poll and backs off exponentially with jitter up
+    to max_delay. Subclass and override delays() for a different schedule;
+    PollStrategy(initial_delay=2, multiplier=1, jitter=0) reproduces a fixed 2 s poll.
+    
+    Attributes:
+        initial_delay (float): Seconds before the first status poll
+        multiplier (float): Growth factor applied after each poll
+        max_delay (float): Upper bound for a single delay
+        jitter (float): Relative random spread applied to each delay (0.1 = +/-10%)
+        deadline (float, optional): Hard cap in seconds on the total wait for any run
+        cancel_timeout (float): Seconds to wait for the server to acknowledge a cancel after the deadline
+        cancel_poll_interval (float): Delay between status polls while a cancel is pending
+    """
+    initial_delay: float = 0.2
+    multiplier: float = 1.5
+    max_delay: float = 3.0
+    jitter: float = 0.1
+    deadline: Optional[float] = None
+    cancel_timeout: float = 5.0
+    cancel_poll_interval: float = 0.25
+    
+    def delays(self):
+        """
+        Yield the successive delays between status polls.
+        """
+        delay = self.initial_delay
+        while True:
+            yield max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+            delay = min(delay * self.multiplier, self.max_delay)
+    
+    def get_deadline(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Combine a per-call timeout with the strategy deadline.
+        
+        Returns:
+            float: Wait budget in seconds, or None when unbounded
+        """
+        limits = [limit for limit in (timeout, self.deadline) if limit is not None]
+        return min(limits) if limits else None
+    
+    def start_deadline(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Start the wait budget of a call now.
+        
+        Entry points take this once, before creating the thread, so thread
+        setup, the run and its cancellation all share one deadline.
+        
+        Returns:
+            float: Wall-clock time the budget runs out, or None when unbounded
+        """
+        budget = self.get_deadline(timeout)
+        return None if budget is None else time.time() + budget
+
+
+@dataclass
+class PollMetrics:
+    """
+    Polling statistics for a single run.
+    
+    Attributes:
+        poll_count (int): Number of runs.retrieve calls
+        total_wait (float): Seconds spent sleeping between polls
+        wasted_wait (float): Upper bound on seconds between the run finishing and the client noticing
+        elapsed (float): Seconds from run creation to the final status
+        timed_out (bool): Whether the wait stopped at the deadline
+        cancel_requested (bool): Whether runs.cancel was accepted after the deadline
+        cancelled (bool): Whether the server acknowledged the cancel within cancel_timeout
+    """
+    poll_count: int = 0
+    total_wait: float = 0.0
+    wasted_wait: float = 0.0
+    elapsed: float = 0.0
+    timed_out: bool = False
+    cancel_requested: bool = False
+    cancelled: bool = False
+    
+    def record_final(self, run, started_at: float, last_pending_at: float):
+        """
+        Fill in elapsed and wasted time once a run leaves queued/in_progress.
+        
+        Args:
+            run: The run in its final observed state
+            started_at (float): Wall-clock time the wait started
+            last_pending_at (float): Wall-clock time the run was last seen queued/in_progress
+        """
+        detected_at = time.time()
+        self.elapsed = detected_at - started_at
+        if self.poll_count and not self.timed_out:
+            # The previous poll still saw the run going, so it finished after that;
+            # the server timestamp (whole seconds) can only narrow the window.
+            finished_at = max(
+                (ts for ts in (getattr(run, "completed_at", None), getattr(run, "failed_at", None),
+                               getattr(run, "cancelled_at", None), getattr(run, "expired_at", None)) if ts),
+                default=None
+            )
+            window_start = max(last_pending_at, finished_at) if finished_at else last_pending_at
+            self.wasted_wait = max(0.0, detected_at - window_start)
+
+
+@dataclass
+class RunTimeout:
+    """
+    Typed result for a run that did not finish before its deadline.
+    
+    The run is cancelled server-side when the deadline expires, so it stops
+    consuming Fabric capacity. ask() raises it as RunTimeoutError.result;
+    get_run_details() and get_raw_run_response() report it as "run_timeout".
+    A caller of ask() that only waited for the identical question another
+    caller is running gets one without thread and run (status "waiting");
+    that run is not cancelled.
+    
+    Attributes:
+        thread_id (str, optional): The thread the run belongs to
+        run_id (str, optional): The run that timed out
+        timeout (float, optional): The wait budget in seconds
+        elapsed (float): Seconds from the start of the wait to the final status
+        status (str): Last observed run status, "cancelled" once the cancel is acknowledged
+        cancelled (bool): Whether the server acknowledged the cancel
+    """
+    thread_id: Optional[str]
+    run_id: Optional[str]
+    timeout: Optional[float]
+    elapsed: float
+    status: str
+    cancelled: bool
+    
+    def __str__(self) -> str:
+        if self.run_id is None:
+            return f"Gave up after {self.timeout} seconds waiting for the identical question already in flight"
+        outcome = "was cancelled" if self.cancelled else f"is still '{self.status}' (cancel not acknowledged)"
+        return f"Run {self.run_id} timed out after {self.timeout} seconds and {outcome}"
+
+
+class RunTimeoutError(FabricAgentError, TimeoutError):
+    """
+    Raised by ask(), Conversation.ask() and the row and table APIs when a run
+    does not finish before its deadline.
+    
+    Attributes:
+        result (RunTimeout): Details of the timed out (and cancelled) run
+    """
+    
+    def __init__(self, result: RunTimeout):
+        super().__init__(str(result))
+        self.result = result
+
+
+@dataclass
+class StreamEvent:
+    """
+    An event yielded by ask_stream() while a run is in progress.
+    
+    Attributes:
+        type (str): "status", "text_delta", "tool_call", "sql" or "timeout"
+        value (Any): The new status, the text fragment, the tool call, the SQL query or a RunTimeout
+        run_id (str, optional): The run the event belongs to
+    """
+    type: str
+    value: Any = None
+    run_id: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of one question in an ask_many() batch.
+    
+    Attributes:
+        index (int): Position of the question in the input list
+        question (str): The question that was asked
+        response (str, optional): The data agent's answer, when the call succeeded
+        error (Exception, optional): The exception raised for this question, if any;
+                                     a RunTimeoutError when its run hit the deadline
+        elapsed (float): Seconds spent on this question
+    """
+    index: int
+    question: str
+    response: Optional[str] = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        # A timed out run is a failure: ask() raised RunTimeoutError for it
+        return self.error is None
+
+
+# array.array type codes for the numeric ResultTable columns
+_ARRAY_TYPECODES = {"int64": "q", "float64": "d"}
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _infer_column_dtype(values: list) -> str:
+    """
+    Infer a column type from decoded JSON values: int64, float64, bool, boolean, string or object.
+    
+    Integer columns with missing values become float64 (missing values are NaN),
+    like pandas does; bool columns with missing values become the nullable
+    "boolean" type.
+    """
+    kinds = {type(value) for value in values if value is not None}
+    if not kinds:
+        return "object"
+    if kinds == {bool}:
+        return "bool" if None not in values else "boolean"
+    if kinds == {int}:
+        present = [value for value in values if value is not None]
+        if min(present) < _INT64_MIN or max(present) > _INT64_MAX:
+            return "object"
+        return "int64" if len(present) == len(values) else "float64"
+    if kinds <= {int, float}:
+        return "float64"
+    if kinds == {str}:
+        return "string"
+    return "object"
+
+
+def _build_column(values: list, dtype: str):
+    """
+    Store column values in a NumPy array (or an array.array / list without NumPy).
+    """
+    if dtype == "float64":
+        values = [math.nan if value is None else value for value in values]
+    if np is not None:
+        if dtype in ("boolean", "string", "object"):
+            return np.fromiter(values, dtype=object, count=len(values))
+        return np.array(values, dtype=dtype)
+    if dtype in _ARRAY_TYPECODES:
+        return array(_ARRAY_TYPECODES[dtype], values)
+    return list(values)
+
+
+class ResultTable:
+    """
+    A complete tool-output row set stored as typed columns.
+    
+    Columns are NumPy arrays when NumPy is installed, otherwise array.array
+    (numeric columns) or lists. Numeric columns export to pandas and Arrow
+    without copying, and markdown is only rendered when to_markdown() is called.
+    Bool columns with missing values ("boolean") hold True, False and None and
+    export as pandas' nullable boolean dtype and as Arrow bool with nulls.
+    
+    Attributes:
+        columns (dict): Column name -> column values, in the order of the output
+        dtypes (dict): Column name -> "int64", "float64", "bool", "boolean", "string" or "object"
+        sql (str, optional): The SQL query that produced the rows, if known
+    """
+    
+    def __init__(self, columns: dict, dtypes: dict, sql: Optional[str] = None):
+        self.columns = columns
+        self.dtypes = dtypes
+        self.sql = sql
+    
+    @classmethod
+    def from_records(cls, records, sql: Optional[str] = None) -> "ResultTable":
+        """
+        Build a table from decoded JSON records (any iterable of dicts).
+        
+        Records are consumed one at a time into per-column value lists, so a lazy
+        row iterator is never held as a list of dicts. Columns are the union of
+        the record keys in first-seen order; keys a record does not have are
+        missing values.
+        """
+        values = {}
+        count = 0
+        for record in records:
+            for name in record:
+                if name not in values:
+                    values[name] = [None] * count
+            for name, column_values in values.items():
+                column_values.append(record.get(name))
+            count += 1
+        
+        columns = {}
+        dtypes = {}
+        for name, column_values in values.items():
+            dtypes[name] = _infer_column_dtype(column_values)
+            columns[name] = _build_column(column_values, dtypes[name])
+        return cls(columns, dtypes, sql=sql)
+    
+    @property
+    def column_names(self) -> list:
+        return list(self.columns)
+    
+    @property
+    def num_rows(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+    
+    def __len__(self) -> int:
+        return self.num_rows
+    
+    def __getitem__(self, name: str):
+        return self.columns[name]
+    
+    def __repr__(self) -> str:
+        return f"ResultTable(rows={self.num_rows}, dtypes={self.dtypes})"
+    
+    def to_records(self, max_rows: Optional[int] = None) -> list:
+        """
+        Return the rows (or the first max_rows rows) as dicts with plain Python values.
+        """
+        values = []
+        for column in self.columns.values():
+            column = column[:max_rows]
+            values.append(column.tolist() if hasattr(column, 'tolist') else column)
+        names = self.column_names
+        return [dict(zip(names, row)) for row in zip(*values)]
+    
+    def to_pandas(self):
+        """
+        Return the table as a pandas DataFrame, sharing the NumPy column buffers.
+        
+        Raises:
+            ImportError: If pandas is not installed
+        """
+        import pandas as pd
+        
+        columns = {
+            name: pd.array(column, dtype="boolean") if self.dtypes[name] == "boolean" else column
+            for name, column in self.columns.items()
+        }
+        # copy=False keeps every column in its own block, backed by our arrays
+        return pd.DataFrame(columns, columns=self.column_names, copy=False)
+    
+    def to_arrow(self):
+        """
+        Return the table as a pyarrow Table. Numeric columns wrap the existing buffers.
+        
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        import pyarrow as pa
+        
+        arrays = []
+        for name, column in self.columns.items():
+            dtype = self.dtypes[name]
+            if isinstance(column, array):
+                arrow_type = pa.int64() if dtype == "int64" else pa.float64()
+                arrays.append(pa.Array.from_buffers(arrow_type, len(column), [None, pa.py_buffer(column)]))
+            elif dtype == "boolean":
+                arrays.append(pa.array(list(column), type=pa.bool_()))
+            elif dtype == "object":
+                # Mixed values have no single Arrow type; keep them as text
+                arrays.append(pa.array([None if value is None else str(value) for value in column], type=pa.string()))
+            else:
+                arrays.append(pa.array(column, type=pa.string() if dtype == "string" else None))
+        return pa.Table.from_arrays(arrays, names=self.column_names)
+    
+    def to_markdown(self, max_rows: Optional[int] = 10) -> str:
+        """
+        Render the table (or its first max_rows rows) as a markdown table.
+        """
+        names = self.column_names
+        if not names:
+            return ""
+        lines = ["| " + " | ".join(names) + " |", "|" + "---|" * len(names)]
+        for row in self.to_records(max_rows):
+            values = ["" if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+                      for value in row.values()]
+            lines.append("| " + " | ".join(values) + " |")
+        return "\n".join(lines)
+
+
+def _is_stale_assistant_error(error: Exception) -> bool:
+    """
+    Check whether a run creation error means the cached assistant id was rejected.
+    
+    A 404 from runs.create may just as well be about the thread, so only an
+    error whose message, param or body names the assistant counts.
+    """
+    if not isinstance(error, (NotFoundError, BadRequestError)):
+        return False
+    details = f"{error} {getattr(error, 'param', None) or ''} {getattr(error, 'body', None) or ''}"
+    return "assistant" in details.lower()
+
+
+class _FileLock:
+    """
+    Exclusive inter-process lock on a side file (fcntl on POSIX, msvcrt on Windows).
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+# Shortest wait between two background refreshes of short-lived tokens
+_MIN_TOKEN_REFRESH_INTERVAL = 5.0
+
+
+class TokenBroker:
+    """
+    Hands out Fabric access tokens and refreshes them before they expire.
+    
+    - A background thread refreshes the token refresh_margin seconds ahead of
+      expiry, so callers almost never wait on Azure AD
+    - Refreshes are single-flight: concurrent callers share one refresh
+    - With cache_path, tokens are shared across processes through a file-locked
+      JSON cache, so new workers reuse a valid token instead of signing in again
+    
+    The cache file holds bearer tokens in plain text; keep it in a private location.
+    """
+    
+    def __init__(self, credential, scope: str = FABRIC_SCOPE, refresh_margin: float = 300,
+                 background_refresh: bool = True, cache_path: Optional[str] = None, cache_key: Optional[str] = None):
+        """
+        Args:
+            credential: Any azure-identity credential (an object with get_token())
+            scope (str): Token scope to request
+            refresh_margin (float): Seconds before expiry at which a token is refreshed
+            background_refresh (bool): Refresh ahead of expiry on a daemon thread
+            cache_path (str, optional): JSON file used to share tokens across processes
+            cache_key (str, optional): Entry name in the cache file, e.g. the tenant id
+        """
+        self.credential = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self.cache_path = cache_path
+        self.cache_key = cache_key or scope
+        self.refresh_count = 0
+        self._token = None
+        self._token_set_at = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._refresh_thread = None
+    
+    def _is_fresh(self, token, margin: float) -> bool:
+        return token is not None and token.expires_on > time.time() + margin
+    
+    def needs_refresh(self) -> bool:
+        """
+        Whether get_token() would block on a refresh right now.
+        """
+        return not self._is_fresh(self._token, min(60, self.refresh_margin))
+    
+    def get_token(self) -> AccessToken:
+        """
+        Get a valid token, blocking only if the current one is (nearly) expired.
+        
+        Returns:
+            AccessToken: The current token
+        """
+        token = self._token
+        if self._is_fresh(token, self.refresh_margin):
+            return token
+        if not self.needs_refresh():
+            # Still usable: hand it out and let the background thread replace it
+            self._wake_event.set()
+            return token
+        return self.refresh()
+    
+    def refresh(self, force: bool = False) -> AccessToken:
+        """
+        Refresh the token (single-flight); callers that queued behind a refresh reuse its result.
+        
+        Args:
+            force (bool): Fetch a new token even if the current one is still fresh
+            
+        Returns:
+            AccessToken: The refreshed token
+        """
+        stale_token = self._token
+        with self._refresh_lock:
+            # Someone else refreshed while we were waiting for the lock
+            if self._token is not stale_token and self._is_fresh(self._token, self.refresh_margin):
+                return self._token
+            if not force and self._is_fresh(self._token, self.refresh_margin):
+                return self._token
+            if (not force and self._is_fresh(self._token, 0)
+                    and time.time() - self._token_set_at < _MIN_TOKEN_REFRESH_INTERVAL):
+                return self._token  # Short-lived token that was just fetched
+            
+            if self.cache_path:
+                with _FileLock(f"{self.cache_path}.lock"):
+                    token = None if force else self._read_cached_token()
+                    if token is None:
+                        token = self._fetch_token()
+                        self._write_cached_token(token)
+            else:
+                token = self._fetch_token()
+            
+            self._token = token
+            self._token_set_at = time.time()
+            self._ensure_refresh_thread()
+            return token
+    
+    def _fetch_token(self) -> AccessToken:
+        if self.credential is None:
+            raise ValueError("No credential available")
+        token = self.credential.get_token(self.scope)
+        self.refresh_count += 1
+        return token
+    
+    def _read_cached_token(self) -> Optional[AccessToken]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(self.cache_key)
+        except (OSError, ValueError, AttributeError):
+            return None
+        if not entry:
+            return None
+        token = AccessToken(entry["token"], int(entry["expires_on"]))
+        return token if self._is_fresh(token, self.refresh_margin) else None
+    
+    def _write_cached_token(self, token: AccessToken):
+        try:
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            entries[self.cache_key] = {"token": token.token, "expires_on": token.expires_on}
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            # Tokens are secrets: create the file readable by the current user only
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("⚠️ Warning: Could not write token cache %s: %s", self.cache_path, e)
+    
+    def _ensure_refresh_thread(self):
+        if not self.background_refresh or self._stop_event.is_set():
+            return
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name="fabric-token-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+    
+    def _next_refresh_at(self) -> float:
+        token, set_at = self._token, self._token_set_at
+        if token is None:
+            return time.time() + 30.0
+        due = token.expires_on - self.refresh_margin
+        if set_at is not None:
+            # A token living shorter than refresh_margin is due as soon as it arrives;
+            # refresh it halfway through its lifetime instead of over and over
+            due = max(due, set_at + max((token.expires_on - set_at) / 2, _MIN_TOKEN_REFRESH_INTERVAL))
+        return due
+    
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            due = self._next_refresh_at()
+            self._wake_event.wait(max(due - time.time(), 0))
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            # Woken early by get_token(): only a nearly expired token is refreshed ahead of schedule
+            if time.time() < due and not self.needs_refresh():
+                continue
+            if self._is_fresh(self._token, self.refresh_margin):
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("⚠️ Warning: Background token refresh failed: %s", e, extra={"phase": "token"})
+                self._stop_event.wait(30)
+    
+    def close(self):
+        """
+        Stop the background refresh thread.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+class ThreadCleanupQueue:
+    """
+    Deletes finished threads in the background, off the request path.
+    
+    - Deletes run on up to max_workers daemon threads (or as asyncio tasks
+      for the async client), so callers never wait on the delete round trip
+    - Failed deletes are retried with exponential backoff; a thread that is
+      already gone counts as deleted
+    - With journal_path, every generated external-client-thread-* thread is
+      recorded in a SQLite journal until its delete succeeds, so threads left
+      behind by a crashed process can be found and swept later
+    
+    Pending deletes are flushed when the owning client is closed and at
+    interpreter exit. Async deletes are tasks on the event loop, so they are
+    dropped if the loop ends before the async client is closed with aclose().
+    """
+    
+    def __init__(self, max_workers: int = 4, max_retries: int = 3, retry_delay: float = 0.5,
+                 journal_path: Optional[str] = None):
+        """
+        Args:
+            max_workers (int): Maximum number of deletes in flight at once
+            max_retries (int): Retries per thread after the first failed delete
+            retry_delay (float): Delay before the first retry, doubled for each further retry
+            journal_path (str, optional): SQLite file recording generated threads until they are deleted
+        """
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.journal_path = journal_path
+        self.deleted_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+        self._queue = queue.Queue()
+        self._workers = []
+        self._tasks = set()
+        # One semaphore per event loop: asyncio primitives are bound to the loop that first uses them
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._journal = None
+        if journal_path:
+            self._journal = sqlite3.connect(journal_path, check_same_thread=False, timeout=30)
+            with self._journal:
+                self._journal.execute(
+                    "CREATE TABLE IF NOT EXISTS threads ("
+                    "thread_id TEXT PRIMARY KEY, thread_name TEXT NOT NULL, pid INTEGER NOT NULL, created_at REAL NOT NULL)"
+                )
+    
+    def track(self, thread_id: str, thread_name: str):
+        """
+        Record a generated thread in the journal until its delete succeeds.
+        """
+        if self._journal is None:
+            return
+        with self._lock, self._journal:
+            self._journal.execute(
+                "INSERT OR REPLACE INTO threads (thread_id, thread_name, pid, created_at) VALUES (?, ?, ?, ?)",
+                (thread_id, thread_name, os.getpid(), time.time())
+            )
+    
+    def orphaned_threads(self, min_age: float = 3600) -> list:
+        """
+        List journaled threads that were never deleted.
+        
+        Args:
+            min_age (float): Only threads created at least this many seconds ago,
+                             so threads of runs still in progress are left alone
+            
+        Returns:
+            list: Thread ids, oldest first
+        """
+        if self._journal is None:
+            return []
+        with self._lock:
+            rows = self._journal.execute(
+                "SELECT thread_id FROM threads WHERE created_at <= ? ORDER BY created_at",
+                (time.time() - min_age,)
+            ).fetchall()
+        return [thread_id for (thread_id,) in rows]
+    
+    def submit(self, thread_id: str, delete):
+        """
+        Queue a thread for deletion on a background worker.
+        
+        Args:
+            thread_id (str): The thread to delete
+            delete (callable): Called with the thread id to delete it
+        """
+        with self._lock:
+            self._pending += 1
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._worker_loop, name=f"fabric-thread-cleanup-{len(self._workers)}", daemon=True
+                )
+                self._workers.append(worker)
+                worker.start()
+                _cleanup_queues.add(self)
+        self._queue.put((thread_id, delete))
+    
+    def submit_async(self, thread_id: str, delete):
+        """
+        Schedule a thread deletion as a task on the running event loop.
+        
+        Args:
+            thread_id (str): The thread to delete
+            delete (callable): Coroutine function called with the thread id to delete it
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_workers)
+        task = loop.create_task(self._adelete(thread_id, delete, semaphore))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            thread_id, delete = item
+            for attempt in range(self.max_retries + 1):
+                try:
+                    delete(thread_id)
+                except NotFoundError:
+                    pass  # Already gone
+                except Exception as e:
+                    if self._should_retry(thread_id, attempt, e):
+                        time.sleep(self.retry_delay * 2 ** attempt)
+                        continue
+                    break
+                self._record_deleted(thread_id)
+                break
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+    
+    async def _adelete(self, thread_id: str, delete, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await delete(thread_id)
+                except NotFoundError:
+                    pass  # Already gone
+                except Exception as e:
+                    if self._should_retry(thread_id, attempt, e):
+                        await asyncio.sleep(self.retry_delay * 2 ** attempt)
+                        continue
+                    return
+                self._record_deleted(thread_id)
+                return
+    
+    def _should_retry(self, thread_id: str, attempt: int, error: Exception) -> bool:
+        with self._lock:
+            if attempt < self.max_retries:
+                self.retry_count += 1
+                return True
+            self.failed_count += 1
+        logger.warning("⚠️ Warning: Thread cleanup failed for %s: %s", thread_id, error,
+                       extra={"thread_id": thread_id, "phase": "thread.delete"})
+        return False
+    
+    def _record_deleted(self, thread_id: str):
+        with self._lock:
+            self.deleted_count += 1
+            if self._journal is not None:
+                with self._journal:
+                    self._journal.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued delete has finished (or given up).
+        
+        Returns:
+            bool: True if the queue drained within the timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+    
+    async def aflush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every delete scheduled with submit_async() on this loop has finished.
+        
+        Returns:
+            bool: True if the deletes finished within the timeout
+        """
+        loop = asyncio.get_running_loop()
+        tasks = [task for task in self._tasks if task.get_loop() is loop]
+        if not tasks:
+            return True
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+    
+    def stats(self) -> dict:
+        """
+        Get cleanup counters.
+        
+        Returns:
+            dict: Deleted, failed, retried and pending thread counts
+        """
+        with self._lock:
+            return {
+                "deleted": self.deleted_count,
+                "failed": self.failed_count,
+                "retries": self.retry_count,
+                "pending": self._pending + len(self._tasks)
+            }
+    
+    def close(self, timeout: Optional[float] = 10):
+        """
+        Flush pending deletes, stop the workers and close the journal.
+        """
+        self.flush(timeout)
+        with self._lock:
+            workers, self._workers = self._workers, []
+            for _ in workers:
+                self._queue.put(None)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+# Queues with background workers, flushed at interpreter exit so queued deletes are not lost
+_cleanup_queues = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_cleanup_queues():
+    for cleanup_queue in list(_cleanup_queues):
+        cleanup_queue.flush(timeout=10)
+
+
+class _RunWait:
+    """
+    Bookkeeping of one wait for a run: poll delays, the deadline, PollMetrics
+    and the run.queued / run.in_progress spans.
+    
+    Shared by the blocking and the asyncio polling loops, which only sleep,
+    poll and cancel.
+    """
+    
+    def __init__(self, client: "_FabricDataAgentClientBase", thread_id: str, run, deadline: Optional[float]):
+        self.client = client
+        self.thread_id = thread_id
+        self.deadline = deadline
+        self.metrics = PollMetrics()
+        self._delays = client.poll_strategy.delays()
+        self.started_at = self._last_poll_at = self._last_pending_at = time.time()
+        self._phase_status, self._phase_started = run.status, self.started_at
+    
+    def next_delay(self, run) -> Optional[float]:
+        """
+        Get the delay before the next poll of a run still queued/in_progress.
+        
+        Returns:
+            float: Seconds to sleep, or None once the deadline has passed and the run has to be cancelled
+        """
+        self._last_pending_at = self._last_poll_at
+        remaining = None if self.deadline is None else self.deadline - time.time()
+        if remaining is not None and remaining <= 0:
+            logger.warning("⏰ Request timed out, cancelling run %s", run.id,
+                           extra={"thread_id": self.thread_id, "run_id": run.id, "phase": run.status,
+                                  "elapsed": time.time() - self.started_at})
+            self.metrics.timed_out = True
+            self.client._record_run_phase(run.id, self._phase_status, self._phase_started)
+            self._phase_status = None
+            return None
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("⏳ Status: %s", run.status, extra={"thread_id": self.thread_id, "run_id": run.id, "phase": run.status,
+                                                           "elapsed": time.time() - self.started_at})
+        delay = next(self._delays)
+        if remaining is not None:
+            delay = min(delay, remaining)
+        self.metrics.total_wait += delay
+        return delay
+    
+    def polled(self, run, polled_at: float):
+        """
+        Record a status poll sent at polled_at.
+        """
+        self._last_poll_at = polled_at
+        self.metrics.poll_count += 1
+        if run.status != self._phase_status:
+            self.client._record_run_phase(run.id, self._phase_status, self._phase_started)
+            self._phase_status, self._phase_started = run.status, time.time()
+    
+    def cancelled(self, run, cancelled_run):
+        """
+        Record the outcome of cancelling the run at the deadline and return the run to report.
+        """
+        if cancelled_run is None:
+            return run
+        self.metrics.cancel_requested = True
+        self.metrics.cancelled = cancelled_run.status == "cancelled"
+        return cancelled_run
+    
+    def finish(self, run) -> tuple:
+        """
+        Close the wait once the run has left queued/in_progress (or was cancelled).
+        
+        Returns:
+            tuple: The run and its PollMetrics
+        """
+        self.client._record_run_phase(run.id, self._phase_status, self._phase_started)
+        self.metrics.record_final(run, self.started_at, self._last_pending_at)
+        self.client.last_poll_metrics = self.metrics
+        return run, self.metrics
+
+
+class _StreamWatch:
+    """
+    Run status, phase spans and deadline of one ask_stream() call, shared by
+    the blocking and the asyncio stream loops.
+    """
+    
+    def __init__(self, client: "_FabricDataAgentClientBase", thread_id: str, deadline: Optional[float],
+                 timeout: Optional[float]):
+        self.client = client
+        self.thread_id = thread_id
+        self.deadline = deadline
+        self.timeout = timeout
+        self.run_id = None
+        self.run_status = None
+        self.status_since = None
+        self.timed_out = False
+    
+    def observe(self, stream_event: StreamEvent):
+        if stream_event.type == "status" and stream_event.value != self.run_status:
+            self.client._record_run_phase(self.run_id, self.run_status, self.status_since)
+            self.run_id, self.run_status, self.status_since = stream_event.run_id, stream_event.value, time.time()
+    
+    def run_options(self) -> dict:
+        """
+        runs.create arguments of the stream; no read of it may wait past the deadline.
+        """
+        options = {"stream": True}
+        if self.deadline is not None:
+            options["timeout"] = httpx.Timeout(self.client.transport_config.timeout, read=self.remaining())
+        return options
+    
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left until the deadline (a small positive floor once it has passed), None when unbounded.
+        """
+        return None if self.deadline is None else max(self.deadline - time.time(), 0.001)
+    
+    def expired(self) -> bool:
+        """
+        Whether the deadline has passed while the run is still going; the stream should then stop.
+        """
+        if self.deadline is None or time.time() < self.deadline or self.run_status in _FINAL_RUN_STATUSES:
+            return False
+        logger.warning("⏰ Stream timed out after %s seconds, cancelling run %s", self.timeout, self.run_id,
+                       extra={"thread_id": self.thread_id, "run_id": self.run_id, "phase": self.run_status})
+        self.timed_out = True
+        return True
+    
+    def stalled(self) -> bool:
+        """
+        Whether a read that timed out was cut off by the deadline rather than by the network timeout.
+        """
+        if self.deadline is None or time.time() < self.deadline:
+            return False
+        self.expired()
+        return True
+    
+    def finish(self):
+        self.client._record_run_phase(self.run_id, self.run_status, self.status_since)
+
+
+class _FabricDataAgentClientBase:
+    """
+    Configuration, request building and response parsing shared by
+    FabricDataAgentClient and AsyncFabricDataAgentClient.
+    
+    Nothing here does network I/O; the subclasses implement the calls
+    themselves, blocking or awaitable, on top of these helpers.
+    """
+    
+    # Use the previous backtracking regexes instead of the linear-time SQL scanner
+    legacy_sql_regex = False
+    
+    # Log every SQL query found by get_run_details() with its data preview (INFO level)
+    log_sql_previews = False
+    
+    def __init__(self, tenant_id: str, data_agent_url: str, transport_config: Optional[TransportConfig] = None,
+                 assistant_cache: Optional[AssistantCache] = None, poll_strategy: Optional[PollStrategy] = None,
+                 answer_cache: Optional[AnswerCache] = None, token_broker: Optional[TokenBroker] = None,
+                 thread_cleanup: Optional[ThreadCleanupQueue] = None, tracer: Optional[PhaseTracer] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limit: Optional[RateLimitPolicy] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        """
+        Initialize the Fabric Data Agent client.
+        
+        Args:
+            tenant_id (str): Your Azure tenant ID
+            data_agent_url (str): The published URL of your Fabric Data Agent
+            transport_config (TransportConfig, optional): Connection pool settings
+            assistant_cache (AssistantCache, optional): Shared or persistent assistant id cache
+            poll_strategy (PollStrategy, optional): Delay schedule and deadline for run polling
+            answer_cache (AnswerCache, optional): Opt-in cache of ask() answers
+            token_broker (TokenBroker, optional): Shared token source; skips interactive sign-in setup
+            thread_cleanup (ThreadCleanupQueue, optional): Shared or journaled background thread deletion
+            tracer (PhaseTracer, optional): Shared phase tracer, e.g. with an exporter attached
+            retry_policy (RetryPolicy, optional): Retries of transient failures and circuit breaker settings
+            rate_limit (RateLimitPolicy, optional): Opt-in request rate and adaptive concurrency limits, shared per workspace
+            single_flight (SingleFlight, optional): Coalescing of identical ask() calls in flight, to share across clients
+        """
+        self.tenant_id = tenant_id
+        self.data_agent_url = data_agent_url
+        self.credential = None
+        self.token = None
+        self.transport_config = transport_config or TransportConfig()
+        self.transport_stats = TransportStats()
+        self._http_client = None
+        self._openai_client = None
+        self._transport_lock = threading.RLock()
+        self.assistant_cache = assistant_cache or AssistantCache()
+        self._assistant_lock = threading.Lock()
+        self.poll_strategy = poll_strategy or PollStrategy()
+        self.last_poll_metrics = None
+        self.answer_cache = answer_cache
+        self.single_flight = single_flight or SingleFlight()
+        self.token_broker = token_broker
+        self._owns_token_broker = token_broker is None
+        self.thread_cleanup = thread_cleanup or ThreadCleanupQueue()
+        self._owns_thread_cleanup = thread_cleanup is None
+        self.tracer = tracer or PhaseTracer()
+        self.last_call_timing = None
+        self._conversations = weakref.WeakSet()
+        self._message_cursors = OrderedDict()
+        self._cursor_lock = threading.Lock()
+        
+        # Validate inputs
+        if not tenant_id:
+            raise ValueError("tenant_id is required")
+        if not data_agent_url:
+            raise ValueError("data_agent_url is required")
+        
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = get_circuit_breaker(data_agent_url, retry_policy)
+        self.capacity_limiter = get_capacity_limiter(data_agent_url, rate_limit) if rate_limit is not None else None
+        
+        logger.info("Initializing Fabric Data Agent Client...")
+        logger.info("Tenant ID: %s", tenant_id)
+        logger.info("Data Agent URL: %s", data_agent_url)
+        
+        self._authenticate()
+    
+    def _create_token_broker(self):
+        """
+        Set up the interactive browser credential and its TokenBroker, unless a broker was passed in.
+        
+        Nothing is fetched yet; the browser sign-in starts with the first token request.
+        """
+        if self.token_broker is None:
+            logger.info("A browser window will open for you to sign in to your Microsoft account.")
+            
+            # Create credential for interactive authentication
+            self.credential = InteractiveBrowserCredential(
+                tenant_id=self.tenant_id,
+                # Optional: specify redirect_uri if needed
+                # redirect_uri="http://localhost:8400"
+            )
+            self.token_broker = TokenBroker(self.credential, cache_key=self.tenant_id)
+        else:
+            self.credential = self.token_broker.credential
+    
+    def _get_http_client_options(self) -> dict:
+        """
+        Build the httpx client options from the transport configuration.
+        
+        Returns:
+            dict: Keyword arguments for httpx.Client / httpx.AsyncClient
+        """
+        return {
+            "timeout": self.transport_config.timeout,
+            "headers": {
+                "Accept": "application/json",
+                "Content-Type": "application/json"
+            }
+        }
+
+    def _get_transport_options(self) -> dict:
+        """
+        Build the connection pool options from the transport configuration.
+        
+        Returns:
+            dict: Keyword arguments for httpx.HTTPTransport / httpx.AsyncHTTPTransport
+        """
+        config = self.transport_config
+        http2 = config.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️ HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+                http2 = False
+        
+        return {
+            "limits": httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry
+            ),
+            "http2": http2
+        }
+
+    def _prepare_request(self, request: httpx.Request):
+        """
+        Request hook: swap in the current bearer token and correlation id.
+        
+        Reading the token per request means a refresh takes effect in place,
+        without rebuilding the client or its connection pool.
+        """
+        self._stamp_request(request, self.token_broker.get_token(), self.transport_stats.trace)
+
+    def _stamp_request(self, request: httpx.Request, token: AccessToken, trace):
+        """
+        Set the bearer token, correlation id, call deadline and connection trace hook of a request.
+        """
+        request.headers["Authorization"] = f"Bearer {token.token}"
+        request.headers["ActivityId"] = _current_activity_id.get() or str(uuid.uuid4())
+        current = _current_span.get()
+        # Spans opened outside a traced call have no call trace. Background deletes run
+        # after their call has ended and are not bound by its deadline
+        if (current is not None and current[0] is not None and current[0].open
+                and current[0].deadline is not None):
+            request.extensions["deadline"] = current[0].deadline
+        request.extensions["trace"] = trace
+        self.transport_stats.record_request()
+
+    def get_transport_stats(self) -> dict:
+        """
+        Get connection reuse counters for this client.
+        
+        Returns:
+            dict: Request, new connection and reused connection counts
+        """
+        return self.transport_stats.snapshot()
+
+    def get_phase_stats(self) -> dict:
+        """
+        Get latency histograms of the calls made with this client's tracer, per call and phase.
+        
+        Returns:
+            dict: Count, sum, min, max, mean and estimated p50/p95/p99 seconds per name
+        """
+        return self.tracer.get_phase_stats()
+
+    def _get_thread_lookup_url(self, data_agent_url: str, thread_name = None) -> tuple:
+        """
+        Build the private Fabric thread lookup URL for a thread name.
+
+        Args:
+            data_agent_url (str): The URL of the Fabric Data Agent
+            thread_name (str, optional): Name of the thread. If None, a random name is generated.
+
+        Returns:
+            tuple: The lookup URL and the resolved thread name
+        """
+        if thread_name == None: # if None, generate a random thread name to create a new thread
+            thread_name = f'external-client-thread-{uuid.uuid4()}'
+        else:
+            thread_name = thread_name # use provided thread name to attempt to get existing thread, if not create new thread
+        
+        if "aiskills" in data_agent_url: # future proofing for different url formats
+            base_url = data_agent_url.replace("aiskills", "dataagents").removesuffix("/openai").replace("/aiassistant","/__private/aiassistant")
+        else:
+            base_url = data_agent_url.removesuffix("/openai").replace("/aiassistant","/__private/aiassistant")
+        
+        return f'{base_url}/threads/fabric?tag="{thread_name}"', thread_name
+
+    def _track_thread(self, thread: dict, thread_name: str, generated_name: bool) -> dict:
+        """
+        Finish a thread lookup: name the thread and journal it for cleanup when its name was generated.
+        """
+        thread["name"] = thread_name #adding thread name to returned object
+        if generated_name:
+            self.thread_cleanup.track(thread["id"], thread_name)
+        return thread
+
+    def _get_message_cursor(self, thread_id: str) -> Optional[str]:
+        with self._cursor_lock:
+            return self._message_cursors.get(thread_id)
+
+    def _set_message_cursor(self, thread_id: str, message_id: str):
+        with self._cursor_lock:
+            self._message_cursors[thread_id] = message_id
+            self._message_cursors.move_to_end(thread_id)
+            while len(self._message_cursors) > _MAX_MESSAGE_CURSORS:
+                self._message_cursors.popitem(last=False)
+
+    def _forget_message_cursor(self, thread_id: str):
+        with self._cursor_lock:
+            self._message_cursors.pop(thread_id, None)
+
+    def _message_list_options(self, order: str = "asc", limit: int = _PAGE_SIZE, run_id: Optional[str] = None,
+                              after: Optional[str] = None) -> dict:
+        """
+        Build the messages.list arguments, leaving out the filters that are not set.
+        """
+        options = {"order": order, "limit": limit}
+        if run_id is not None:
+            options["run_id"] = run_id
+        if after is not None:
+            options["after"] = after
+        return options
+
+    def _queue_orphaned_threads(self, min_age: float) -> int:
+        """
+        Hand the journaled threads older than min_age to the cleanup queue (see sweep_orphaned_threads()).
+        """
+        thread_ids = self.thread_cleanup.orphaned_threads(min_age)
+        if thread_ids:
+            logger.info("🧹 Sweeping %d orphaned external-client-thread-* threads", len(thread_ids))
+        for thread_id in thread_ids:
+            self._delete_thread_later(thread_id)
+        return len(thread_ids)
+
+    def _record_run_phase(self, run_id: str, status: Optional[str], started_at: float):
+        """
+        Trace the time a run was seen queued or in_progress as a run.queued / run.in_progress span.
+        
+        The status is only known at each poll, so the span can start up to one
+        poll interval after the server-side transition.
+        """
+        if status in ("queued", "in_progress"):
+            self.tracer.record_span(f"run.{status}", started_at, time.time(), {"fabric.run_id": run_id})
+
+    def _start_deadline(self, timeout: Optional[float]) -> Optional[float]:
+        """
+        Start the wait budget of the current call (see PollStrategy.start_deadline()).
+        
+        The deadline is kept on the call's trace, so its requests carry it to the
+        retrying transport, which stops backing off once it has passed.
+        """
+        deadline = self.poll_strategy.start_deadline(timeout)
+        current = _current_span.get()
+        if current is not None and current[0] is not None:
+            current[0].deadline = deadline
+        return deadline
+
+    def _get_run_timeout(self, thread_id: str, run, metrics: PollMetrics, timeout: Optional[float]) -> Optional[RunTimeout]:
+        """
+        Build the RunTimeout for a wait that hit its deadline.
+        
+        Returns:
+            RunTimeout: The timeout details, or None when the run finished in time
+                        (including a run that completed while it was being cancelled)
+        """
+        if not metrics.timed_out or run.status == "completed":
+            return None
+        return RunTimeout(
+            thread_id=thread_id,
+            run_id=run.id,
+            timeout=self.poll_strategy.get_deadline(timeout),
+            elapsed=metrics.elapsed,
+            status=run.status,
+            cancelled=metrics.cancelled
+        )
+
+    def _coalesced_timeout(self, timeout: Optional[float], started: float) -> RunTimeoutError:
+        """
+        Build the error of an ask() whose deadline passed while it waited for another caller's run.
+        """
+        logger.warning("⏰ Gave up waiting for the identical question already in flight")
+        return RunTimeoutError(RunTimeout(
+            thread_id=None,
+            run_id=None,
+            timeout=self.poll_strategy.get_deadline(timeout),
+            elapsed=time.time() - started,
+            status="waiting",
+            cancelled=False
+        ))
+
+    def _get_cached_answer(self, question: str, thread_name, bypass_cache: bool) -> tuple:
+        """
+        Look up a question in the answer cache.
+        
+        Returns:
+            tuple: The cache key (None when the answer must not be cached) and the
+                   cached answer (None on a miss or with bypass_cache)
+        """
+        # Answers in named threads depend on the conversation, so only one-off questions are cached
+        if self.answer_cache is None or thread_name is not None:
+            return None, None
+        cache_key = self.answer_cache.make_key(self.data_agent_url, question)
+        if bypass_cache:
+            return cache_key, None
+        cached_answer = self.answer_cache.get(cache_key)
+        if cached_answer is not None:
+            logger.info("💾 Answer served from cache")
+        return cache_key, cached_answer
+
+    def _answer_from_run(self, run, responses: list, cache_key: Optional[str]) -> str:
+        """
+        Format the answer of a finished run, caching it under cache_key when the run completed.
+        """
+        answer = self._format_responses(responses)
+        if cache_key is not None and run.status == "completed" and responses:
+            self.answer_cache.set(cache_key, answer)
+        return answer
+
+    def _log_final_status(self, run, poll_metrics: PollMetrics):
+        logger.info("✅ Final status: %s", run.status,
+                    extra={"thread_id": run.thread_id, "run_id": run.id, "phase": run.status, "elapsed": poll_metrics.elapsed})
+
+    def _extract_assistant_responses(self, messages, run_id: Optional[str] = None) -> list:
+        """
+        Extract the text of every assistant message in a message list.
+
+        Args:
+            messages (list): Message objects from the OpenAI API
+            run_id (str, optional): Only keep messages created by this run
+
+        Returns:
+            list: Text of the assistant messages, in listing order
+        """
+        responses = []
+        for msg in messages:
+            if msg.role == "assistant" and (run_id is None or getattr(msg, "run_id", None) == run_id):
+                try:
+                    content = msg.content[0]
+                    # Handle different content types safely
+                    if hasattr(content, 'text'):
+                        text_content = getattr(content, 'text', None)
+                        if text_content is not None and hasattr(text_content, 'value'):
+                            responses.append(text_content.value)
+                        elif text_content is not None:
+                            responses.append(str(text_content))
+                        else:
+                            responses.append(str(content))
+                    else:
+                        responses.append(str(content))
+                except (IndexError, AttributeError):
+                    responses.append(str(msg.content))
+
+        return responses
+
+    def _format_responses(self, responses: list) -> str:
+        """
+        Join assistant responses into the string returned by ask().
+        """
+        if responses:
+            return "\n".join(responses)
+        else:
+            return "No response received from the data agent."
+
+    def _check_batch_options(self, concurrency: int, thread_name):
+        """
+        Validate the ask_many() options shared by the blocking and asyncio batches.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        # A thread runs one question at a time, and each ask() deletes its thread when done
+        if thread_name is not None and concurrency > 1:
+            raise ValueError("thread_name cannot be used with concurrency > 1; questions in one thread run one at a time")
+
+    def _expire_idle_conversations(self):
+        now = time.time()
+        for conversation in list(self._conversations):
+            if conversation.thread is not None and conversation.is_idle(now) and not conversation._lock.locked():
+                conversation._release_thread()
+
+    def _stream_timeout_event(self, thread_id: str, run_id: str, cancelled_run, timeout: Optional[float],
+                              deadline: float) -> StreamEvent:
+        """
+        Build the final "timeout" event of a stream that hit its deadline.
+        """
+        budget = self.poll_strategy.get_deadline(timeout)
+        run_timeout = RunTimeout(
+            thread_id=thread_id,
+            run_id=run_id,
+            timeout=budget,
+            elapsed=time.time() - (deadline - budget),
+            status=cancelled_run.status if cancelled_run is not None else "in_progress",
+            cancelled=cancelled_run is not None and cancelled_run.status == "cancelled"
+        )
+        return StreamEvent("timeout", run_timeout, run_id)
+
+    def _convert_stream_event(self, event) -> list:
+        """
+        Convert an Assistants stream event into StreamEvents.
+        
+        Args:
+            event: AssistantStreamEvent from the OpenAI SDK
+            
+        Returns:
+            list: Zero or more StreamEvent objects
+        """
+        name = getattr(event, "event", "")
+        data = getattr(event, "data", None)
+        
+        if name.startswith("thread.run.") and not name.startswith("thread.run.step."):
+            return [StreamEvent("status", data.status, data.id)]
+        
+        if name == "thread.message.delta":
+            events = []
+            for block in data.delta.content or []:
+                text = getattr(block, "text", None)
+                if text is not None and getattr(text, "value", None):
+                    events.append(StreamEvent("text_delta", text.value))
+            return events
+        
+        if name == "thread.run.step.completed":
+            events = []
+            step_details = getattr(data, "step_details", None)
+            for tool_call in getattr(step_details, "tool_calls", None) or []:
+                events.append(StreamEvent("tool_call", tool_call, data.run_id))
+                queries = self._extract_sql_from_function_args(tool_call) + self._extract_sql_from_output(tool_call)
+                for query in dict.fromkeys(queries):
+                    events.append(StreamEvent("sql", query, data.run_id))
+            return events
+        
+        return []
+
+    def _build_run_details_result(self, question: str, run, steps, messages) -> dict:
+        """
+        Build the detailed run result, including SQL analysis, from a finished run.
+        
+        Args:
+            question (str): The question that was asked
+            run: The finished run
+            steps: The run steps from the OpenAI API
+            messages (list): Message objects of this turn from the OpenAI API
+            
+        Returns:
+            dict: Detailed response including run steps, metadata, and SQL queries if lakehouse data source
+        """
+        # Extract SQL queries and data from steps if lakehouse data source is detected,
+        # falling back to a regex search of the raw step text in the same pass
+        sql_analysis = self._analyze_run_steps(steps)
+        
+        # Use the regex results when the structured extraction found nothing
+        if not sql_analysis["queries"]:
+            regex_queries = sql_analysis["fallback_queries"]
+            if regex_queries:
+                sql_analysis["queries"] = regex_queries
+                sql_analysis["data_retrieval_query"] = regex_queries[0] if regex_queries else None
+        
+        # Also extract data from the final assistant message
+        messages_data = {"data": [message.model_dump() for message in messages]}
+        assistant_messages = [msg for msg in messages_data.get('data', []) if msg.get('role') == 'assistant']
+        if assistant_messages:
+            latest_message = assistant_messages[-1]
+            content = latest_message.get('content', [])
+            if content and len(content) > 0:
+                # Extract text content
+                text_content = ""
+                if isinstance(content[0], dict):
+                    if 'text' in content[0]:
+                        if isinstance(content[0]['text'], dict) and 'value' in content[0]['text']:
+                            text_content = content[0]['text']['value']
+                        else:
+                            text_content = str(content[0]['text'])
+                else:
+                    text_content = str(content[0])
+                
+                # Extract structured data from the assistant's text response
+                if text_content:
+                    text_data_preview = self._extract_data_from_text_response(text_content)
+                    if text_data_preview:
+                        # Add the text-based data preview
+                        if sql_analysis["queries"]:
+                            # If we have queries but no data previews, or empty previews, use the text-based one
+                            if not sql_analysis["data_previews"] or not any(sql_analysis["data_previews"]):
+                                sql_analysis["data_previews"] = [text_data_preview]
+                            else:
+                                # Add to existing previews
+                                sql_analysis["data_previews"].append(text_data_preview)
+                            
+                            # If we don't have a specific data retrieval query identified, use the first query
+                            if not sql_analysis["data_retrieval_query"] and sql_analysis["queries"]:
+                                sql_analysis["data_retrieval_query"] = sql_analysis["queries"][0]
+                                sql_analysis["data_retrieval_query_index"] = 1
+        
+        result = {
+            "question": question,
+            "run_status": run.status,
+            "run_steps": {"data": [step.model_dump() for step in steps]},
+            "messages": messages_data,
+            "timestamp": time.time()
+        }
+        
+        # Add SQL analysis if found
+        if sql_analysis["queries"]:
+            result["sql_queries"] = sql_analysis["queries"]
+            result["sql_data_previews"] = sql_analysis["data_previews"]
+            result["data_retrieval_query"] = sql_analysis["data_retrieval_query"]
+            
+            logger.info("🗃️ Found %d SQL queries in lakehouse operations", len(sql_analysis["queries"]),
+                        extra={"thread_id": run.thread_id, "run_id": run.id, "phase": "sql"})
+            if self.log_sql_previews:
+                self._log_sql_previews(sql_analysis, run)
+        
+        return result
+
+    def _log_sql_previews(self, sql_analysis: dict, run):
+        """
+        Log each SQL query of a run and the preview of the data it retrieved (see log_sql_previews).
+        """
+        lines = []
+        for i, query in enumerate(sql_analysis["queries"], 1):
+            lines.append(f"📄 SQL Query {i}:")
+            lines.append(f"   {query}")
+            
+            # Show data preview if this query retrieved data
+            if i == sql_analysis["data_retrieval_query_index"]:
+                lines.append(f"   🎯 This query retrieved the data!")
+                if sql_analysis["data_previews"][i-1]:
+                    lines.append(f"   📊 Data Preview:")
+                    preview = sql_analysis["data_previews"][i-1]
+                    
+                    # Check if the preview is a raw markdown table (single item)
+                    if len(preview) == 1 and '\n' in preview[0] and '|' in preview[0]:
+                        # This is a raw markdown table, log it as is
+                        lines.append(preview[0])
+                    else:
+                        # This is parsed row data, log line by line
+                        for line in preview[:5]:  # Show first 5 lines
+                            lines.append(f"      {line}")
+                        if len(preview) > 5:
+                            lines.append(f"      ... and {len(preview) - 5} more lines")
+        logger.info("%s", "\n".join(lines), extra={"thread_id": run.thread_id, "run_id": run.id, "phase": "sql"})
+
+    def _build_raw_run_response(self, question: str, thread: dict, run, steps, messages, timeout: Optional[float],
+                                poll_metrics: PollMetrics, run_timeout: Optional[RunTimeout]) -> dict:
+        """
+        Build the get_raw_run_response() result from a finished run.
+        """
+        return {
+            "question": question,
+            "run": run.model_dump(),
+            "steps": {"data": [step.model_dump() for step in steps]},
+            # Newest first, as the thread listing used to return them
+            "messages": {"data": [message.model_dump() for message in reversed(messages)]},
+            "timestamp": time.time(),
+            "timeout": timeout,
+            "success": run.status == "completed",
+            "thread": thread,
+            "poll_metrics": asdict(poll_metrics),
+            "run_timeout": asdict(run_timeout) if run_timeout else None
+        }
+
+    def _build_error_result(self, error: Exception) -> dict:
+        """
+        Describe a failed call in the result dict of get_run_details() / get_raw_run_response().
+        """
+        fabric_error = _to_fabric_error(error)
+        return {"error": str(error), "error_type": type(fabric_error).__name__, "retry_after": fabric_error.retry_after}
+
+    def _analyze_run_steps(self, steps, regex_fallback: bool = True) -> dict:
+        """
+        Extract SQL queries, data previews and the data retrieval query in one pass over the run steps.
+        
+        Every tool call's arguments and output are stringified and JSON-parsed
+        once, and the parsed value feeds both the SQL and the data extraction.
+        The regex search over the raw text (the old fallback) only runs over
+        strings already collected during the pass, and only when the structured
+        extraction found nothing.
+        
+        Args:
+            steps: The run steps from the OpenAI API
+            regex_fallback (bool): Search the raw step text when no structured SQL is found
+            
+        Returns:
+            dict: queries, data_previews, data_retrieval_query, data_retrieval_query_index
+                  and fallback_queries
+        """
+        sql_queries = []
+        data_previews = []
+        data_retrieval_query = None
+        data_retrieval_query_index = None
+        fallback_texts = []
+        
+        try:
+            for step in steps:
+                step_details = getattr(step, 'step_details', None)
+                if not step_details:
+                    continue
+                
+                # Check for tool calls which typically contain the SQL queries
+                for tool_call in getattr(step_details, 'tool_calls', None) or []:
+                    function = getattr(tool_call, 'function', None)
+                    args_str = str(function.arguments) if function and hasattr(function, 'arguments') else None
+                    output = getattr(tool_call, 'output', None)
+                    output_str = str(output) if output else None
+                    
+                    # Extract SQL from function arguments
+                    sql_from_args = self._sql_from_function_args(function)
+                    
+                    # Parse the output once for both SQL and data extraction
+                    sql_from_output = []
+                    data_preview = []
+                    if output_str is not None:
+                        rows_start = None
+                        if len(output_str) >= _STREAMING_OUTPUT_MIN_CHARS:
+                            rows_start = _find_json_rows(output_str)
+                        if rows_start is not None:
+                            # Large record sets: decode only the preview rows, SQL keys are
+                            # still found by the text search below
+                            preview_rows = list(islice(_iter_json_rows(output_str, rows_start), 10))
+                            data_preview = self._format_list_data(preview_rows)
+                        else:
+                            try:
+                                output_json = json.loads(output_str)
+                                sql_from_output = self._sql_from_parsed_output(output_json)
+                                data_preview = self._format_parsed_output(output_json)
+                            except json.JSONDecodeError:
+                                data_preview = self._extract_data_preview(output_str)
+                        sql_from_output.extend(self._sql_from_output_text(output_str))
+                    
+                    sql_queries.extend(sql_from_args)
+                    sql_queries.extend(sql_from_output)
+                    
+                    if data_preview:
+                        # If we found data and SQL in this step, it's likely the retrieval query
+                        if sql_from_args or sql_from_output:
+                            all_sql_this_call = sql_from_args + sql_from_output
+                            data_retrieval_query = all_sql_this_call[-1] if all_sql_this_call else None
+                            data_retrieval_query_index = len(sql_queries)
+                    
+                    data_previews.append(data_preview)
+                    
+                    if regex_fallback:
+                        if args_str is not None:
+                            fallback_texts.append(args_str)
+                        if output_str is not None:
+                            fallback_texts.append(output_str)
+                
+                if regex_fallback:
+                    fallback_texts.append(step_details)
+        
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not extract SQL queries: %s", e)
+        
+        fallback_queries = []
+        if regex_fallback and not sql_queries:
+            try:
+                for text in fallback_texts:
+                    fallback_queries.extend(self._find_sql_in_text(str(text)))
+            except Exception as e:
+                logger.warning("⚠️ Warning: Could not extract SQL queries: %s", e)
+        
+        # Remove duplicates while preserving order
+        return {
+            "queries": list(dict.fromkeys(sql_queries)),
+            "data_previews": data_previews,
+            "data_retrieval_query": data_retrieval_query,
+            "data_retrieval_query_index": data_retrieval_query_index,
+            "fallback_queries": list(dict.fromkeys(fallback_queries))
+        }
+
+    def _extract_sql_from_function_args(self, tool_call) -> list:
+        """
+        Extract SQL queries from tool call function arguments.
+        
+        Args:
+            tool_call: OpenAI tool call object
+            
+        Returns:
+            list: SQL queries found
+        """
+        return self._sql_from_function_args(getattr(tool_call, 'function', None))
+
+    def _sql_from_function_args(self, function) -> list:
+        """
+        Extract SQL queries from a tool call's function arguments.
+        
+        Args:
+            function: The tool call's function object (may be None)
+            
+        Returns:
+            list: SQL queries found
+        """
+        sql_queries = []
+        
+        try:
+            if function and hasattr(function, 'arguments'):
+                args_str = function.arguments
+                
+                # Parse the arguments JSON
+                args = json.loads(args_str)
+                
+                if isinstance(args, dict):
+                    sql_queries.extend(self._sql_from_keys(args, _SQL_ARG_KEYS))
+        
+        except (json.JSONDecodeError, AttributeError, TypeError) as e:
+            # If JSON parsing fails, fall back to basic string search
+            try:
+                args_str = str(function.arguments)
+                # Look for common SQL patterns in the string
+                args_upper = args_str.upper()
+                if any(keyword in args_upper for keyword in _SQL_ARG_KEYWORDS):
+                    # Use minimal regex as fallback
+                    matches = _SQL_ARG_STRING_PATTERN.findall(args_str)
+                    sql_queries.extend([match.strip() for match in matches if len(match.strip()) > 10])
+            except Exception as parse_error:
+                logger.warning("⚠️ Warning: Could not parse tool call arguments: %s", parse_error)
+        
+        return sql_queries
+
+    def _sql_from_keys(self, data: dict, sql_keys: tuple) -> list:
+        """
+        Collect SQL stored under well-known keys of a dict and of its nested dicts.
+        """
+        sql_queries = []
+        
+        for key in sql_keys:
+            if key in data and data[key]:
+                sql_query = str(data[key]).strip()
+                if sql_query and len(sql_query) > 10:  # Basic validation
+                    sql_queries.append(sql_query)
+        
+        # Also check for nested structures
+        for key, value in data.items():
+            if isinstance(value, dict):
+                for nested_key in sql_keys:
+                    if nested_key in value and value[nested_key]:
+                        sql_query = str(value[nested_key]).strip()
+                        if sql_query and len(sql_query) > 10:
+                            sql_queries.append(sql_query)
+        
+        return sql_queries
+
+    def _extract_sql_from_output(self, tool_call) -> list:
+        """
+        Extract SQL queries from tool call output.
+        
+        Args:
+            tool_call: OpenAI tool call object
+            
+        Returns:
+            list: SQL queries found in output
+        """
+        sql_queries = []
+        
+        try:
+            if hasattr(tool_call, 'output') and tool_call.output:
+                output_str = str(tool_call.output)
+                
+                # First try to parse as JSON
+                try:
+                    sql_queries.extend(self._sql_from_parsed_output(json.loads(output_str)))
+                except json.JSONDecodeError:
+                    # If not JSON, use regex to find SQL patterns
+                    pass
+                
+                # Always also try regex as backup/additional method
+                sql_queries.extend(self._sql_from_output_text(output_str))
+        
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not extract SQL from output: %s", e)
+        
+        return sql_queries
+
+    def _sql_from_parsed_output(self, output_json) -> list:
+        """
+        Extract SQL stored under well-known keys of a parsed tool call output.
+        """
+        if isinstance(output_json, dict):
+            # Look for SQL in common keys
+            return self._sql_from_keys(output_json, _SQL_OUTPUT_KEYS)
+        return []
+
+    def _sql_from_output_text(self, output_str: str) -> list:
+        """
+        Find SQL in raw tool call output text.
+        
+        Values under SQL-like keys are matched with the precompiled key patterns,
+        and statements anywhere else are found with the linear-time scanner
+        (or the old statement patterns when legacy_sql_regex is set).
+        """
+        sql_queries = []
+        
+        # Outputs can be many megabytes: check one upper-cased window at a time, not a full copy
+        if next(_iter_keyword_hits(output_str, _SQL_OUTPUT_KEYWORD_PATTERN), None) is not None:
+            if self.legacy_sql_regex:
+                return self._sql_from_output_text_regex(output_str)
+            
+            for pattern in _SQL_OUTPUT_KEY_PATTERNS:
+                for match in pattern.findall(output_str):
+                    clean_query = _clean_sql_statement(match)
+                    if len(clean_query) > 10:
+                        sql_queries.append(clean_query)
+            for statement in _scan_sql_statements(output_str):
+                clean_query = _clean_sql_statement(statement)
+                if len(clean_query) > 10:
+                    sql_queries.append(clean_query)
+        
+        return sql_queries
+
+    def _sql_from_output_text_regex(self, output_str: str) -> list:
+        """
+        Find SQL in raw tool call output text with the old backtracking patterns.
+        
+        Their lazy ``.*?`` matches make this superlinear on large outputs.
+        """
+        sql_queries = []
+        
+        for pattern in _SQL_OUTPUT_PATTERNS:
+            for match in pattern.findall(output_str):
+                clean_query = match.strip().replace('\\n', '\n').replace('\\t', '\t')
+                clean_query = _WHITESPACE_PATTERN.sub(' ', clean_query)
+                if len(clean_query) > 10:
+                    sql_queries.append(clean_query)
+        
+        return sql_queries
+
+    def _format_parsed_output(self, data) -> list:
+        """
+        Format a parsed tool call output as table lines.
+        
+        Args:
+            data: The JSON-decoded tool call output
+            
+        Returns:
+            list: Formatted data lines
+        """
+        data_lines = []
+        
+        if isinstance(data, list) and len(data) > 0:
+            # Handle list of records (typical query result)
+            if isinstance(data[0], dict):
+                return self._format_list_data(data)
+        
+        elif isinstance(data, dict):
+            # Handle single record or structured response
+            if 'data' in data and isinstance(data['data'], list):
+                # Nested data structure
+                return self._format_list_data(data['data'])
+            elif 'results' in data and isinstance(data['results'], list):
+                # Results structure
+                return self._format_list_data(data['results'])
+            else:
+                # Single record
+                data_lines.append("| Key | Value |")
+                data_lines.append("|---|---|")
+                for key, value in data.items():
+                    data_lines.append(f"| {key} | {str(value)} |")
+        
+        return data_lines
+
+    def _extract_result_table(self, steps) -> Optional[ResultTable]:
+        """
+        Build a ResultTable from the last tool call output in the run steps that holds records.
+        
+        Args:
+            steps: The run steps from the OpenAI API; the list is emptied
+            
+        Returns:
+            ResultTable: All rows of that output, or None if no output holds records
+        """
+        result_output = self._find_result_output(steps)
+        if not result_output:
+            return None
+        text, rows_start, sql = result_output
+        return ResultTable.from_records(_iter_json_rows(text, rows_start), sql=sql)
+
+    def _find_result_output(self, steps) -> Optional[tuple]:
+        """
+        Locate the records of the last tool call output in the run steps that holds any.
+        
+        Only the outputs are scanned; no rows are decoded beyond the first of each.
+        Steps are popped from the end of the list and the list is emptied, so every
+        other step output is released before the caller decodes the rows.
+        
+        Returns:
+            tuple: (output text, offset of the records array, SQL of that tool call or None),
+                   or None if no output holds records
+        """
+        try:
+            while steps:
+                step_details = getattr(steps.pop(), 'step_details', None)
+                for tool_call in reversed(getattr(step_details, 'tool_calls', None) or []):
+                    output = getattr(tool_call, 'output', None)
+                    if not output:
+                        continue
+                    
+                    text = output if isinstance(output, str) else str(output)
+                    rows_start = _find_json_rows(text)
+                    if rows_start is not None:
+                        call_sql = self._sql_from_function_args(getattr(tool_call, 'function', None))
+                        return text, rows_start, call_sql[-1] if call_sql else None
+            return None
+        finally:
+            steps.clear()
+
+    def _extract_markdown_table(self, text: str) -> str:
+        """
+        Extract raw markdown table from the assistant's text response.
+        
+        Args:
+            text (str): The assistant's text response
+            
+        Returns:
+            str: Raw markdown table if found, or empty string if no table found
+        """
+        lines = text.split('\n')
+        table_lines = []
+        in_table = False
+        header_found = False
+        
+        for line in lines:
+            line_stripped = line.strip()
+            
+            # Check if this line contains markdown table separators
+            if '|' in line_stripped and ('---' in line_stripped or '-' in line_stripped and line_stripped.count('-') > 3):
+                table_lines.append(line)
+                in_table = True
+                header_found = True
+            elif '|' in line_stripped and (in_table or not header_found):
+                # This is a table row (header or data row)
+                table_lines.append(line)
+                in_table = True
+            elif in_table and line_stripped == '':
+                # Empty line - might continue table, add it but don't break yet
+                table_lines.append(line)
+            elif in_table and '|' not in line_stripped and line_stripped != '':
+                # Non-table line after we were in a table - end of table
+                break
+        
+        # Clean up trailing empty lines
+        while table_lines and table_lines[-1].strip() == '':
+            table_lines.pop()
+        
+        # Return the raw markdown table if we found at least a header and separator
+        if len(table_lines) >= 2:
+            return '\n'.join(table_lines)
+        else:
+            return ""
+
+    def _extract_data_from_text_response(self, text_content: str) -> list:
+        """
+        Extract structured data from the assistant's text response.
+        First tries to find raw markdown tables, then falls back to numbered list parsing.
+        
+        Args:
+            text_content (str): The text content from the assistant
+            
+        Returns:
+            list: Formatted data lines (raw markdown table as single item, or parsed rows)
+        """
+        import re
+        
+        # First, try to extract a raw markdown table
+        markdown_table = self._extract_markdown_table(text_content)
+        if markdown_table:
+            # Return the raw markdown table as a single formatted block
+            return [markdown_table]
+        
+        # Fallback to numbered list parsing (existing logic)
+        data_lines = []
+        
+        try:
+            lines = text_content.split('\n')
+            
+            # Look for numbered lists with data (like the example output)
+            numbered_pattern = r'^\d+\.\s+'
+            data_rows = []
+            
+            for line in lines:
+                line = line.strip()
+                if re.match(numbered_pattern, line):
+                    # Remove the number prefix
+                    clean_line = re.sub(numbered_pattern, '', line)
+                    data_rows.append(clean_line)
+            
+            if data_rows and len(data_rows) > 0:
+                # Try to parse the structured data from the text
+                first_row = data_rows[0]
+                if ':' in first_row:
+                    # Parse key-value format
+                    # Example: "Date: 4/29/2020, State: WI, Positive: 7,660, ..."
+                    
+                    # Extract headers from first row
+                    headers = []
+                    values_first_row = []
+                    
+                    pairs = first_row.split(', ')
+                    for pair in pairs:
+                        if ':' in pair:
+                            key, value = pair.split(':', 1)
+                            headers.append(key.strip())
+                            values_first_row.append(value.strip())
+                    
+                    if headers:
+                        # Create table format
+                        data_lines.append("| " + " | ".join(headers) + " |")
+                        data_lines.append("|" + "---|" * len(headers))
+                        
+                        # Add first row
+                        data_lines.append("| " + " | ".join(values_first_row) + " |")
+                        
+                        # Parse remaining rows
+                        for row in data_rows[1:]:
+                            values = []
+                            pairs = row.split(', ')
+                            for pair in pairs:
+                                if ':' in pair:
+                                    _, value = pair.split(':', 1)
+                                    values.append(value.strip())
+                            
+                            if len(values) == len(headers):
+                                data_lines.append("| " + " | ".join(values) + " |")
+                            
+                        return data_lines
+                
+                # If we couldn't parse structured format, return the raw rows as-is
+                if not data_lines and data_rows:
+                    # Just show the numbered list data
+                    return [f"Row {i+1}: {row}" for i, row in enumerate(data_rows)]
+            
+            # Alternative: Look for table-like structures in the text
+            # Check if there are lines that look like table rows
+            potential_table_lines = []
+            for line in lines:
+                line = line.strip()
+                # Look for lines with multiple separators that could be table data
+                if line and ('|' in line or line.count(',') >= 2 or line.count(':') >= 2):
+                    potential_table_lines.append(line)
+            
+            if potential_table_lines and not data_lines:
+                return potential_table_lines[:10]  # Return first 10 lines
+        
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not extract data from text response: %s", e)
+        
+        return data_lines
+
+    def _format_list_data(self, data_list) -> list:
+        """
+        Format a list of data records into table format.
+        """
+        data_lines = []
+        
+        if len(data_list) > 0 and isinstance(data_list[0], dict):
+            headers = list(data_list[0].keys())
+            data_lines.append("| " + " | ".join(headers) + " |")
+            data_lines.append("|" + "---|" * len(headers))
+            
+            for row in data_list[:10]:  # Limit to first 10 rows
+                values = [str(row.get(h, "")) for h in headers]
+                data_lines.append("| " + " | ".join(values) + " |")
+        
+        return data_lines
+
+    def _extract_data_preview(self, text: str, max_rows: Optional[int] = 10) -> list:
+        """
+        Extract data preview from text output.
+        
+        Args:
+            text (str): Text to search for tabular data
+            max_rows (int, optional): Stop decoding a JSON result after this many rows
+            
+        Returns:
+            list: List of data rows found
+        """
+        data_lines = []
+        
+        try:
+            # Look for JSON arrays (or objects holding one) with the bracket-matching scanner
+            for data in _iter_json_values(text, max_rows=max_rows):
+                if isinstance(data, dict):
+                    data = next((value for value in data.values() if isinstance(value, list) and value), None)
+                if isinstance(data, list) and len(data) > 0:
+                    # Convert to readable format
+                    if isinstance(data[0], dict):
+                        # List of dictionaries (typical query result)
+                        data_lines = self._format_list_data(data)
+                    break  # Found valid JSON data
+            
+            # If no JSON found, look for pipe-separated tables
+            if not data_lines:
+                lines = text.split('\n')
+                table_lines = []
+                
+                for line in lines:
+                    # Look for lines that contain multiple pipe characters (table format)
+                    if line.count('|') >= 2:
+                        table_lines.append(line.strip())
+                    elif table_lines and line.strip() == "":
+                        # End of table
+                        break
+                    elif table_lines and not line.strip().startswith('|'):
+                        # Non-table line after table started
+                        break
+                
+                if table_lines:
+                    data_lines = table_lines[:15]  # Limit to first 15 lines
+            
+            # Look for CSV-like data
+            if not data_lines:
+                lines = text.split('\n')
+                csv_lines = []
+                
+                for line in lines:
+                    # Look for comma-separated values with consistent column count
+                    if ',' in line and len(line.split(',')) >= 2:
+                        csv_lines.append(line.strip())
+                        if len(csv_lines) >= 10:  # Limit preview
+                            break
+                    elif csv_lines:
+                        break
+                
+                if len(csv_lines) > 1:  # At least header + one data row
+                    data_lines = csv_lines
+        
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not extract data preview: %s", e)
+        
+        return data_lines
+
+    def _find_sql_in_text(self, text: str) -> list:
+        """
+        Find SQL queries in text.
+        
+        Uses the linear-time statement scanner. The old regex patterns are used
+        instead when legacy_sql_regex is set, and as a fallback for small texts
+        where the scanner found nothing.
+        
+        Args:
+            text (str): Text to search for SQL queries
+            
+        Returns:
+            list: List of SQL queries found
+        """
+        if self.legacy_sql_regex:
+            return self._find_sql_in_text_regex(text)
+        
+        sql_queries = []
+        for statement in _scan_sql_statements(text):
+            clean_query = _clean_sql_statement(statement)
+            if len(clean_query) > 10:  # Filter out very short matches
+                sql_queries.append(clean_query)
+        
+        # The backtracking patterns are only affordable on small inputs
+        if not sql_queries and len(text) <= _SQL_REGEX_FALLBACK_MAX_CHARS:
+            sql_queries = self._find_sql_in_text_regex(text)
+        
+        return sql_queries
+
+    def _find_sql_in_text_regex(self, text: str) -> list:
+        """
+        Find SQL queries in text using the old pattern matching.
+        
+        Args:
+            text (str): Text to search for SQL queries
+            
+        Returns:
+            list: List of SQL queries found
+        """
+        sql_queries = []
+        
+        # Common SQL keywords that indicate a query
+        for pattern in _SQL_TEXT_PATTERNS:
+            for match in pattern.findall(text):
+                # Clean up the SQL query
+                clean_query = match.strip().replace('\n', ' ').replace('\t', ' ')
+                clean_query = _WHITESPACE_PATTERN.sub(' ', clean_query)  # Normalize whitespace
+                if len(clean_query) > 10:  # Filter out very short matches
+                    sql_queries.append(clean_query)
+        
+        return sql_queries
+
+
+class FabricDataAgentClient(_FabricDataAgentClientBase):
+    """
+    Client for calling Microsoft Fabric Data Agents from external applications.
+    
+    This client handles:
+    - Interactive browser authentication with Azure AD
+    - Automatic token refresh ahead of expiry (TokenBroker)
+    - Bearer token management for API calls
+    - A single keep-alive connection pool shared by every call
+    - Proper cleanup of resources
+    """
+    
+    def _authenticate(self):
+        """
+        Perform interactive browser authentication and get initial token.
+        """
+        try:
+            logger.info("🔐 Starting authentication...")
+            self._create_token_broker()
+            
+            # Get initial token
+            self.token = self.token_broker.get_token()
+            logger.info("✅ Token obtained, expires at: %s", time.ctime(self.token.expires_on), extra={"phase": "token"})
+            
+            logger.info("✅ Authentication successful!")
+            
+        except Exception as e:
+            logger.error("❌ Authentication failed: %s", e)
+            raise
+    
+    def _get_openai_client(self) -> OpenAI:
+        """
+        Get the OpenAI client configured for Fabric Data Agent calls.
+        
+        The client is created once and shares the pooled HTTP transport, so
+        repeated calls reuse open connections instead of new TCP/TLS handshakes.
+        
+        Returns:
+            OpenAI: Configured OpenAI client
+        """
+        # One ActivityId per client call, stamped on each request it makes;
+        # a traced call has already made its own
+        if _current_span.get() is None:
+            _current_activity_id.set(str(uuid.uuid4()))
+        
+        # The broker refreshes ahead of expiry in the background; this only
+        # blocks when the token has actually run out
+        with self.tracer.span("token"):
+            self.token = self.token_broker.get_token()
+        
+        if not self.token:
+            raise ValueError("No valid authentication token available")
+        
+        if self._openai_client is None:
+            with self._transport_lock:
+                if self._openai_client is None:
+                    self._openai_client = OpenAI(
+                        api_key="",  # Not used - the Bearer token is set per request
+                        base_url=self.data_agent_url,
+                        default_query={"api-version": "2024-05-01-preview"},
+                        http_client=self._get_http_client(),
+                        max_retries=0  # The transport retries, following the RetryPolicy
+                    )
+        
+        return self._openai_client
+
+    def _get_http_client(self) -> httpx.Client:
+        """
+        Get the long-lived, pooled HTTP client shared by every call of this client.
+        
+        Returns:
+            httpx.Client: The pooled HTTP client
+        """
+        if self._http_client is None:
+            with self._transport_lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        **self._get_http_client_options(),
+                        transport=_RetryTransport(httpx.HTTPTransport(**self._get_transport_options()),
+                                                  self.retry_policy, self.circuit_breaker, self.capacity_limiter),
+                        event_hooks={"request": [self._prepare_request]}
+                    )
+        return self._http_client
+
+    def close(self):
+        """
+        Close the pooled HTTP connections held by this client.
+        
+        Open conversations are closed and pending thread deletes are flushed
+        first, since they use those connections.
+        """
+        for conversation in list(self._conversations):
+            conversation.close()
+        if self._owns_thread_cleanup:
+            self.thread_cleanup.close()
+        else:
+            self.thread_cleanup.flush(timeout=10)
+        with self._transport_lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._openai_client = None
+        if self._owns_token_broker and self.token_broker is not None:
+            self.token_broker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_existing_or_create_new_thread(self, data_agent_url: str, thread_name = None) -> dict:
+        """
+        Get an existing thread or Create a new thread for the target Fabric Data Agent.
+
+        Args:
+            data_agent_url (str): The URL of the Fabric Data Agent
+            thread_name (str, optional): Name for the new or existing thread. If None, a random name is generated.
+
+        Returns:
+            list: A list containing the ID and name of the created thread or existing thread
+        """
+        generated_name = thread_name is None
+        get_new_thread_url, thread_name = self._get_thread_lookup_url(data_agent_url, thread_name)
+
+        with self.tracer.span("thread.lookup") as span:
+            response = self._get_http_client().get(get_new_thread_url)
+            response.raise_for_status()
+            thread = response.json()
+            span.attributes["fabric.thread_id"] = thread["id"]
+        return self._track_thread(thread, thread_name, generated_name)
+
+    def _delete_thread(self, thread_id: str, parent: Optional[tuple] = None):
+        """
+        Delete a thread (called by the cleanup queue).
+        
+        Args:
+            thread_id (str): The thread to delete
+            parent (tuple, optional): Span of the call that used the thread, so the
+                                      delete is traced under that call's ActivityId
+        """
+        with self.tracer.span("thread.delete", parent, {"fabric.thread_id": thread_id}):
+            self._get_openai_client().beta.threads.delete(thread_id=thread_id)
+
+    def _delete_thread_later(self, thread_id: str):
+        """
+        Hand a finished thread to the background cleanup queue.
+        """
+        self._forget_message_cursor(thread_id)
+        self.thread_cleanup.submit(thread_id, functools.partial(self._delete_thread, parent=_current_span.get()))
+
+    def _list_new_messages(self, client: OpenAI, thread_id: str, run_id: Optional[str] = None) -> list:
+        """
+        List the messages added to a thread since the last listing of that thread, oldest first.
+        
+        Listing starts after the thread's high-water mark (the newest message
+        seen so far) and pages with limit, so the cost of a turn does not grow
+        with the thread's history.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread to list
+            run_id (str, optional): Only list messages created by this run
+            
+        Returns:
+            list: The new Message objects
+        """
+        options = self._message_list_options(run_id=run_id, after=self._get_message_cursor(thread_id))
+        with self.tracer.span("messages.list"):
+            messages = list(_iter_cursor_pages(client.beta.threads.messages.list, thread_id=thread_id, **options))
+        if messages:
+            self._set_message_cursor(thread_id, messages[-1].id)
+        return messages
+
+    def sweep_orphaned_threads(self, min_age: float = 3600) -> int:
+        """
+        Delete generated threads that a crashed or killed process never cleaned up.
+        
+        The Fabric endpoint cannot list threads, so orphans are found in the
+        journal of the cleanup queue (ThreadCleanupQueue(journal_path=...)).
+        
+        Args:
+            min_age (float): Only threads created at least this many seconds ago
+            
+        Returns:
+            int: Number of threads queued for deletion
+        """
+        return self._queue_orphaned_threads(min_age)
+
+    def iter_run_steps(self, thread_id: str, run_id: str, limit: int = _PAGE_SIZE):
+        """
+        Lazily iterate every step of a run, requesting pages only as they are consumed.
+        
+        Stop iterating (e.g. after the first step with SQL) and the remaining
+        pages are never fetched. Needs a thread that outlives the call that
+        created the run, such as a Conversation's thread.
+        
+        Args:
+            thread_id (str): The thread the run belongs to
+            run_id (str): The run whose steps to list
+            limit (int): Steps per page
+            
+        Yields:
+            RunStep: The run steps as SDK objects, newest first (the API default order)
+        """
+        client = self._get_openai_client()
+        yield from _iter_cursor_pages(client.beta.threads.runs.steps.list, thread_id=thread_id, run_id=run_id, limit=limit)
+
+    def iter_messages(self, thread_id: str, run_id: Optional[str] = None, after: Optional[str] = None,
+                      order: str = "asc", limit: int = _PAGE_SIZE):
+        """
+        Lazily iterate the messages of a thread, requesting pages only as they are consumed.
+        
+        Args:
+            thread_id (str): The thread to list
+            run_id (str, optional): Only messages created by this run
+            after (str, optional): Start after this message id
+            order (str): "asc" for oldest first, "desc" for newest first
+            limit (int): Messages per page
+            
+        Yields:
+            Message: The messages as SDK objects
+        """
+        client = self._get_openai_client()
+        options = self._message_list_options(order, limit, run_id, after)
+        yield from _iter_cursor_pages(client.beta.threads.messages.list, thread_id=thread_id, **options)
+
+    def _send_question(self, client: OpenAI, thread_id: str, question: str):
+        """
+        Add the user's question to a thread.
+        """
+        with self.tracer.span("messages.create"):
+            client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=question
+            )
+
+    def _get_assistant_id(self, client: OpenAI) -> str:
+        """
+        Get the cached assistant id for this data agent, creating one on first use.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            
+        Returns:
+            str: The assistant id
+        """
+        assistant_id = self.assistant_cache.get(self.data_agent_url)
+        if assistant_id is None:
+            # Only one caller creates the assistant, the others reuse its id
+            with self._assistant_lock:
+                assistant_id = self.assistant_cache.get(self.data_agent_url)
+                if assistant_id is None:
+                    # Create assistant without specifying model or instructions
+                    with self.tracer.span("assistants.create"):
+                        assistant_id = client.beta.assistants.create(model="not used").id
+                    self.assistant_cache.set(self.data_agent_url, assistant_id)
+        return assistant_id
+
+    def _create_run(self, client: OpenAI, thread_id: str, **run_options):
+        """
+        Start a run on a thread with the cached assistant.
+        
+        If the server rejects a stale cached assistant id, the cache entry is
+        dropped and the run is retried once with a freshly created assistant.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread to run
+            **run_options: Extra arguments for runs.create, e.g. stream=True
+            
+        Returns:
+            Run: The created run (or the event stream when streaming)
+        """
+        assistant_id = self._get_assistant_id(client)
+        try:
+            with self.tracer.span("runs.create"):
+                return client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_options)
+        except (NotFoundError, BadRequestError) as e:
+            if not _is_stale_assistant_error(e):
+                raise
+            logger.warning("♻️ Cached assistant %s was rejected, creating a new one", assistant_id)
+            self.assistant_cache.invalidate(self.data_agent_url, assistant_id)
+            assistant_id = self._get_assistant_id(client)
+            with self.tracer.span("runs.create"):
+                return client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_options)
+
+    def _wait_for_run(self, client: OpenAI, thread_id: str, run, deadline: Optional[float] = None) -> tuple:
+        """
+        Poll a run until it leaves queued/in_progress, following the poll strategy.
+        
+        When the deadline expires the run is cancelled server-side instead of
+        being left to run on, see _cancel_run().
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread the run belongs to
+            run: The run to monitor
+            deadline (float, optional): Wall-clock time from PollStrategy.start_deadline()
+            
+        Returns:
+            tuple: The last retrieved run and its PollMetrics
+        """
+        wait = _RunWait(self, thread_id, run, deadline)
+        while run.status in ["queued", "in_progress"]:
+            delay = wait.next_delay(run)
+            if delay is None:
+                run = wait.cancelled(run, self._cancel_run(client, thread_id, run.id))
+                break
+            time.sleep(delay)
+            
+            polled_at = time.time()
+            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+            wait.polled(run, polled_at)
+        
+        return wait.finish(run)
+
+    def _cancel_run(self, client: OpenAI, thread_id: str, run_id: str):
+        """
+        Cancel a run server-side and wait briefly for the cancel to be acknowledged.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread the run belongs to
+            run_id (str): The run to cancel
+            
+        Returns:
+            Run: The last retrieved run, or None when the cancel request failed
+        """
+        with self.tracer.span("runs.cancel", attributes={"fabric.run_id": run_id}) as span:
+            try:
+                run = client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+            except Exception as e:
+                # Typically the run finished between the last poll and the cancel
+                logger.warning("⚠️ Could not cancel run %s: %s", run_id, e, extra={"thread_id": thread_id, "run_id": run_id})
+                span.status = "error"
+                return None
+            
+            give_up_at = time.time() + self.poll_strategy.cancel_timeout
+            while run.status in ["queued", "in_progress", "cancelling"]:
+                remaining = give_up_at - time.time()
+                if remaining <= 0:
+                    break
+                time.sleep(min(self.poll_strategy.cancel_poll_interval, remaining))
+                run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+            
+            logger.info("🛑 Run %s status after cancel: %s", run_id, run.status,
+                        extra={"thread_id": thread_id, "run_id": run_id, "phase": "runs.cancel"})
+            return run
+
+    @_traced_call("ask")
+    def ask(self, question: str, timeout: int = 120, thread_name = None, bypass_cache: bool = False) -> str:
+        """
+        Ask a question to the Fabric Data Agent.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            thread_name (str, optional): The name of the thread to use
+            bypass_cache (bool): Force a fresh run even if the answer cache has this question
+                                 or the same question is already in flight
+
+        Returns:
+            str: The response from the data agent
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline (it is cancelled server-side)
+            FabricThrottledError: When Fabric kept answering 429 after the retries
+            CircuitOpenError: While the endpoint's circuit breaker is open
+            FabricAgentError: For any other failure of the call
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        logger.info("Asking: %s", question)
+        
+        cache_key, cached_answer = self._get_cached_answer(question, thread_name, bypass_cache)
+        if cached_answer is not None:
+            return cached_answer
+        
+        if bypass_cache:
+            return self._run_question(question, timeout, thread_name, cache_key)
+        
+        # Callers asking the same question meanwhile wait for this run instead of starting their own
+        key = self.single_flight.make_key(self.data_agent_url, question, thread_name)
+        started = time.time()
+        try:
+            return self.single_flight.do(
+                key, functools.partial(self._run_question, question, timeout, thread_name, cache_key),
+                timeout=self.poll_strategy.get_deadline(timeout)
+            )
+        except RunTimeoutError:
+            raise
+        except TimeoutError:
+            raise self._coalesced_timeout(timeout, started) from None
+
+    def _run_question(self, question: str, timeout: int, thread_name, cache_key: Optional[str]) -> str:
+        """
+        Ask a question in a new run, caching the answer under cache_key when it completes.
+        """
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = self._get_openai_client()
+            
+            # Create thread and send message
+            thread = self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url, 
+                thread_name=thread_name
+                )
+
+            run, responses, run_timeout = self._ask_in_thread(client, thread['id'], question, deadline, timeout)
+            if run_timeout is not None:
+                raise RunTimeoutError(run_timeout)
+            
+            # Return the response
+            return self._answer_from_run(run, responses, cache_key)
+        
+        except RunTimeoutError:
+            raise
+        
+        except Exception as e:
+            logger.error("❌ Error calling data agent: %s", e)
+            raise _to_fabric_error(e) from e
+        
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+    def conversation(self, thread_name=None, idle_timeout: Optional[float] = 1800,
+                     keep_thread: bool = False) -> "Conversation":
+        """
+        Start a multi-turn conversation that keeps its thread between questions.
+        
+        Conversations of this client that have gone idle are expired first.
+        
+        Args:
+            thread_name (str, optional): Named thread to use; a new thread is generated if None
+            idle_timeout (float, optional): Seconds without a turn after which the thread expires
+            keep_thread (bool): Leave the thread on the server when the conversation ends
+            
+        Returns:
+            Conversation: The conversation; close it (or use it as a context manager) when done
+        """
+        self._expire_idle_conversations()
+        conversation = Conversation(self, thread_name, idle_timeout, keep_thread)
+        self._conversations.add(conversation)
+        return conversation
+
+    def _run_turn(self, client: OpenAI, thread_id: str, question: str, deadline: Optional[float],
+                  timeout: Optional[float]) -> tuple:
+        """
+        Send a question to a thread, start a run and wait for it until the deadline.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread to ask in
+            question (str): The question to ask
+            deadline (float, optional): Wall-clock time from PollStrategy.start_deadline()
+            timeout (float, optional): The timeout the deadline was started with
+            
+        Returns:
+            tuple: The run, its PollMetrics and a RunTimeout (None unless the run was cancelled at the deadline)
+        """
+        self._send_question(client, thread_id, question)
+        
+        # Start the run
+        run = self._create_run(client, thread_id)
+        
+        # Monitor the run until the deadline, cancelling it on expiry
+        run, poll_metrics = self._wait_for_run(client, thread_id, run, deadline=deadline)
+        return run, poll_metrics, self._get_run_timeout(thread_id, run, poll_metrics, timeout)
+
+    def _list_run_steps(self, client: OpenAI, thread_id: str, run_id: str) -> list:
+        """
+        List every step of a run, following the pages.
+        """
+        with self.tracer.span("runs.steps.list"):
+            return list(_iter_cursor_pages(client.beta.threads.runs.steps.list,
+                                           thread_id=thread_id, run_id=run_id, limit=_PAGE_SIZE))
+
+    def _ask_in_thread(self, client: OpenAI, thread_id: str, question: str, deadline: Optional[float],
+                     timeout: Optional[float]) -> tuple:
+        """
+        Send a question to an existing thread, run it and collect the answer of that run.
+        
+        Args:
+            client (OpenAI): Configured OpenAI client
+            thread_id (str): The thread to ask in
+            question (str): The question to ask
+            deadline (float, optional): Wall-clock time from PollStrategy.start_deadline()
+            timeout (float, optional): The timeout the deadline was started with
+            
+        Returns:
+            tuple: The run, the assistant responses of this run and a RunTimeout
+                   (None unless the run was cancelled at the deadline)
+        """
+        run, poll_metrics, run_timeout = self._run_turn(client, thread_id, question, deadline, timeout)
+        self._log_final_status(run, poll_metrics)
+        if run_timeout is not None:
+            return run, [], run_timeout
+        
+        # Get only this run's messages; a kept thread also holds earlier turns
+        messages = self._list_new_messages(client, thread_id, run_id=run.id)
+        return run, self._extract_assistant_responses(messages, run_id=run.id), None
+
+    def _ask_batch_item(self, index: int, question: str, timeout: int, thread_name) -> BatchResult:
+        """
+        Ask one batch question, capturing any error in the result.
+        """
+        start_time = time.time()
+        try:
+            response = self.ask(question, timeout=timeout, thread_name=thread_name)
+            return BatchResult(index, question, response=response, elapsed=time.time() - start_time)
+        except Exception as e:
+            return BatchResult(index, question, error=e, elapsed=time.time() - start_time)
+
+    def ask_many(self, questions: list, concurrency: int = 4, timeout: int = 120, thread_name = None) -> list:
+        """
+        Ask several questions concurrently and return the results in input order.
+        
+        Questions run on a pool of at most `concurrency` worker threads, so a
+        batch takes roughly as long as its slowest items rather than the sum.
+        
+        Args:
+            questions (list): The questions to ask
+            concurrency (int): Maximum number of runs in flight
+            timeout (int): Maximum time to wait for each response in seconds
+            thread_name (str, optional): The name of the thread to use for every question;
+                                         only with concurrency=1
+            
+        Returns:
+            list: One BatchResult per question, in the order of `questions`
+        """
+        results = [None] * len(questions)
+        for result in self.ask_many_as_completed(questions, concurrency, timeout, thread_name):
+            results[result.index] = result
+        return results
+
+    def ask_many_as_completed(self, questions: list, concurrency: int = 4, timeout: int = 120, thread_name = None):
+        """
+        Ask several questions concurrently and yield each result as soon as it is ready.
+        
+        Args:
+            questions (list): The questions to ask
+            concurrency (int): Maximum number of runs in flight
+            timeout (int): Maximum time to wait for each response in seconds
+            thread_name (str, optional): The name of the thread to use for every question;
+                                         only with concurrency=1
+            
+        Yields:
+            BatchResult: Results in completion order
+        """
+        self._check_batch_options(concurrency, thread_name)
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fabric-ask") as executor:
+            futures = [
+                # Each worker thread gets a copy of the caller's context
+                executor.submit(contextvars.copy_context().run, self._ask_batch_item, index, question, timeout, thread_name)
+                for index, question in enumerate(questions)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    @_traced_call("ask_stream")
+    def ask_stream(self, question: str, timeout: int = 120, thread_name = None):
+        """
+        Ask a question and yield events as the run streams them.
+        
+        Text arrives as "text_delta" events while the agent is still answering,
+        instead of after the run completes. Run status changes, finished tool
+        calls and any SQL found in them are yielded as they happen.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to stream in seconds; on expiry the run is
+                           cancelled and a final "timeout" event carries a RunTimeout
+            thread_name (str, optional): The name of the thread to use
+            
+        Yields:
+            StreamEvent: Status, text delta, tool call, SQL and timeout events
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        logger.info("Asking (streaming): %s", question)
+        
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = self._get_openai_client()
+            thread = self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+            
+            self._send_question(client, thread['id'], question)
+            
+            watch = _StreamWatch(self, thread['id'], deadline, timeout)
+            stream = self._create_run(client, thread['id'], **watch.run_options())
+            try:
+                with stream:
+                    for event in stream:
+                        for stream_event in self._convert_stream_event(event):
+                            watch.observe(stream_event)
+                            yield stream_event
+                        if watch.expired():
+                            break
+            except httpx.ReadTimeout:
+                # A stalled stream is cut off at the deadline by the read timeout
+                if not watch.stalled():
+                    raise
+            watch.finish()
+            
+            if watch.timed_out and watch.run_id is not None:
+                cancelled_run = self._cancel_run(client, thread['id'], watch.run_id)
+                yield self._stream_timeout_event(thread['id'], watch.run_id, cancelled_run, timeout, deadline)
+        
+        except Exception as e:
+            logger.error("❌ Error streaming from data agent: %s", e)
+            raise _to_fabric_error(e) from e
+        
+        finally:
+            # Clean up resources in the background, also when the caller stops iterating early
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+    @_traced_call("get_run_details")
+    def get_run_details(self, question: str, thread_name=None, timeout: int = 120) -> dict:
+        """
+        Ask a question and return detailed run information including steps.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for the run in seconds; on expiry the
+                           run is cancelled and "run_timeout" describes it
+            
+        Returns:
+            dict: Detailed response including run steps, metadata, and SQL queries if lakehouse data source
+        """
+        logger.info("🔍 Getting detailed run info for: %s", question)
+        
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = self._get_openai_client()
+            
+            # Create thread
+            thread = self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+            
+            # Send the question, then start and monitor the run
+            run, poll_metrics, run_timeout = self._run_turn(client, thread['id'], question, deadline, timeout)
+            
+            # Get detailed run steps, every page of them
+            steps = self._list_run_steps(client, thread['id'], run.id)
+            
+            # Get the messages of this run, not earlier turns of a named thread
+            messages = self._list_new_messages(client, thread['id'], run_id=run.id)
+            
+            result = self._build_run_details_result(question, run, steps, messages)
+            result["poll_metrics"] = asdict(poll_metrics)
+            result["run_timeout"] = asdict(run_timeout) if run_timeout else None
+            return result
+            
+        except Exception as e:
+            logger.error("❌ Error getting run details: %s", e)
+            return self._build_error_result(e)
+        
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+    @_traced_call("get_raw_run_response")
+    def get_raw_run_response(self, question: str, timeout: int = 120, thread_name = None) -> dict:
+        """
+        Ask a question and return the complete raw response including all run details.
+        This is useful when you need to parse or analyze the full response structure.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Returns:
+            dict: Complete raw response with run steps, messages, and metadata
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        logger.info("🔍 Getting raw response for: %s", question)
+        
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = self._get_openai_client()
+            
+            # Create thread
+            thread = self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+
+            logger.debug("🧵 Existing or created thread: %s", thread, extra={"thread_id": thread['id']})
+
+            # Send the question, then start and monitor the run until the deadline
+            run, poll_metrics, run_timeout = self._run_turn(client, thread['id'], question, deadline, timeout)
+            self._log_final_status(run, poll_metrics)
+            
+            # Get all run details, every page of the steps
+            steps = self._list_run_steps(client, thread['id'], run.id)
+            
+            messages = self._list_new_messages(client, thread['id'], run_id=run.id)
+            
+            # Return complete raw response
+            return self._build_raw_run_response(question, thread, run, steps, messages, timeout,
+                                                poll_metrics, run_timeout)
+            
+        except Exception as e:
+            logger.error("❌ Error getting raw response: %s", e)
+            return {"question": question, **self._build_error_result(e), "timestamp": time.time(), "success": False}
+        
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+    @_traced_call("get_result_table")
+    def get_result_table(self, question: str, timeout: int = 120, thread_name = None) -> Optional[ResultTable]:
+        """
+        Ask a question and return the complete row set of its data retrieval as typed columns.
+        
+        Unlike the 10-row markdown previews of get_run_details(), every row of
+        the tool output is kept and values keep their JSON types.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Returns:
+            ResultTable: The rows of the last tool output that returned records,
+                         or None when the run returned no tabular data
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: For any other failure of the call
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        logger.info("📊 Getting result table for: %s", question)
+        
+        steps = self._run_for_steps(question, timeout, thread_name)
+        return self._extract_result_table(steps)
+
+    @_traced_call("iter_result_rows")
+    def iter_result_rows(self, question: str, timeout: int = 120, thread_name = None):
         """
-        Initialize the Fabric Data Agent client.
+        Ask a question and lazily iterate the records of its data retrieval.
+        
+        Rows are decoded one at a time from the tool output, so memory stays
+        proportional to the rows the caller keeps, not to the whole payload.
+        Errors are raised to the caller.
         
         Args:
-            tenant_id (str): Your Azure tenant ID
-            data_agent_url (str): The published URL of your Fabric Data Agent
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Yields:
+            dict: One record per row of the last tool output that returned records
         """
-        self.tenant_id = tenant_id
-        self.data_agent_url = data_agent_url
-        self.credential = None
-        self.token = None
-        
-        # Validate inputs
-        if not tenant_id:
-            raise ValueError("tenant_id is required")
-        if not data_agent_url:
-            raise ValueError("data_agent_url is required")
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        print(f"Initializing Fabric Data Agent Client...")
-        print(f"Tenant ID: {tenant_id}")
-        print(f"Data Agent URL: {data_agent_url}")
+        steps = self._run_for_steps(question, timeout, thread_name)
+        result_output = self._find_result_output(steps)
+        if result_output:
+            text, rows_start, _ = result_output
+            yield from _iter_json_rows(text, rows_start)
+
+    @_traced_call("stream_result_rows")
+    def stream_result_rows(self, question: str, sink, batch_size: int = 1000, timeout: int = 120,
+                           thread_name = None) -> int:
+        """
+        Ask a question and stream the records of its data retrieval into a sink in batches.
         
-        self._authenticate()
-    
-    def _authenticate(self):
+        Args:
+            question (str): The question to ask
+            sink (callable): Called with each list of up to batch_size row dicts,
+                             e.g. a JsonLinesSink or a DataFrame builder
+            batch_size (int): Rows per sink call
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Returns:
+            int: Number of rows streamed
         """
-        Perform interactive browser authentication and get initial token.
+        return _stream_rows(self.iter_result_rows(question, timeout, thread_name), sink, batch_size)
+
+    def _run_for_steps(self, question: str, timeout: int, thread_name):
         """
+        Run a question on a (new or named) thread and return the run steps.
+        
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: For any other failure of the call
+        """
+        thread = None
         try:
-            print("\n🔐 Starting authentication...")
-            print("A browser window will open for you to sign in to your Microsoft account.")
-            
-            # Create credential for interactive authentication
-            self.credential = InteractiveBrowserCredential(
-                tenant_id=self.tenant_id,
-                # Optional: specify redirect_uri if needed
-                # redirect_uri="http://localhost:8400"
-            )
+            deadline = self._start_deadline(timeout)
+            client = self._get_openai_client()
             
-            # Get initial token
-            self._refresh_token()
+            # Create thread
+            thread = self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
             
-            print("✅ Authentication successful!")
+            # Send the question, then start and monitor the run
+            run, _, run_timeout = self._run_turn(client, thread['id'], question, deadline, timeout)
+            if run_timeout is not None:
+                raise RunTimeoutError(run_timeout)
             
-        except Exception as e:
-            print(f"❌ Authentication failed: {e}")
+            # Read every page before the thread is handed to the cleanup queue
+            return self._list_run_steps(client, thread['id'], run.id)
+        
+        except RunTimeoutError:
             raise
+        
+        except Exception as e:
+            logger.error("❌ Error getting run steps: %s", e)
+            raise _to_fabric_error(e) from e
+        
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+
+class AsyncFabricDataAgentClient(_FabricDataAgentClientBase):
+    """
+    Asyncio client for calling Microsoft Fabric Data Agents from external applications.
+    
+    Same authentication and response parsing as FabricDataAgentClient, but every
+    network call is awaited, so many runs can be in flight on one event loop
+    without blocking other coroutines:
+    - AsyncOpenAI for the Assistants-compatible endpoints
+    - One pooled httpx.AsyncClient, also used for the private Fabric thread lookup
+    - Sign-in and blocking token refreshes are pushed to a worker thread
     
-    def _refresh_token(self):
+    Close it with 'await client.aclose()' or use it as an async context manager.
+    """
+    
+    _async_assistant_lock = None
+    # Event loop the pooled connections were opened on; they can only be closed there
+    _loop = None
+    
+    def _authenticate(self):
         """
-        Refresh the authentication token.
+        Set up the token broker without signing in.
+        
+        The constructor may run on the event loop, so the first token is
+        fetched by the first call, on a worker thread (see _get_openai_client).
         """
-        try:
-            print("🔄 Refreshing authentication token...")
-            if self.credential is None:
-                raise ValueError("No credential available")
-            self.token = self.credential.get_token("https://api.fabric.microsoft.com/.default")
-            print(f"✅ Token obtained, expires at: {time.ctime(self.token.expires_on)}")
-            
-        except Exception as e:
-            print(f"❌ Token refresh failed: {e}")
-            raise
+        logger.info("🔐 Starting authentication, the first call signs in...")
+        self._create_token_broker()
     
-    def _get_openai_client(self) -> OpenAI:
+    async def _get_openai_client(self) -> AsyncOpenAI:
         """
-        Create an OpenAI client configured for Fabric Data Agent calls.
+        Get the AsyncOpenAI client configured for Fabric Data Agent calls.
         
         Returns:
-            OpenAI: Configured OpenAI client
+            AsyncOpenAI: Configured async OpenAI client
         """
-        # Check if token needs refresh (refresh 5 minutes before expiry)
-        if self.token and self.token.expires_on <= (time.time() + 300):
-            self._refresh_token()
+        # One ActivityId per client call, stamped on each request it makes;
+        # a traced call has already made its own
+        if _current_span.get() is None:
+            _current_activity_id.set(str(uuid.uuid4()))
+        
+        with self.tracer.span("token"):
+            if self.token_broker.needs_refresh():
+                # azure-identity credentials are blocking, keep them off the event loop
+                await asyncio.to_thread(self.token_broker.get_token)
+            self.token = self.token_broker.get_token()
         
         if not self.token:
             raise ValueError("No valid authentication token available")
         
-        return OpenAI(
-            api_key="",  # Not used - we use Bearer token
-            base_url=self.data_agent_url,
-            default_query={"api-version": "2024-05-01-preview"},
-            default_headers={
-                "Authorization": f"Bearer {self.token.token}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "ActivityId": str(uuid.uuid4())
-            }
-        )
+        if self._openai_client is None:
+            with self._transport_lock:
+                if self._openai_client is None:
+                    self._openai_client = AsyncOpenAI(
+                        api_key="",  # Not used - the Bearer token is set per request
+                        base_url=self.data_agent_url,
+                        default_query={"api-version": "2024-05-01-preview"},
+                        http_client=self._get_http_client(),
+                        max_retries=0  # The transport retries, following the RetryPolicy
+                    )
+        
+        return self._openai_client
 
-    def _get_existing_or_create_new_thread(self, data_agent_url: str, thread_name = None) -> dict:
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the long-lived, pooled async HTTP client shared by every call of this client.
+        
+        Returns:
+            httpx.AsyncClient: The pooled async HTTP client
+        """
+        if self._http_client is None:
+            with self._transport_lock:
+                if self._http_client is None:
+                    self._loop = asyncio.get_running_loop()
+                    self._http_client = httpx.AsyncClient(
+                        **self._get_http_client_options(),
+                        transport=_AsyncRetryTransport(httpx.AsyncHTTPTransport(**self._get_transport_options()),
+                                                       self.retry_policy, self.circuit_breaker,
+                                                       self.capacity_limiter),
+                        event_hooks={"request": [self._aprepare_request]}
+                    )
+        return self._http_client
+
+    async def _aprepare_request(self, request: httpx.Request):
+        """
+        Async request hook: swap in the current bearer token and correlation id.
+        
+        A token that expired during a long call is refreshed on a worker thread;
+        the credential and the broker's lock would otherwise block the event loop.
+        """
+        if self.token_broker.needs_refresh():
+            token = await asyncio.to_thread(self.token_broker.get_token)
+        else:
+            token = self.token_broker.get_token()
+        self._stamp_request(request, token, self.transport_stats.atrace)
+
+    async def aclose(self):
+        """
+        Close the pooled HTTP connections held by this client, after closing open
+        conversations and flushing pending thread deletes.
+        """
+        for conversation in list(self._conversations):
+            await conversation.aclose()
+        await self.thread_cleanup.aflush(timeout=10)
+        if self._owns_thread_cleanup:
+            self.thread_cleanup.close()
+        http_client = self._http_client
+        self._http_client = None
+        self._openai_client = None
+        if http_client is not None:
+            await http_client.aclose()
+        if self._owns_token_broker and self.token_broker is not None:
+            self.token_broker.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def _get_existing_or_create_new_thread(self, data_agent_url: str, thread_name = None) -> dict:
         """
         Get an existing thread or Create a new thread for the target Fabric Data Agent.
 
@@ -151,947 +5519,1160 @@ class FabricDataAgentClient:
             thread_name (str, optional): Name for the new or existing thread. If None, a random name is generated.
 
         Returns:
-            list: A list containing the ID and name of the created thread or existing thread
+            dict: The ID and name of the created thread or existing thread
         """
-        if thread_name == None: # if None, generate a random thread name to create a new thread
-            thread_name = f'external-client-thread-{uuid.uuid4()}'
-        else:
-            thread_name = thread_name # use provided thread name to attempt to get existing thread, if not create new thread
-        
-        if "aiskills" in data_agent_url: # future proofing for different url formats
-            base_url = data_agent_url.replace("aiskills", "dataagents").removesuffix("/openai").replace("/aiassistant","/__private/aiassistant")
-        else:
-            base_url = data_agent_url.removesuffix("/openai").replace("/aiassistant","/__private/aiassistant")
-        
-        get_new_thread_url = f'{base_url}/threads/fabric?tag="{thread_name}"'
+        generated_name = thread_name is None
+        get_new_thread_url, thread_name = self._get_thread_lookup_url(data_agent_url, thread_name)
 
-        headers = {
-            "Authorization": f"Bearer {self.token.token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "ActivityId": str(uuid.uuid4())
-        }
+        with self.tracer.span("thread.lookup") as span:
+            response = await self._get_http_client().get(get_new_thread_url)
+            response.raise_for_status()
+            thread = response.json()
+            span.attributes["fabric.thread_id"] = thread["id"]
+        return self._track_thread(thread, thread_name, generated_name)
 
-        response = requests.get(get_new_thread_url, headers=headers)
-        response.raise_for_status()
-        thread = response.json()
-        thread["name"] = thread_name #adding thread name to returned object
+    async def _delete_thread(self, thread_id: str, parent: Optional[tuple] = None):
+        """
+        Delete a thread (called by the cleanup queue).
+        """
+        with self.tracer.span("thread.delete", parent, {"fabric.thread_id": thread_id}):
+            client = await self._get_openai_client()
+            await client.beta.threads.delete(thread_id=thread_id)
 
-        return thread
+    def _delete_thread_later(self, thread_id: str):
+        """
+        Schedule the deletion of a finished thread as a background task on the running loop.
+        """
+        self._forget_message_cursor(thread_id)
+        self.thread_cleanup.submit_async(thread_id, functools.partial(self._delete_thread, parent=_current_span.get()))
 
-    def ask(self, question: str, timeout: int = 120, thread_name = None) -> str:
+    async def _list_new_messages(self, client: AsyncOpenAI, thread_id: str, run_id: Optional[str] = None) -> list:
         """
-        Ask a question to the Fabric Data Agent.
+        List the messages added to a thread since the last listing of that thread, oldest first.
         
         Args:
-            question (str): The question to ask
-            timeout (int): Maximum time to wait for response in seconds
-            thread_name (str, optional): The name of the thread to use
-
+            client (AsyncOpenAI): Configured async OpenAI client
+            thread_id (str): The thread to list
+            run_id (str, optional): Only list messages created by this run
+            
         Returns:
-            str: The response from the data agent
+            list: The new Message objects
         """
-        if not question.strip():
-            raise ValueError("Question cannot be empty")
+        options = self._message_list_options(run_id=run_id, after=self._get_message_cursor(thread_id))
+        with self.tracer.span("messages.list"):
+            messages = [message async for message in _aiter_cursor_pages(client.beta.threads.messages.list,
+                                                                         thread_id=thread_id, **options)]
+        if messages:
+            self._set_message_cursor(thread_id, messages[-1].id)
+        return messages
+
+    async def sweep_orphaned_threads(self, min_age: float = 3600) -> int:
+        """
+        Delete generated threads that a crashed or killed process never cleaned up.
         
-        print(f"\n Asking: {question}")
+        Args:
+            min_age (float): Only threads created at least this many seconds ago
+            
+        Returns:
+            int: Number of threads scheduled for deletion
+        """
+        return self._queue_orphaned_threads(min_age)
+
+    async def iter_run_steps(self, thread_id: str, run_id: str, limit: int = _PAGE_SIZE):
+        """
+        Lazily iterate every step of a run (async generator), requesting pages only as they are consumed.
         
-        try:
-            client = self._get_openai_client()
+        Args:
+            thread_id (str): The thread the run belongs to
+            run_id (str): The run whose steps to list
+            limit (int): Steps per page
             
-            # Create assistant without specifying model or instructions
-            assistant = client.beta.assistants.create(model="not used")
+        Yields:
+            RunStep: The run steps as SDK objects, newest first (the API default order)
+        """
+        client = await self._get_openai_client()
+        async for step in _aiter_cursor_pages(client.beta.threads.runs.steps.list,
+                                              thread_id=thread_id, run_id=run_id, limit=limit):
+            yield step
+
+    async def iter_messages(self, thread_id: str, run_id: Optional[str] = None, after: Optional[str] = None,
+                            order: str = "asc", limit: int = _PAGE_SIZE):
+        """
+        Lazily iterate the messages of a thread (async generator), requesting pages only as they are consumed.
+        
+        Args:
+            thread_id (str): The thread to list
+            run_id (str, optional): Only messages created by this run
+            after (str, optional): Start after this message id
+            order (str): "asc" for oldest first, "desc" for newest first
+            limit (int): Messages per page
             
-            # Create thread and send message
-            thread = self._get_existing_or_create_new_thread(
-                data_agent_url=self.data_agent_url, 
-                thread_name=thread_name
-                )
+        Yields:
+            Message: The messages as SDK objects
+        """
+        client = await self._get_openai_client()
+        options = self._message_list_options(order, limit, run_id, after)
+        async for message in _aiter_cursor_pages(client.beta.threads.messages.list, thread_id=thread_id, **options):
+            yield message
 
-            client.beta.threads.messages.create(
-                thread_id=thread['id'],
+    async def _send_question(self, client: AsyncOpenAI, thread_id: str, question: str):
+        """
+        Add the user's question to a thread.
+        """
+        with self.tracer.span("messages.create"):
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
                 role="user",
                 content=question
             )
-            
-            # Start the run
-            run = client.beta.threads.runs.create(
-                thread_id=thread['id'],
-                assistant_id=assistant.id
-            )
-            
-            # Monitor the run with timeout
-            start_time = time.time()
-            while run.status in ["queued", "in_progress"]:
-                if time.time() - start_time > timeout:
-                    print(f"⏰ Request timed out after {timeout} seconds")
-                    break
-                
-                print(f"⏳ Status: {run.status}")
-                time.sleep(2)
-                
-                run = client.beta.threads.runs.retrieve(
-                    thread_id=thread['id'],
-                    run_id=run.id
-                )
-            
-            print(f"✅ Final status: {run.status}")
-            
-            # Get the response messages
-            messages = client.beta.threads.messages.list(
-                thread_id=thread['id'],
-                order="asc"
-            )
 
-            # Extract assistant responses
-            responses = []
-            for msg in messages.data:
-                if msg.role == "assistant":
-                    try:
-                        content = msg.content[0]
-                        # Handle different content types safely
-                        if hasattr(content, 'text'):
-                            text_content = getattr(content, 'text', None)
-                            if text_content is not None and hasattr(text_content, 'value'):
-                                responses.append(text_content.value)
-                            elif text_content is not None:
-                                responses.append(str(text_content))
-                            else:
-                                responses.append(str(content))
-                        else:
-                            responses.append(str(content))
-                    except (IndexError, AttributeError):
-                        responses.append(str(msg.content))
-            
-            # Clean up resources
-            try:
-                client.beta.threads.delete(thread_id=thread['id'])
-            except Exception as cleanup_error:
-                print(f"⚠️ Cleanup warning: {cleanup_error}")
-            
-            # Return the response
-            if responses:
-                return "\n".join(responses)
-            else:
-                return "No response received from the data agent."
-        
-        except Exception as e:
-            print(f"❌ Error calling data agent: {e}")
-            return f"Error: {e}"
-    
-    def get_run_details(self, question: str, thread_name=None) -> dict:
+    async def _get_assistant_id(self, client: AsyncOpenAI) -> str:
         """
-        Ask a question and return detailed run information including steps.
+        Get the cached assistant id for this data agent, creating one on first use.
         
         Args:
-            question (str): The question to ask
+            client (AsyncOpenAI): Configured async OpenAI client
             
         Returns:
-            dict: Detailed response including run steps, metadata, and SQL queries if lakehouse data source
+            str: The assistant id
+        """
+        assistant_id = self.assistant_cache.get(self.data_agent_url)
+        if assistant_id is None:
+            if self._async_assistant_lock is None:
+                self._async_assistant_lock = asyncio.Lock()
+            # Only one task creates the assistant, the others reuse its id
+            async with self._async_assistant_lock:
+                assistant_id = self.assistant_cache.get(self.data_agent_url)
+                if assistant_id is None:
+                    # Create assistant without specifying model or instructions
+                    with self.tracer.span("assistants.create"):
+                        assistant_id = (await client.beta.assistants.create(model="not used")).id
+                    self.assistant_cache.set(self.data_agent_url, assistant_id)
+        return assistant_id
+
+    async def _create_run(self, client: AsyncOpenAI, thread_id: str, **run_options):
         """
-        print(f"\n🔍 Getting detailed run info for: {question}")
+        Start a run on a thread with the cached assistant, replacing a stale assistant id once.
         
-        try:
-            client = self._get_openai_client()
-            
-            # Create assistant and thread without specifying model or instructions
-            assistant = client.beta.assistants.create(model="not used")
-            thread = self._get_existing_or_create_new_thread(
-                data_agent_url=self.data_agent_url,
-                thread_name=thread_name
-                )
-            
-            client.beta.threads.messages.create(
-                thread_id=thread['id'],
-                role="user",
-                content=question
-            )
-            
-            # Start and monitor run
-            run = client.beta.threads.runs.create(
-                thread_id=thread['id'],
-                assistant_id=assistant.id
-            )
+        Args:
+            client (AsyncOpenAI): Configured async OpenAI client
+            thread_id (str): The thread to run
+            **run_options: Extra arguments for runs.create, e.g. stream=True
             
-            while run.status in ["queued", "in_progress"]:
-                print(f"⏳ Status: {run.status}")
-                time.sleep(2)
-                run = client.beta.threads.runs.retrieve(thread_id=thread['id'], run_id=run.id)
+        Returns:
+            Run: The created run (or the event stream when streaming)
+        """
+        assistant_id = await self._get_assistant_id(client)
+        try:
+            with self.tracer.span("runs.create"):
+                return await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_options)
+        except (NotFoundError, BadRequestError) as e:
+            if not _is_stale_assistant_error(e):
+                raise
+            logger.warning("♻️ Cached assistant %s was rejected, creating a new one", assistant_id)
+            self.assistant_cache.invalidate(self.data_agent_url, assistant_id)
+            assistant_id = await self._get_assistant_id(client)
+            with self.tracer.span("runs.create"):
+                return await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_options)
+
+    async def _wait_for_run(self, client: AsyncOpenAI, thread_id: str, run, deadline: Optional[float] = None) -> tuple:
+        """
+        Poll a run until it leaves queued/in_progress, following the poll strategy.
+        
+        When the deadline expires the run is cancelled server-side instead of
+        being left to run on, see _cancel_run().
+        
+        Args:
+            client (AsyncOpenAI): Configured async OpenAI client
+            thread_id (str): The thread the run belongs to
+            run: The run to monitor
+            deadline (float, optional): Wall-clock time from PollStrategy.start_deadline()
             
-            # Get detailed run steps
-            steps = client.beta.threads.runs.steps.list(
-                thread_id=thread['id'],
-                run_id=run.id
-            )
+        Returns:
+            tuple: The last retrieved run and its PollMetrics
+        """
+        wait = _RunWait(self, thread_id, run, deadline)
+        while run.status in ["queued", "in_progress"]:
+            delay = wait.next_delay(run)
+            if delay is None:
+                run = wait.cancelled(run, await self._cancel_run(client, thread_id, run.id))
+                break
+            await asyncio.sleep(delay)
             
-            # Get messages
-            messages = client.beta.threads.messages.list(
-                thread_id=thread['id'],
-                order="asc"
-            )
+            polled_at = time.time()
+            run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+            wait.polled(run, polled_at)
+        
+        return wait.finish(run)
+
+    async def _cancel_run(self, client: AsyncOpenAI, thread_id: str, run_id: str):
+        """
+        Cancel a run server-side and wait briefly for the cancel to be acknowledged.
+        
+        Args:
+            client (AsyncOpenAI): Configured async OpenAI client
+            thread_id (str): The thread the run belongs to
+            run_id (str): The run to cancel
             
-            # Extract SQL queries and data from steps if lakehouse data source is detected
-            sql_analysis = self._extract_sql_queries_with_data(steps)
-            
-            # Also try the old regex method as backup
-            if not sql_analysis["queries"]:
-                regex_queries = self._extract_sql_queries(steps)
-                if regex_queries:
-                    sql_analysis["queries"] = regex_queries
-                    sql_analysis["data_retrieval_query"] = regex_queries[0] if regex_queries else None
-            
-            # Also extract data from the final assistant message
-            messages_data = messages.model_dump()
-            assistant_messages = [msg for msg in messages_data.get('data', []) if msg.get('role') == 'assistant']
-            if assistant_messages:
-                latest_message = assistant_messages[-1]
-                content = latest_message.get('content', [])
-                if content and len(content) > 0:
-                    # Extract text content
-                    text_content = ""
-                    if isinstance(content[0], dict):
-                        if 'text' in content[0]:
-                            if isinstance(content[0]['text'], dict) and 'value' in content[0]['text']:
-                                text_content = content[0]['text']['value']
-                            else:
-                                text_content = str(content[0]['text'])
-                    else:
-                        text_content = str(content[0])
-                    
-                    # Extract structured data from the assistant's text response
-                    if text_content:
-                        text_data_preview = self._extract_data_from_text_response(text_content)
-                        if text_data_preview:
-                            # Add the text-based data preview
-                            if sql_analysis["queries"]:
-                                # If we have queries but no data previews, or empty previews, use the text-based one
-                                if not sql_analysis["data_previews"] or not any(sql_analysis["data_previews"]):
-                                    sql_analysis["data_previews"] = [text_data_preview]
-                                else:
-                                    # Add to existing previews
-                                    sql_analysis["data_previews"].append(text_data_preview)
-                                
-                                # If we don't have a specific data retrieval query identified, use the first query
-                                if not sql_analysis["data_retrieval_query"] and sql_analysis["queries"]:
-                                    sql_analysis["data_retrieval_query"] = sql_analysis["queries"][0]
-                                    sql_analysis["data_retrieval_query_index"] = 1
-            
-            # Clean up
+        Returns:
+            Run: The last retrieved run, or None when the cancel request failed
+        """
+        with self.tracer.span("runs.cancel", attributes={"fabric.run_id": run_id}) as span:
             try:
-                client.beta.threads.delete(thread_id=thread['id'])
-            except Exception as cleanup_error:
-                print(f"⚠️ Warning: Thread cleanup failed: {cleanup_error}")
-            
-            result = {
-                "question": question,
-                "run_status": run.status,
-                "run_steps": steps.model_dump(),
-                "messages": messages.model_dump(),
-                "timestamp": time.time()
-            }
-            
-            # Add SQL analysis if found
-            if sql_analysis["queries"]:
-                result["sql_queries"] = sql_analysis["queries"]
-                result["sql_data_previews"] = sql_analysis["data_previews"]
-                result["data_retrieval_query"] = sql_analysis["data_retrieval_query"]
-                
-                print(f"🗃️ Found {len(sql_analysis['queries'])} SQL queries in lakehouse operations")
-                
-                for i, query in enumerate(sql_analysis["queries"], 1):
-                    print(f"📄 SQL Query {i}:")
-                    print(f"   {query}")
-                    
-                    # Show data preview if this query retrieved data
-                    if i == sql_analysis["data_retrieval_query_index"]:
-                        print(f"   🎯 This query retrieved the data!")
-                        if sql_analysis["data_previews"][i-1]:
-                            print(f"   📊 Data Preview:")
-                            preview = sql_analysis["data_previews"][i-1]
-                            
-                            # Check if the preview is a raw markdown table (single item)
-                            if len(preview) == 1 and '\n' in preview[0] and '|' in preview[0]:
-                                # This is a raw markdown table, print it directly
-                                print(preview[0])
-                            else:
-                                # This is parsed row data, print line by line
-                                for line in preview[:5]:  # Show first 5 lines
-                                    print(f"      {line}")
-                                if len(preview) > 5:
-                                    print(f"      ... and {len(preview) - 5} more lines")
-                    print()  # Empty line for readability
+                run = await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+            except Exception as e:
+                # Typically the run finished between the last poll and the cancel
+                logger.warning("⚠️ Could not cancel run %s: %s", run_id, e, extra={"thread_id": thread_id, "run_id": run_id})
+                span.status = "error"
+                return None
             
-            return result
+            give_up_at = time.time() + self.poll_strategy.cancel_timeout
+            while run.status in ["queued", "in_progress", "cancelling"]:
+                remaining = give_up_at - time.time()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(self.poll_strategy.cancel_poll_interval, remaining))
+                run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
             
-        except Exception as e:
-            print(f"❌ Error getting run details: {e}")
-            return {"error": str(e)}
+            logger.info("🛑 Run %s status after cancel: %s", run_id, run.status,
+                        extra={"thread_id": thread_id, "run_id": run_id, "phase": "runs.cancel"})
+            return run
 
-    def get_raw_run_response(self, question: str, timeout: int = 120, thread_name = None) -> dict:
+    @_traced_call("ask")
+    async def ask(self, question: str, timeout: int = 120, thread_name = None, bypass_cache: bool = False) -> str:
         """
-        Ask a question and return the complete raw response including all run details.
-        This is useful when you need to parse or analyze the full response structure.
+        Ask a question to the Fabric Data Agent.
         
         Args:
             question (str): The question to ask
             timeout (int): Maximum time to wait for response in seconds
-            
+            thread_name (str, optional): The name of the thread to use
+            bypass_cache (bool): Force a fresh run even if the answer cache has this question
+                                 or the same question is already in flight
+
         Returns:
-            dict: Complete raw response with run steps, messages, and metadata
+            str: The response from the data agent
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline (it is cancelled server-side)
+            FabricThrottledError: When Fabric kept answering 429 after the retries
+            CircuitOpenError: While the endpoint's circuit breaker is open
+            FabricAgentError: For any other failure of the call
         """
         if not question.strip():
             raise ValueError("Question cannot be empty")
         
-        print(f"\n🔍 Getting raw response for: {question}")
+        logger.info("Asking: %s", question)
+        
+        cache_key, cached_answer = self._get_cached_answer(question, thread_name, bypass_cache)
+        if cached_answer is not None:
+            return cached_answer
+        
+        if bypass_cache:
+            return await self._run_question(question, timeout, thread_name, cache_key)
         
+        # Callers asking the same question meanwhile wait for this run instead of starting their own
+        key = self.single_flight.make_key(self.data_agent_url, question, thread_name)
+        started = time.time()
         try:
-            client = self._get_openai_client()
-            
-            # Create assistant and thread
-            assistant = client.beta.assistants.create(model="not used")
-
-            thread = self._get_existing_or_create_new_thread(
-                data_agent_url=self.data_agent_url,
-                thread_name=thread_name
-                )
-
-            print(f"🧵 Existing or created thread: {thread}")
-
-            # Send the question
-            client.beta.threads.messages.create(
-                thread_id=thread['id'],
-                role="user",
-                content=question
+            return await self.single_flight.do_async(
+                key, functools.partial(self._run_question, question, timeout, thread_name, cache_key),
+                timeout=self.poll_strategy.get_deadline(timeout)
             )
+        except RunTimeoutError:
+            raise
+        except TimeoutError:
+            raise self._coalesced_timeout(timeout, started) from None
+
+    async def _run_question(self, question: str, timeout: int, thread_name, cache_key: Optional[str]) -> str:
+        """
+        Ask a question in a new run, caching the answer under cache_key when it completes.
+        """
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = await self._get_openai_client()
             
-            # Start the run
-            run = client.beta.threads.runs.create(
-                thread_id=thread['id'],
-                assistant_id=assistant.id
-            )
-            
-            # Monitor the run with timeout
-            start_time = time.time()
-            while run.status in ["queued", "in_progress"]:
-                if time.time() - start_time > timeout:
-                    print(f"⏰ Request timed out after {timeout} seconds")
-                    break
-                
-                print(f"⏳ Status: {run.status}")
-                time.sleep(2)
-                
-                run = client.beta.threads.runs.retrieve(
-                    thread_id=thread['id'],
-                    run_id=run.id
-                )
-            
-            print(f"✅ Final status: {run.status}")
-            
-            # Get all run details
-            steps = client.beta.threads.runs.steps.list(
-                thread_id=thread['id'],
-                run_id=run.id
-            )
-            
-            messages = client.beta.threads.messages.list(
-                thread_id=thread['id'],
-                order="desc"
-            )
-            
-            # Clean up resources
-            try:
-                client.beta.threads.delete(thread_id=thread['id'])
-            except Exception as cleanup_error:
-                print(f"⚠️ Cleanup warning: {cleanup_error}")
-            
-            # Return complete raw response
-            return {
-                "question": question,
-                "run": run.model_dump(),
-                "steps": steps.model_dump(),
-                "messages": messages.model_dump(),
-                "timestamp": time.time(),
-                "timeout": timeout,
-                "success": run.status == "completed",
-                "thread": thread
-            }
+            # Create thread and send message
+            thread = await self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url, 
+                thread_name=thread_name
+                )
+
+            run, responses, run_timeout = await self._ask_in_thread(client, thread['id'], question, deadline, timeout)
+            if run_timeout is not None:
+                raise RunTimeoutError(run_timeout)
             
+            # Return the response
+            return self._answer_from_run(run, responses, cache_key)
+        
+        except RunTimeoutError:
+            raise
+        
         except Exception as e:
-            print(f"❌ Error getting raw response: {e}")
-            return {
-                "question": question,
-                "error": str(e),
-                "timestamp": time.time(),
-                "success": False
-            }
+            logger.error("❌ Error calling data agent: %s", e)
+            raise _to_fabric_error(e) from e
+        
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+    def conversation(self, thread_name=None, idle_timeout: Optional[float] = 1800,
+                     keep_thread: bool = False) -> "AsyncConversation":
+        """
+        Start a multi-turn conversation whose ask() is awaitable; end it with aclose().
+        """
+        self._expire_idle_conversations()
+        conversation = AsyncConversation(self, thread_name, idle_timeout, keep_thread)
+        self._conversations.add(conversation)
+        return conversation
 
-    def _extract_sql_queries_with_data(self, steps) -> dict:
+    async def _run_turn(self, client: AsyncOpenAI, thread_id: str, question: str, deadline: Optional[float],
+                        timeout: Optional[float]) -> tuple:
         """
-        Extract SQL queries from run steps using direct JSON parsing and output analysis.
+        Send a question to a thread, start a run and wait for it until the deadline.
         
-        Args:
-            steps: The run steps from the OpenAI API
-            
         Returns:
-            dict: Contains queries, data previews, and which query retrieved data
+            tuple: The run, its PollMetrics and a RunTimeout (None unless the run was cancelled at the deadline)
         """
-        sql_queries = []
-        data_previews = []
-        data_retrieval_query = None
-        data_retrieval_query_index = None
-        
-        try:
-            for step_idx, step in enumerate(steps.data):
-                if hasattr(step, 'step_details') and step.step_details:
-                    step_details = step.step_details
-                    
-                    # Check for tool calls which typically contain the SQL queries
-                    if hasattr(step_details, 'tool_calls') and step_details.tool_calls:
-                        for tool_idx, tool_call in enumerate(step_details.tool_calls):
-                            # Extract SQL from function arguments
-                            sql_from_args = self._extract_sql_from_function_args(tool_call)
-                            if sql_from_args:
-                                sql_queries.extend(sql_from_args)
-                            
-                            # Extract SQL from tool call output (where it's actually located in Fabric)
-                            sql_from_output = self._extract_sql_from_output(tool_call)
-                            if sql_from_output:
-                                sql_queries.extend(sql_from_output)
-                            
-                            # Extract data from tool call output
-                            data_preview = self._extract_structured_data_from_output(tool_call)
-                            if data_preview:
-                                # If we found data and SQL in this step, it's likely the retrieval query
-                                if sql_from_args or sql_from_output:
-                                    all_sql_this_call = sql_from_args + sql_from_output
-                                    data_retrieval_query = all_sql_this_call[-1] if all_sql_this_call else None
-                                    data_retrieval_query_index = len(sql_queries)
-                            
-                            data_previews.append(data_preview)
-        
-        except Exception as e:
-            print(f"⚠️ Warning: Could not extract SQL queries: {e}")
+        await self._send_question(client, thread_id, question)
         
-        # Remove duplicates while preserving order
-        unique_queries = list(dict.fromkeys(sql_queries))
+        # Start the run
+        run = await self._create_run(client, thread_id)
         
-        return {
-            "queries": unique_queries,
-            "data_previews": data_previews,
-            "data_retrieval_query": data_retrieval_query,
-            "data_retrieval_query_index": data_retrieval_query_index
-        }
+        # Monitor the run until the deadline, cancelling it on expiry
+        run, poll_metrics = await self._wait_for_run(client, thread_id, run, deadline=deadline)
+        return run, poll_metrics, self._get_run_timeout(thread_id, run, poll_metrics, timeout)
 
-    def _extract_sql_from_function_args(self, tool_call) -> list:
+    async def _list_run_steps(self, client: AsyncOpenAI, thread_id: str, run_id: str) -> list:
         """
-        Extract SQL queries from tool call function arguments.
+        List every step of a run, following the pages.
+        """
+        with self.tracer.span("runs.steps.list"):
+            return [step async for step in _aiter_cursor_pages(client.beta.threads.runs.steps.list,
+                                                               thread_id=thread_id, run_id=run_id, limit=_PAGE_SIZE)]
+
+    async def _ask_in_thread(self, client: AsyncOpenAI, thread_id: str, question: str, deadline: Optional[float],
+                           timeout: Optional[float]) -> tuple:
+        """
+        Send a question to an existing thread, run it and collect the answer of that run.
         
         Args:
-            tool_call: OpenAI tool call object
+            client (AsyncOpenAI): Configured async OpenAI client
+            thread_id (str): The thread to ask in
+            question (str): The question to ask
+            deadline (float, optional): Wall-clock time from PollStrategy.start_deadline()
+            timeout (float, optional): The timeout the deadline was started with
             
         Returns:
-            list: SQL queries found
+            tuple: The run, the assistant responses of this run and a RunTimeout
+                   (None unless the run was cancelled at the deadline)
         """
-        import json
-        sql_queries = []
+        run, poll_metrics, run_timeout = await self._run_turn(client, thread_id, question, deadline, timeout)
+        self._log_final_status(run, poll_metrics)
+        if run_timeout is not None:
+            return run, [], run_timeout
         
-        try:
-            if hasattr(tool_call, 'function') and tool_call.function:
-                if hasattr(tool_call.function, 'arguments'):
-                    args_str = tool_call.function.arguments
-                    
-                    # Parse the arguments JSON
-                    args = json.loads(args_str)
-                    
-                    if isinstance(args, dict):
-                        # Common keys where SQL queries are stored in Fabric Data Agents
-                        sql_keys = ['sql', 'query', 'sql_query', 'statement', 'command', 'code']
-                        
-                        for key in sql_keys:
-                            if key in args and args[key]:
-                                sql_query = str(args[key]).strip()
-                                if sql_query and len(sql_query) > 10:  # Basic validation
-                                    sql_queries.append(sql_query)
-                        
-                        # Also check for nested structures
-                        for key, value in args.items():
-                            if isinstance(value, dict):
-                                for nested_key in sql_keys:
-                                    if nested_key in value and value[nested_key]:
-                                        sql_query = str(value[nested_key]).strip()
-                                        if sql_query and len(sql_query) > 10:
-                                            sql_queries.append(sql_query)
-        
-        except (json.JSONDecodeError, AttributeError) as e:
-            # If JSON parsing fails, fall back to basic string search
+        # Get only this run's messages; a kept thread also holds earlier turns
+        messages = await self._list_new_messages(client, thread_id, run_id=run.id)
+        return run, self._extract_assistant_responses(messages, run_id=run.id), None
+
+    async def _ask_batch_item(self, index: int, question: str, timeout: int, thread_name,
+                              semaphore: asyncio.Semaphore) -> BatchResult:
+        """
+        Ask one batch question under the batch semaphore, capturing any error in the result.
+        """
+        async with semaphore:
+            start_time = time.time()
             try:
-                args_str = str(tool_call.function.arguments)
-                # Look for common SQL patterns in the string
-                if any(keyword in args_str.upper() for keyword in ['SELECT', 'INSERT', 'UPDATE', 'DELETE']):
-                    # Use minimal regex as fallback
-                    import re
-                    sql_pattern = r'"(?:sql|query|statement|code)"\s*:\s*"([^"]+)"'
-                    matches = re.findall(sql_pattern, args_str, re.IGNORECASE)
-                    sql_queries.extend([match.strip() for match in matches if len(match.strip()) > 10])
-            except Exception as parse_error:
-                print(f"⚠️ Warning: Could not parse tool call arguments: {parse_error}")
-        
-        return sql_queries
+                response = await self.ask(question, timeout=timeout, thread_name=thread_name)
+                return BatchResult(index, question, response=response, elapsed=time.time() - start_time)
+            except Exception as e:
+                return BatchResult(index, question, error=e, elapsed=time.time() - start_time)
 
-    def _extract_sql_from_output(self, tool_call) -> list:
+    async def ask_many(self, questions: list, concurrency: int = 16, timeout: int = 120, thread_name = None) -> list:
         """
-        Extract SQL queries from tool call output.
+        Ask several questions concurrently and return the results in input order.
         
         Args:
-            tool_call: OpenAI tool call object
+            questions (list): The questions to ask
+            concurrency (int): Maximum number of runs in flight
+            timeout (int): Maximum time to wait for each response in seconds
+            thread_name (str, optional): The name of the thread to use for every question;
+                                         only with concurrency=1
             
         Returns:
-            list: SQL queries found in output
+            list: One BatchResult per question, in the order of `questions`
         """
-        import json
-        import re
-        sql_queries = []
+        self._check_batch_options(concurrency, thread_name)
         
-        try:
-            if hasattr(tool_call, 'output') and tool_call.output:
-                output_str = str(tool_call.output)
-                
-                # First try to parse as JSON
-                try:
-                    output_json = json.loads(output_str)
-                    
-                    if isinstance(output_json, dict):
-                        # Look for SQL in common keys
-                        sql_keys = ['sql', 'query', 'sql_query', 'statement', 'command', 'code', 'generated_code']
-                        for key in sql_keys:
-                            if key in output_json and output_json[key]:
-                                sql_query = str(output_json[key]).strip()
-                                if sql_query and len(sql_query) > 10:
-                                    sql_queries.append(sql_query)
-                        
-                        # Check nested structures
-                        for key, value in output_json.items():
-                            if isinstance(value, dict):
-                                for nested_key in sql_keys:
-                                    if nested_key in value and value[nested_key]:
-                                        sql_query = str(value[nested_key]).strip()
-                                        if sql_query and len(sql_query) > 10:
-                                            sql_queries.append(sql_query)
-                
-                except json.JSONDecodeError:
-                    # If not JSON, use regex to find SQL patterns
-                    pass
-                
-                # Always also try regex as backup/additional method
-                if any(keyword in output_str.upper() for keyword in ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'FROM']):
-                    # Enhanced regex patterns for SQL extraction
-                    sql_patterns = [
-                        r'"(?:sql|query|statement|code|generated_code)"\s*:\s*"([^"]+)"',
-                        r"'(?:sql|query|statement|code|generated_code)'\s*:\s*'([^']+)'",
-                        r'(SELECT\s+.*?FROM\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
-                        r'(INSERT\s+INTO\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
-                        r'(UPDATE\s+.*?SET\s+.*?)(?=\s*[;}"\'\n]|\s*$)',
-                        r'(DELETE\s+FROM\s+.*?)(?=\s*[;}"\'\n]|\s*$)'
-                    ]
-                    
-                    for pattern in sql_patterns:
-                        matches = re.findall(pattern, output_str, re.IGNORECASE | re.DOTALL)
-                        for match in matches:
-                            clean_query = match.strip().replace('\\n', '\n').replace('\\t', '\t')
-                            clean_query = re.sub(r'\s+', ' ', clean_query)
-                            if len(clean_query) > 10:
-                                sql_queries.append(clean_query)
+        semaphore = asyncio.Semaphore(concurrency)
+        return list(await asyncio.gather(*[
+            self._ask_batch_item(index, question, timeout, thread_name, semaphore)
+            for index, question in enumerate(questions)
+        ]))
+
+    async def ask_many_as_completed(self, questions: list, concurrency: int = 16, timeout: int = 120, thread_name = None):
+        """
+        Ask several questions concurrently and yield each result as soon as it is ready.
         
-        except Exception as e:
-            print(f"⚠️ Warning: Could not extract SQL from output: {e}")
+        Args:
+            questions (list): The questions to ask
+            concurrency (int): Maximum number of runs in flight
+            timeout (int): Maximum time to wait for each response in seconds
+            thread_name (str, optional): The name of the thread to use for every question;
+                                         only with concurrency=1
+            
+        Yields:
+            BatchResult: Results in completion order
+        """
+        self._check_batch_options(concurrency, thread_name)
         
-        return sql_queries
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.ensure_future(self._ask_batch_item(index, question, timeout, thread_name, semaphore))
+            for index, question in enumerate(questions)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding questions if the caller breaks out early
+            for task in tasks:
+                task.cancel()
 
-    def _extract_structured_data_from_output(self, tool_call) -> list:
+    @_traced_call("ask_stream")
+    async def ask_stream(self, question: str, timeout: int = 120, thread_name = None):
         """
-        Extract structured data from tool call output using JSON parsing.
+        Ask a question and yield events as the run streams them.
         
         Args:
-            tool_call: OpenAI tool call object
+            question (str): The question to ask
+            timeout (int): Maximum time to stream in seconds; on expiry the run is
+                           cancelled and a final "timeout" event carries a RunTimeout
+            thread_name (str, optional): The name of the thread to use
             
-        Returns:
-            list: Formatted data lines
+        Yields:
+            StreamEvent: Status, text delta, tool call, SQL and timeout events
         """
-        import json
-        data_lines = []
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        logger.info("Asking (streaming): %s", question)
         
+        thread = None
         try:
-            if hasattr(tool_call, 'output') and tool_call.output:
-                output_str = str(tool_call.output)
-                
-                # Try to parse as JSON first
-                try:
-                    data = json.loads(output_str)
-                    
-                    if isinstance(data, list) and len(data) > 0:
-                        # Handle list of records (typical query result)
-                        if isinstance(data[0], dict):
-                            headers = list(data[0].keys())
-                            data_lines.append("| " + " | ".join(headers) + " |")
-                            data_lines.append("|" + "---|" * len(headers))
-                            
-                            for row in data[:10]:  # Limit to first 10 rows
-                                values = [str(row.get(h, "")) for h in headers]
-                                data_lines.append("| " + " | ".join(values) + " |")
-                    
-                    elif isinstance(data, dict):
-                        # Handle single record or structured response
-                        if 'data' in data and isinstance(data['data'], list):
-                            # Nested data structure
-                            return self._format_list_data(data['data'])
-                        elif 'results' in data and isinstance(data['results'], list):
-                            # Results structure
-                            return self._format_list_data(data['results'])
-                        else:
-                            # Single record
-                            data_lines.append("| Key | Value |")
-                            data_lines.append("|---|---|")
-                            for key, value in data.items():
-                                data_lines.append(f"| {key} | {str(value)} |")
-                
-                except json.JSONDecodeError:
-                    # If not JSON, look for other structured formats
-                    data_lines = self._extract_data_preview(output_str)
+            deadline = self._start_deadline(timeout)
+            client = await self._get_openai_client()
+            thread = await self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+            
+            await self._send_question(client, thread['id'], question)
+            
+            watch = _StreamWatch(self, thread['id'], deadline, timeout)
+            stream = await self._create_run(client, thread['id'], **watch.run_options())
+            async with stream:
+                events = stream.__aiter__()
+                while True:
+                    try:
+                        # Each wait for the next event ends at the deadline, also on a stalled stream
+                        event = await asyncio.wait_for(events.__anext__(), watch.remaining())
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        if watch.stalled():
+                            break
+                        raise
+                    for stream_event in self._convert_stream_event(event):
+                        watch.observe(stream_event)
+                        yield stream_event
+                    if watch.expired():
+                        break
+            watch.finish()
+            
+            if watch.timed_out and watch.run_id is not None:
+                cancelled_run = await self._cancel_run(client, thread['id'], watch.run_id)
+                yield self._stream_timeout_event(thread['id'], watch.run_id, cancelled_run, timeout, deadline)
         
         except Exception as e:
-            print(f"⚠️ Warning: Could not extract structured data: {e}")
+            logger.error("❌ Error streaming from data agent: %s", e)
+            raise _to_fabric_error(e) from e
         
-        return data_lines
+        finally:
+            # Clean up resources in the background, also when the caller stops iterating early
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
 
-    def _extract_markdown_table(self, text: str) -> str:
+    @_traced_call("get_run_details")
+    async def get_run_details(self, question: str, thread_name=None, timeout: int = 120) -> dict:
         """
-        Extract raw markdown table from the assistant's text response.
+        Ask a question and return detailed run information including steps.
         
         Args:
-            text (str): The assistant's text response
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for the run in seconds; on expiry the
+                           run is cancelled and "run_timeout" describes it
             
         Returns:
-            str: Raw markdown table if found, or empty string if no table found
+            dict: Detailed response including run steps, metadata, and SQL queries if lakehouse data source
         """
-        lines = text.split('\n')
-        table_lines = []
-        in_table = False
-        header_found = False
+        logger.info("🔍 Getting detailed run info for: %s", question)
         
-        for line in lines:
-            line_stripped = line.strip()
+        thread = None
+        try:
+            deadline = self._start_deadline(timeout)
+            client = await self._get_openai_client()
             
-            # Check if this line contains markdown table separators
-            if '|' in line_stripped and ('---' in line_stripped or '-' in line_stripped and line_stripped.count('-') > 3):
-                table_lines.append(line)
-                in_table = True
-                header_found = True
-            elif '|' in line_stripped and (in_table or not header_found):
-                # This is a table row (header or data row)
-                table_lines.append(line)
-                in_table = True
-            elif in_table and line_stripped == '':
-                # Empty line - might continue table, add it but don't break yet
-                table_lines.append(line)
-            elif in_table and '|' not in line_stripped and line_stripped != '':
-                # Non-table line after we were in a table - end of table
-                break
-        
-        # Clean up trailing empty lines
-        while table_lines and table_lines[-1].strip() == '':
-            table_lines.pop()
+            # Create thread
+            thread = await self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+            
+            # Send the question, then start and monitor the run
+            run, poll_metrics, run_timeout = await self._run_turn(client, thread['id'], question, deadline, timeout)
+            
+            # Get detailed run steps, every page of them
+            steps = await self._list_run_steps(client, thread['id'], run.id)
+            
+            # Get the messages of this turn
+            messages = await self._list_new_messages(client, thread['id'], run_id=run.id)
+            
+            result = self._build_run_details_result(question, run, steps, messages)
+            result["poll_metrics"] = asdict(poll_metrics)
+            result["run_timeout"] = asdict(run_timeout) if run_timeout else None
+            return result
+            
+        except Exception as e:
+            logger.error("❌ Error getting run details: %s", e)
+            return self._build_error_result(e)
         
-        # Return the raw markdown table if we found at least a header and separator
-        if len(table_lines) >= 2:
-            return '\n'.join(table_lines)
-        else:
-            return ""
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
 
-    def _extract_data_from_text_response(self, text_content: str) -> list:
+    @_traced_call("get_raw_run_response")
+    async def get_raw_run_response(self, question: str, timeout: int = 120, thread_name = None) -> dict:
         """
-        Extract structured data from the assistant's text response.
-        First tries to find raw markdown tables, then falls back to numbered list parsing.
+        Ask a question and return the complete raw response including all run details.
+        This is useful when you need to parse or analyze the full response structure.
         
         Args:
-            text_content (str): The text content from the assistant
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
             
         Returns:
-            list: Formatted data lines (raw markdown table as single item, or parsed rows)
+            dict: Complete raw response with run steps, messages, and metadata
         """
-        import re
-        
-        # First, try to extract a raw markdown table
-        markdown_table = self._extract_markdown_table(text_content)
-        if markdown_table:
-            # Return the raw markdown table as a single formatted block
-            return [markdown_table]
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        # Fallback to numbered list parsing (existing logic)
-        data_lines = []
+        logger.info("🔍 Getting raw response for: %s", question)
         
+        thread = None
         try:
-            lines = text_content.split('\n')
-            
-            # Look for numbered lists with data (like the example output)
-            numbered_pattern = r'^\d+\.\s+'
-            data_rows = []
-            
-            for line in lines:
-                line = line.strip()
-                if re.match(numbered_pattern, line):
-                    # Remove the number prefix
-                    clean_line = re.sub(numbered_pattern, '', line)
-                    data_rows.append(clean_line)
+            deadline = self._start_deadline(timeout)
+            client = await self._get_openai_client()
             
-            if data_rows and len(data_rows) > 0:
-                # Try to parse the structured data from the text
-                first_row = data_rows[0]
-                if ':' in first_row:
-                    # Parse key-value format
-                    # Example: "Date: 4/29/2020, State: WI, Positive: 7,660, ..."
-                    
-                    # Extract headers from first row
-                    headers = []
-                    values_first_row = []
-                    
-                    pairs = first_row.split(', ')
-                    for pair in pairs:
-                        if ':' in pair:
-                            key, value = pair.split(':', 1)
-                            headers.append(key.strip())
-                            values_first_row.append(value.strip())
-                    
-                    if headers:
-                        # Create table format
-                        data_lines.append("| " + " | ".join(headers) + " |")
-                        data_lines.append("|" + "---|" * len(headers))
-                        
-                        # Add first row
-                        data_lines.append("| " + " | ".join(values_first_row) + " |")
-                        
-                        # Parse remaining rows
-                        for row in data_rows[1:]:
-                            values = []
-                            pairs = row.split(', ')
-                            for pair in pairs:
-                                if ':' in pair:
-                                    _, value = pair.split(':', 1)
-                                    values.append(value.strip())
-                            
-                            if len(values) == len(headers):
-                                data_lines.append("| " + " | ".join(values) + " |")
-                            
-                        return data_lines
-                
-                # If we couldn't parse structured format, return the raw rows as-is
-                if not data_lines and data_rows:
-                    # Just show the numbered list data
-                    return [f"Row {i+1}: {row}" for i, row in enumerate(data_rows)]
+            # Create thread
+            thread = await self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
+
+            logger.debug("🧵 Existing or created thread: %s", thread, extra={"thread_id": thread['id']})
+
+            # Send the question, then start and monitor the run until the deadline
+            run, poll_metrics, run_timeout = await self._run_turn(client, thread['id'], question, deadline, timeout)
+            self._log_final_status(run, poll_metrics)
             
-            # Alternative: Look for table-like structures in the text
-            # Check if there are lines that look like table rows
-            potential_table_lines = []
-            for line in lines:
-                line = line.strip()
-                # Look for lines with multiple separators that could be table data
-                if line and ('|' in line or line.count(',') >= 2 or line.count(':') >= 2):
-                    potential_table_lines.append(line)
+            # Get all run details, every page of the steps
+            steps = await self._list_run_steps(client, thread['id'], run.id)
+            
+            messages = await self._list_new_messages(client, thread['id'], run_id=run.id)
+            
+            # Return complete raw response
+            return self._build_raw_run_response(question, thread, run, steps, messages, timeout,
+                                                poll_metrics, run_timeout)
             
-            if potential_table_lines and not data_lines:
-                return potential_table_lines[:10]  # Return first 10 lines
-        
         except Exception as e:
-            print(f"⚠️ Warning: Could not extract data from text response: {e}")
+            logger.error("❌ Error getting raw response: %s", e)
+            return {"question": question, **self._build_error_result(e), "timestamp": time.time(), "success": False}
         
-        return data_lines
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
 
-    def _format_list_data(self, data_list) -> list:
+    @_traced_call("get_result_table")
+    async def get_result_table(self, question: str, timeout: int = 120, thread_name = None) -> Optional[ResultTable]:
         """
-        Format a list of data records into table format.
+        Ask a question and return the complete row set of its data retrieval as typed columns.
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Returns:
+            ResultTable: The rows of the last tool output that returned records,
+                         or None when the run returned no tabular data
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: For any other failure of the call
         """
-        data_lines = []
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        if len(data_list) > 0 and isinstance(data_list[0], dict):
-            headers = list(data_list[0].keys())
-            data_lines.append("| " + " | ".join(headers) + " |")
-            data_lines.append("|" + "---|" * len(headers))
+        logger.info("📊 Getting result table for: %s", question)
+        
+        steps = await self._run_for_steps(question, timeout, thread_name)
+        return self._extract_result_table(steps)
+
+    @_traced_call("iter_result_rows")
+    async def iter_result_rows(self, question: str, timeout: int = 120, thread_name = None):
+        """
+        Ask a question and lazily iterate the records of its data retrieval (async generator).
+        
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
             
-            for row in data_list[:10]:  # Limit to first 10 rows
-                values = [str(row.get(h, "")) for h in headers]
-                data_lines.append("| " + " | ".join(values) + " |")
+        Yields:
+            dict: One record per row of the last tool output that returned records
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        return data_lines
+        steps = await self._run_for_steps(question, timeout, thread_name)
+        result_output = self._find_result_output(steps)
+        if result_output:
+            text, rows_start, _ = result_output
+            for row in _iter_json_rows(text, rows_start):
+                yield row
 
-    def _extract_data_preview(self, text: str) -> list:
+    @_traced_call("stream_result_rows")
+    async def stream_result_rows(self, question: str, sink, batch_size: int = 1000, timeout: int = 120,
+                                 thread_name = None) -> int:
         """
-        Extract data preview from text output.
+        Ask a question and stream the records of its data retrieval into a sink in batches.
         
         Args:
-            text (str): Text to search for tabular data
+            question (str): The question to ask
+            sink (callable): Called with each list of up to batch_size row dicts;
+                             coroutine functions are awaited
+            batch_size (int): Rows per sink call
+            timeout (int): Maximum time to wait for response in seconds
             
         Returns:
-            list: List of data rows found
+            int: Number of rows streamed
         """
-        import re
-        import json
-        
-        data_lines = []
+        count = 0
+        batch = []
+        async for row in self.iter_result_rows(question, timeout, thread_name):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += await self._send_rows(sink, batch)
+                batch = []
+        if batch:
+            count += await self._send_rows(sink, batch)
+        return count
+
+    async def _send_rows(self, sink, batch: list) -> int:
+        """
+        Pass a batch to a sync or async sink and return its size.
+        """
+        result = sink(batch)
+        if asyncio.iscoroutine(result):
+            await result
+        return len(batch)
+
+    async def _run_for_steps(self, question: str, timeout: int, thread_name):
+        """
+        Run a question on a (new or named) thread and return the run steps.
         
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: For any other failure of the call
+        """
+        thread = None
         try:
-            # Look for JSON-like data structures
-            json_pattern = r'\[[\s\S]*?\]'
-            json_matches = re.findall(json_pattern, text)
+            deadline = self._start_deadline(timeout)
+            client = await self._get_openai_client()
             
-            for match in json_matches:
-                try:
-                    # Try to parse as JSON
-                    data = json.loads(match)
-                    if isinstance(data, list) and len(data) > 0:
-                        # Convert to readable format
-                        if isinstance(data[0], dict):
-                            # List of dictionaries (typical query result)
-                            headers = list(data[0].keys())
-                            data_lines.append("| " + " | ".join(headers) + " |")
-                            data_lines.append("|" + "---|" * len(headers))
-                            
-                            for row in data[:10]:  # Limit to first 10 rows
-                                values = [str(row.get(h, "")) for h in headers]
-                                data_lines.append("| " + " | ".join(values) + " |")
-                        break  # Found valid JSON data
-                except json.JSONDecodeError:
-                    continue
+            # Create thread
+            thread = await self._get_existing_or_create_new_thread(
+                data_agent_url=self.data_agent_url,
+                thread_name=thread_name
+                )
             
-            # If no JSON found, look for pipe-separated tables
-            if not data_lines:
-                lines = text.split('\n')
-                table_lines = []
-                
-                for line in lines:
-                    # Look for lines that contain multiple pipe characters (table format)
-                    if line.count('|') >= 2:
-                        table_lines.append(line.strip())
-                    elif table_lines and line.strip() == "":
-                        # End of table
-                        break
-                    elif table_lines and not line.strip().startswith('|'):
-                        # Non-table line after table started
-                        break
-                
-                if table_lines:
-                    data_lines = table_lines[:15]  # Limit to first 15 lines
+            # Send the question, then start and monitor the run
+            run, _, run_timeout = await self._run_turn(client, thread['id'], question, deadline, timeout)
+            if run_timeout is not None:
+                raise RunTimeoutError(run_timeout)
             
-            # Look for CSV-like data
-            if not data_lines:
-                lines = text.split('\n')
-                csv_lines = []
-                
-                for line in lines:
-                    # Look for comma-separated values with consistent column count
-                    if ',' in line and len(line.split(',')) >= 2:
-                        csv_lines.append(line.strip())
-                        if len(csv_lines) >= 10:  # Limit preview
-                            break
-                    elif csv_lines:
-                        break
-                
-                if len(csv_lines) > 1:  # At least header + one data row
-                    data_lines = csv_lines
+            # Read every page before the thread is handed to the cleanup queue
+            return await self._list_run_steps(client, thread['id'], run.id)
+        
+        except RunTimeoutError:
+            raise
         
         except Exception as e:
-            print(f"⚠️ Warning: Could not extract data preview: {e}")
+            logger.error("❌ Error getting run steps: %s", e)
+            raise _to_fabric_error(e) from e
         
-        return data_lines
+        finally:
+            # Clean up in the background, also after an error
+            if thread is not None:
+                self._delete_thread_later(thread['id'])
+
+
+class _ConversationBase:
+    """
+    A multi-turn conversation with a data agent, bound to one thread.
+    
+    The thread is resolved on the first turn and its id is reused afterwards,
+    so later turns skip the threads/fabric?tag= lookup, and the thread is kept
+    between turns so the agent sees the earlier questions and answers. It is
+    deleted when the conversation is closed, or once the conversation has been
+    idle for idle_timeout seconds (the next turn then starts a fresh thread).
+    
+    Create one with client.conversation(); turns are serialized, since a
+    thread can only run one question at a time.
+    """
+    
+    _lock_factory = threading.Lock
+    
+    def __init__(self, client: "_FabricDataAgentClientBase", thread_name=None, idle_timeout: Optional[float] = 1800,
+                 keep_thread: bool = False):
+        """
+        Args:
+            client (FabricDataAgentClient): The client that runs the turns
+            thread_name (str, optional): Named thread to use; a new thread is generated if None
+            idle_timeout (float, optional): Seconds without a turn after which the thread expires, None to never expire
+            keep_thread (bool): Leave the thread on the server at close/expiry, e.g. to resume a named thread later
+        """
+        self.client = client
+        self.thread_name = thread_name
+        self.idle_timeout = idle_timeout
+        self.keep_thread = keep_thread
+        self.thread = None
+        self.last_run_id = None
+        self.turns = 0
+        self.last_used = time.time()
+        self.closed = False
+        self.last_call_timing = None
+        self._lock = self._lock_factory()
+    
+    @property
+    def thread_id(self) -> Optional[str]:
+        return self.thread["id"] if self.thread else None
+    
+    @property
+    def tracer(self) -> PhaseTracer:
+        return self.client.tracer
+    
+    def iter_steps(self):
+        """
+        Lazily iterate the steps of the last turn's run (an async generator for AsyncConversation).
+        """
+        if self.last_run_id is None:
+            raise RuntimeError("The conversation has no completed turn yet")
+        return self.client.iter_run_steps(self.thread_id, self.last_run_id)
+    
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        """
+        Whether the conversation has gone unused for longer than idle_timeout.
+        """
+        if self.idle_timeout is None:
+            return False
+        return (now or time.time()) - self.last_used > self.idle_timeout
+    
+    def _start_turn(self, question: str):
+        """
+        Check that the conversation is open and expire its thread if idle; called holding the turn lock.
+        """
+        if self.closed:
+            raise RuntimeError("Conversation is closed")
+        self._expire_if_idle()
+        logger.info("Asking (turn %d): %s", self.turns + 1, question, extra={"thread_id": self.thread_id})
+    
+    def _finish_turn(self, run, responses: list, run_timeout: Optional[RunTimeout]) -> str:
+        """
+        Record a finished turn and return its answer.
+        
+        Raises:
+            RunTimeoutError: When the turn's run was cancelled at the deadline
+        """
+        self.last_run_id = run.id
+        self.turns += 1
+        if run_timeout is not None:
+            raise RunTimeoutError(run_timeout)
+        return self.client._format_responses(responses)
+    
+    def _expire_if_idle(self):
+        if self.thread is not None and self.is_idle():
+            logger.info("⌛ Conversation idle for more than %s seconds, starting a new thread", self.idle_timeout,
+                        extra={"thread_id": self.thread_id})
+            self._release_thread()
+    
+    def _release_thread(self):
+        thread, self.thread = self.thread, None
+        self.last_run_id = None
+        if thread is not None and not self.keep_thread:
+            self.client._delete_thread_later(thread['id'])
 
-    def _extract_sql_queries(self, steps) -> list:
+
+class Conversation(_ConversationBase):
+    """
+    Conversation for FabricDataAgentClient; close it, or use it as a context manager, to end it.
+    """
+    
+    @_traced_call("conversation.ask")
+    def ask(self, question: str, timeout: int = 120) -> str:
         """
-        Extract SQL queries from run steps when lakehouse data source is used.
+        Ask the next question in the conversation.
         
         Args:
-            steps: The run steps from the OpenAI API
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
             
         Returns:
-            list: List of SQL queries found in the steps
+            str: The answer of this turn
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: When the call failed (see FabricDataAgentClient.ask)
         """
-        sql_queries = []
-        
-        try:
-            for step in steps.data:
-                if hasattr(step, 'step_details') and step.step_details:
-                    step_details = step.step_details
-                    
-                    # Check for tool calls that might contain SQL
-                    if hasattr(step_details, 'tool_calls') and step_details.tool_calls:
-                        for tool_call in step_details.tool_calls:
-                            # Look for SQL queries in tool call details
-                            if hasattr(tool_call, 'function') and tool_call.function:
-                                if hasattr(tool_call.function, 'arguments'):
-                                    args_str = str(tool_call.function.arguments)
-                                    # Look for SQL patterns in arguments
-                                    sql_queries.extend(self._find_sql_in_text(args_str))
-                            
-                            # Check tool call outputs for SQL
-                            if hasattr(tool_call, 'output') and tool_call.output:
-                                output_str = str(tool_call.output)
-                                sql_queries.extend(self._find_sql_in_text(output_str))
-                    
-                    # Check step details for any SQL content
-                    step_str = str(step_details)
-                    sql_queries.extend(self._find_sql_in_text(step_str))
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        except Exception as e:
-            print(f"⚠️ Warning: Could not extract SQL queries: {e}")
+        with self._lock:
+            self._start_turn(question)
+            
+            try:
+                deadline = self.client._start_deadline(timeout)
+                client = self.client._get_openai_client()
+                if self.thread is None:
+                    self.thread = self.client._get_existing_or_create_new_thread(
+                        data_agent_url=self.client.data_agent_url,
+                        thread_name=self.thread_name
+                        )
+                
+                run, responses, run_timeout = self.client._ask_in_thread(
+                    client, self.thread['id'], question, deadline, timeout
+                )
+                return self._finish_turn(run, responses, run_timeout)
+            
+            except RunTimeoutError:
+                raise
+            
+            except Exception as e:
+                logger.error("❌ Error calling data agent: %s", e)
+                raise _to_fabric_error(e) from e
+            
+            finally:
+                self.last_used = time.time()
+    
+    def close(self):
+        """
+        End the conversation and delete its thread in the background.
+        """
+        with self._lock:
+            self.closed = True
+            self._release_thread()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncConversation(_ConversationBase):
+    """
+    Conversation for AsyncFabricDataAgentClient; ask() is awaitable and aclose() ends it.
+    """
+    
+    _lock_factory = asyncio.Lock
+    
+    @_traced_call("conversation.ask")
+    async def ask(self, question: str, timeout: int = 120) -> str:
+        """
+        Ask the next question in the conversation.
         
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_queries = []
-        for query in sql_queries:
-            if query not in seen:
-                seen.add(query)
-                unique_queries.append(query)
+        Args:
+            question (str): The question to ask
+            timeout (int): Maximum time to wait for response in seconds
+            
+        Returns:
+            str: The answer of this turn
+            
+        Raises:
+            RunTimeoutError: When the run did not finish before the deadline
+            FabricAgentError: When the call failed (see FabricDataAgentClient.ask)
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty")
         
-        return unique_queries
+        async with self._lock:
+            self._start_turn(question)
+            
+            try:
+                deadline = self.client._start_deadline(timeout)
+                client = await self.client._get_openai_client()
+                if self.thread is None:
+                    self.thread = await self.client._get_existing_or_create_new_thread(
+                        data_agent_url=self.client.data_agent_url,
+                        thread_name=self.thread_name
+                        )
+                
+                run, responses, run_timeout = await self.client._ask_in_thread(
+                    client, self.thread['id'], question, deadline, timeout
+                )
+                return self._finish_turn(run, responses, run_timeout)
+            
+            except RunTimeoutError:
+                raise
+            
+            except Exception as e:
+                logger.error("❌ Error calling data agent: %s", e)
+                raise _to_fabric_error(e) from e
+            
+            finally:
+                self.last_used = time.time()
+    
+    async def aclose(self):
+        """
+        End the conversation and delete its thread in the background.
+        """
+        async with self._lock:
+            self.closed = True
+            self._release_thread()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
 
-    def _find_sql_in_text(self, text: str) -> list:
+
+class FabricClientRegistry:
+    """
+    Process-wide cache of ready-to-use clients, one per (tenant_id, data_agent_url).
+    
+    Building a client signs in and opens a connection pool, which takes seconds;
+    agent tools and HTTP handlers should get their client from here instead of
+    constructing one per call. All data agent URLs in a tenant share one
+    credential and TokenBroker, and clients that sit idle are closed and evicted.
+    """
+    
+    def __init__(self, idle_timeout: Optional[float] = 1800, credential_factory=None, **client_options):
+        """
+        Args:
+            idle_timeout (float, optional): Seconds a client may go unused before it is evicted
+            credential_factory (callable, optional): Builds the credential for a tenant id;
+                defaults to InteractiveBrowserCredential
+            **client_options: Extra keyword arguments passed to every client constructor
         """
-        Find SQL queries in text using pattern matching.
+        self.idle_timeout = idle_timeout
+        self.credential_factory = credential_factory or (lambda tenant_id: InteractiveBrowserCredential(tenant_id=tenant_id))
+        self.client_options = client_options
+        self._brokers = {}
+        self._clients = {}
+        self._building = {}
+        self._closing = set()
+        self._lock = threading.Lock()
+    
+    def get_token_broker(self, tenant_id: str) -> TokenBroker:
+        """
+        Get the TokenBroker shared by every client of a tenant.
+        """
+        with self._lock:
+            return self._get_token_broker(tenant_id)
+    
+    def _get_token_broker(self, tenant_id: str) -> TokenBroker:
+        broker = self._brokers.get(tenant_id)
+        if broker is None:
+            broker = TokenBroker(self.credential_factory(tenant_id), cache_key=tenant_id)
+            self._brokers[tenant_id] = broker
+        return broker
+    
+    def get(self, tenant_id: str, data_agent_url: str, async_client: bool = False):
+        """
+        Get the shared client for a tenant and data agent, creating it on first use.
         
         Args:
-            text (str): Text to search for SQL queries
+            tenant_id (str): Your Azure tenant ID
+            data_agent_url (str): The published URL of your Fabric Data Agent
+            async_client (bool): Return an AsyncFabricDataAgentClient instead of the blocking client
             
         Returns:
-            list: List of SQL queries found
+            FabricDataAgentClient: The cached client
         """
-        import re
+        client_class = AsyncFabricDataAgentClient if async_client else FabricDataAgentClient
+        key = (client_class, tenant_id, data_agent_url)
+        now = time.time()
         
-        sql_queries = []
+        with self._lock:
+            evicted = self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                entry[1] = now
+            else:
+                future = self._building.get(key)
+                builder = future is None
+                if builder:
+                    future = self._building[key] = Future()
+                    token_broker = self._get_token_broker(tenant_id)
         
-        # Common SQL keywords that indicate a query
-        sql_patterns = [
-            r'(SELECT\s+.*?FROM\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\)|\s*,)',
-            r'(INSERT\s+INTO\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
-            r'(UPDATE\s+.*?SET\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
-            r'(DELETE\s+FROM\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
-            r'(CREATE\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
-            r'(ALTER\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))',
-            r'(DROP\s+TABLE\s+.*?)(?=\s*;|\s*$|\s*\}|\s*\))'
-        ]
+        for client in evicted:
+            self._close_client(client)
+        if entry is not None:
+            return entry[0]
+        if not builder:
+            # Another caller is already signing in for this key
+            return future.result()
         
-        for pattern in sql_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                # Clean up the SQL query
-                clean_query = match.strip().replace('\n', ' ').replace('\t', ' ')
-                clean_query = re.sub(r'\s+', ' ', clean_query)  # Normalize whitespace
-                if len(clean_query) > 10:  # Filter out very short matches
-                    sql_queries.append(clean_query)
+        # Signing in can take as long as the user needs, so it must not hold up other keys
+        try:
+            client = client_class(
+                tenant_id=tenant_id,
+                data_agent_url=data_agent_url,
+                token_broker=token_broker,
+                **self.client_options
+            )
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._building[key]
+            self._clients[key] = [client, time.time()]
+        future.set_result(client)
+        return client
+    
+    def _evict_idle(self, now: float) -> list:
+        if self.idle_timeout is None:
+            return []
+        evicted = []
+        for key, (client, last_used) in list(self._clients.items()):
+            if now - last_used > self.idle_timeout:
+                del self._clients[key]
+                evicted.append(client)
+        return evicted
+    
+    def _close_client(self, client):
+        try:
+            if isinstance(client, AsyncFabricDataAgentClient):
+                loop = client._loop
+                if loop is None:
+                    return  # Never used, nothing to close
+                if loop.is_closed():
+                    logger.warning("⚠️ Warning: Could not close evicted client, its event loop is closed")
+                    return
+                # Async clients can only be closed on the event loop that opened them,
+                # which may be another thread's (e.g. get() called through asyncio.to_thread)
+                future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                with self._lock:
+                    self._closing.add(future)
+                future.add_done_callback(self._closed)
+            else:
+                client.close()
+        except Exception as e:
+            logger.warning("⚠️ Warning: Could not close evicted client: %s", e)
+    
+    def _closed(self, future):
+        with self._lock:
+            self._closing.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("⚠️ Warning: Could not close evicted client: %s", future.exception())
+    
+    def _take_all(self) -> tuple:
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            brokers = list(self._brokers.values())
+            self._clients.clear()
+            self._brokers.clear()
+        return clients, brokers
+    
+    def clear(self):
+        """
+        Close and forget every cached client and token broker.
+        """
+        clients, brokers = self._take_all()
+        for client in clients:
+            self._close_client(client)
+        for broker in brokers:
+            broker.close()
+    
+    async def aclose(self):
+        """
+        Close and forget every cached client and token broker, from the event loop.
         
-        return sql_queries
+        Async clients delete finished threads as tasks on their event loop,
+        and those are lost when the loop ends first. Await this in the
+        application's shutdown hook so the clients opened on the running loop
+        are closed there, after their pending deletes.
+        """
+        clients, brokers = self._take_all()
+        loop = asyncio.get_running_loop()
+        for client in clients:
+            if isinstance(client, AsyncFabricDataAgentClient) and client._loop is loop:
+                try:
+                    await client.aclose()
+                except Exception as e:
+                    logger.warning("⚠️ Warning: Could not close shared client: %s", e)
+            elif isinstance(client, AsyncFabricDataAgentClient):
+                self._close_client(client)
+            else:
+                # close() blocks until the client's queued deletes are flushed
+                await asyncio.to_thread(self._close_client, client)
+        for broker in brokers:
+            broker.close()
+
+
+_default_registry = FabricClientRegistry()
 
 
-def main(questions: list, raw_response: bool = False, thread_name = None):
+def get_shared_client(tenant_id: str, data_agent_url: str, async_client: bool = False):
+    """
+    Get the process-wide shared client for a tenant and data agent.
+    
+    Args:
+        tenant_id (str): Your Azure tenant ID
+        data_agent_url (str): The published URL of your Fabric Data Agent
+        async_client (bool): Return an AsyncFabricDataAgentClient instead of the blocking client
+        
+    Returns:
+        FabricDataAgentClient: The cached, thread-safe client
+    """
+    return _default_registry.get(tenant_id, data_agent_url, async_client=async_client)
+
+
+async def aclose_shared_clients():
+    """
+    Close the process-wide shared clients; await it when the application shuts down
+    (see FabricClientRegistry.aclose()).
+    """
+    await _default_registry.aclose()
+
+
+def main(questions: list, raw_response: bool = False, thread_name = None, concurrency: int = 1):
     """
     Example usage of the Fabric Data Agent Client.
+    
+    With concurrency > 1 (and no raw response or shared thread), the questions
+    are asked as one batch instead of one after another.
     """
+    # Show the client's progress messages on the console
+    configure_logging()
+    
     # Configuration - Update these with your actual values
     TENANT_ID = os.getenv("TENANT_ID", "your-tenant-id-here")
     DATA_AGENT_URL = os.getenv("DATA_AGENT_URL", "your-data-agent-url-here")
@@ -1116,6 +6697,16 @@ def main(questions: list, raw_response: bool = False, thread_name = None):
         print("🤖 Fabric Data Agent Client - Ready!")
         print("="*60)
         
+        if concurrency > 1 and not raw_response and thread_name is None:
+            for result in client.ask_many(questions, concurrency=concurrency):
+                print(f"\n💬 Response to: {result.question} ({result.elapsed:.1f}s)")
+                print("-" * 50)
+                print(result.response if result.ok else f"❌ {result.error}")
+                print("-" * 50)
+            
+            print("\n✅ All examples completed successfully!")
+            return
+        
         for i, question in enumerate(questions, 1):
             if raw_response == True: #printing (mostly) raw response
                 response = client.get_raw_run_response(question, thread_name=thread_name)
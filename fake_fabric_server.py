@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Fabric Data Agent endpoints used by FabricDataAgentClient.
+
+Serves the Assistants-compatible API under a data agent URL (assistants.create,
+messages, runs, run cancel, run steps and thread delete) plus the private
+__private/aiassistant/threads/fabric thread lookup, so the client can be
+exercised and benchmarked without a Fabric tenant. Queue time, run time,
+injected error rates and the tool output size are configurable. Bearer tokens
+are accepted without checks and streaming runs are not supported.
+
+Usage:
+    python fake_fabric_server.py --port 8765 --run-time 0.5 --rows 1000
+
+    # or in-process
+    with FakeFabricServer(FakeServerConfig(run_time=0.2)) as server:
+        client = FabricDataAgentClient(tenant_id="local", data_agent_url=server.data_agent_url,
+                                       token_broker=TokenBroker(FakeCredential(), background_refresh=False))
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from azure.core.credentials import AccessToken
+
+DATA_AGENT_PATH = "/v1/workspaces/local/dataagents/fake-agent/aiassistant/openai"
+THREAD_LOOKUP_PATH = "/v1/workspaces/local/dataagents/fake-agent/__private/aiassistant/threads/fabric"
+
+SQL = "SELECT TOP 100 Customer, City, SUM(Sales) AS TotalSales FROM dbo.FactSales GROUP BY Customer, City"
+
+
+@dataclass
+class FakeServerConfig:
+    """
+    Behaviour of the fake server.
+
+    Attributes:
+        queue_time (float): Seconds a new run stays queued
+        run_time (float): Seconds a run stays in_progress after leaving the queue
+        jitter (float): Relative random spread applied to queue and run time (0.1 = +/-10%)
+        error_rate (float): Share of API requests answered with HTTP 500 (the client retries these)
+        throttle_rate (float): Share of API requests answered with HTTP 429 and a Retry-After header
+        retry_after (float): Seconds sent in the Retry-After header of throttled requests
+        capacity_rps (float, optional): Requests per second the capacity serves; above it requests get HTTP 429
+        run_failure_rate (float): Share of runs that end as failed instead of completed
+        rows (int): Rows in each tool call output
+        steps (int): Tool call steps per run
+    """
+    queue_time: float = 0.05
+    run_time: float = 0.5
+    jitter: float = 0.1
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 0.1
+    capacity_rps: Optional[float] = None
+    run_failure_rate: float = 0.0
+    rows: int = 100
+    steps: int = 2
+
+
+class _FakeFabricState:
+    """
+    In-memory threads, messages, runs and steps, advanced lazily on each read.
+    """
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.assistants = {}
+        self.threads = {}
+        self.tags = {}
+        self.messages = {}
+        self.runs = {}
+        self.steps = {}
+        self.request_count = 0
+        self.injected_errors = 0
+        self.throttled_requests = 0
+        self.lock = threading.Lock()
+        self._capacity_tokens = config.capacity_rps or 0.0
+        self._capacity_updated = time.monotonic()
+        self._output = json.dumps([
+            {"CustomerKey": i, "Customer": f"Customer {i}", "City": f"City {i % 97}", "TotalSales": round(i * 1.37, 2)}
+            for i in range(config.rows)
+        ])
+
+    def over_capacity(self) -> bool:
+        """
+        Whether this request exceeds capacity_rps (a token bucket holding one second of requests).
+        """
+        rate = self.config.capacity_rps
+        if not rate:
+            return False
+        now = time.monotonic()
+        self._capacity_tokens = min(rate, self._capacity_tokens + (now - self._capacity_updated) * rate)
+        self._capacity_updated = now
+        if self._capacity_tokens < 1:
+            return True
+        self._capacity_tokens -= 1
+        return False
+
+    def _jittered(self, seconds: float) -> float:
+        return max(0.0, seconds * (1 + random.uniform(-self.config.jitter, self.config.jitter)))
+
+    def create_assistant(self, body: dict) -> dict:
+        assistant = {
+            "id": f"asst_{uuid.uuid4().hex}",
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "model": body.get("model", "fabric"),
+            "instructions": body.get("instructions"),
+            "name": body.get("name"),
+            "tools": [],
+            "metadata": {}
+        }
+        self.assistants[assistant["id"]] = assistant
+        return assistant
+
+    def lookup_thread(self, tag: str) -> dict:
+        thread_id = self.tags.get(tag)
+        if thread_id is None or thread_id not in self.threads:
+            thread_id = f"thread_{uuid.uuid4().hex}"
+            self.threads[thread_id] = {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+            self.tags[tag] = thread_id
+            self.messages[thread_id] = []
+        return self.threads[thread_id]
+
+    def delete_thread(self, thread_id: str) -> Optional[dict]:
+        if self.threads.pop(thread_id, None) is None:
+            return None
+        self.messages.pop(thread_id, None)
+        for tag, tagged_id in list(self.tags.items()):
+            if tagged_id == thread_id:
+                del self.tags[tag]
+        return {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+    def add_message(self, thread_id: str, role: str, text: str, run_id: Optional[str] = None,
+                    assistant_id: Optional[str] = None) -> dict:
+        message = {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "assistant_id": assistant_id,
+            "run_id": run_id,
+            "attachments": [],
+            "metadata": {},
+            "status": "completed"
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    def create_run(self, thread_id: str, body: dict) -> dict:
+        now = time.time()
+        queued_for = self._jittered(self.config.queue_time)
+        run = {
+            "id": f"run_{uuid.uuid4().hex}",
+            "object": "thread.run",
+            "created_at": int(now),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "status": "queued",
+            "started_at": None,
+            "completed_at": None,
+            "failed_at": None,
+            "cancelled_at": None,
+            "expired_at": None,
+            "last_error": None,
+            "model": "fabric",
+            "instructions": "",
+            "tools": [],
+            "metadata": {},
+            "_started": now + queued_for,
+            "_finished": now + queued_for + self._jittered(self.config.run_time)
+        }
+        self.runs[run["id"]] = run
+        self.steps[run["id"]] = []
+        return run
+
+    def advance_run(self, run: dict) -> dict:
+        """
+        Move a run along its queued -> in_progress -> completed/failed timeline.
+        """
+        now = time.time()
+        if run["status"] == "cancelling":
+            run["status"] = "cancelled"
+            run["cancelled_at"] = int(now)
+        if run["status"] in ("queued", "in_progress") and now >= run["_started"]:
+            run["status"] = "in_progress"
+            run["started_at"] = int(run["_started"])
+        if run["status"] == "in_progress" and now >= run["_finished"]:
+            if random.random() < self.config.run_failure_rate:
+                run["status"] = "failed"
+                run["failed_at"] = int(now)
+                run["last_error"] = {"code": "server_error", "message": "Injected run failure"}
+            else:
+                self._complete_run(run, now)
+        return run
+
+    def _complete_run(self, run: dict, now: float):
+        for index in range(self.config.steps):
+            self.steps[run["id"]].append({
+                "id": f"step_{uuid.uuid4().hex}",
+                "object": "thread.run.step",
+                "created_at": int(now),
+                "run_id": run["id"],
+                "thread_id": run["thread_id"],
+                "assistant_id": run["assistant_id"],
+                "type": "tool_calls",
+                "status": "completed",
+                "step_details": {
+                    "type": "tool_calls",
+                    "tool_calls": [{
+                        "id": f"call_{index}",
+                        "type": "function",
+                        "function": {
+                            "name": "query_lakehouse",
+                            "arguments": json.dumps({"sql": SQL}),
+                            "output": self._output
+                        },
+                        # Fabric also reports the tool output next to the function
+                        "output": self._output
+                    }]
+                }
+            })
+        preview = "\n".join(["| Customer | TotalSales |", "|---|---|"] +
+                            [f"| Customer {i} | {round(i * 1.37, 2)} |" for i in range(min(5, self.config.rows))])
+        self.add_message(run["thread_id"], "assistant", f"Top customers by sales:\n\n{preview}",
+                         run_id=run["id"], assistant_id=run["assistant_id"])
+        run["status"] = "completed"
+        run["completed_at"] = int(now)
+
+    def cancel_run(self, run: dict) -> dict:
+        self.advance_run(run)
+        if run["status"] in ("queued", "in_progress"):
+            run["status"] = "cancelling"
+        return run
+
+
+def _public(item: dict) -> dict:
+    return {key: value for key, value in item.items() if not key.startswith("_")}
+
+
+def _page(items: list, query: dict, default_order: str = "desc", keep=None) -> dict:
+    """
+    Apply order, after and limit the way the Assistants list endpoints do.
+
+    ``keep`` filters items after the cursor is resolved, so an ``after`` id that
+    the filter would drop (a message from an earlier run) still positions the page.
+    """
+    if query.get("order", default_order) == "desc":
+        items = items[::-1]
+    after = query.get("after")
+    if after:
+        ids = [item["id"] for item in items]
+        items = items[ids.index(after) + 1:] if after in ids else []
+    if keep is not None:
+        items = [item for item in items if keep(item)]
+    limit = int(query.get("limit", 20))
+    data = [_public(item) for item in items[:limit]]
+    return {
+        "object": "list",
+        "data": data,
+        "first_id": data[0]["id"] if data else None,
+        "last_id": data[-1]["id"] if data else None,
+        "has_more": len(items) > limit
+    }
+
+
+def _error(status: int, message: str) -> tuple:
+    return status, {"error": {"message": message, "type": "invalid_request_error", "code": None}}
+
+
+class _FakeFabricHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the Fabric front door
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method: str):
+        state = self.server.state
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        # Route under the state lock, serialize and write the response outside it
+        headers = None
+        with state.lock:
+            state.request_count += 1
+            roll = random.random()
+            if roll < state.config.error_rate:
+                state.injected_errors += 1
+                status, response = 500, {"error": {"message": "Injected server error", "type": "server_error"}}
+            elif roll < state.config.error_rate + state.config.throttle_rate or state.over_capacity():
+                state.throttled_requests += 1
+                status, response = 429, {"error": {"message": "Capacity throttled", "type": "rate_limit_exceeded"}}
+                headers = {"Retry-After": str(state.config.retry_after)}
+            else:
+                status, response = self._route(state, method, url.path, query, body)
+        self._send(status, response, headers)
+
+    def _route(self, state: _FakeFabricState, method: str, path: str, query: dict, body: dict) -> tuple:
+        if path == THREAD_LOOKUP_PATH and method == "GET":
+            return 200, state.lookup_thread(unquote(query.get("tag", "")).strip('"'))
+        if not path.startswith(DATA_AGENT_PATH):
+            return _error(404, f"Unknown path {path}")
+
+        parts = path[len(DATA_AGENT_PATH):].strip("/").split("/")
+        route = (method, len(parts), parts[0], parts[2] if len(parts) > 2 else None)
+        thread_id = parts[1] if len(parts) > 1 else None
+        if parts[0] == "threads" and thread_id not in state.threads:
+            return _error(404, f"No thread found with id '{thread_id}'")
+
+        if route == ("POST", 1, "assistants", None):
+            return 200, state.create_assistant(body)
+        if route == ("DELETE", 2, "threads", None):
+            return 200, state.delete_thread(thread_id)
+        if route == ("POST", 3, "threads", "messages"):
+            return 200, state.add_message(thread_id, body.get("role", "user"), str(body.get("content", "")))
+        if route == ("GET", 3, "threads", "messages"):
+            run_id = query.get("run_id")
+            keep = (lambda message: message["run_id"] == run_id) if run_id else None
+            return 200, _page(state.messages[thread_id], query, keep=keep)
+        if route == ("POST", 3, "threads", "runs"):
+            if body.get("stream"):
+                return _error(400, "Streaming runs are not supported by the fake server")
+            if body.get("assistant_id") not in state.assistants:
+                return _error(404, f"No assistant found with id '{body.get('assistant_id')}'")
+            return 200, _public(state.create_run(thread_id, body))
+
+        run = state.runs.get(parts[3]) if len(parts) > 3 and parts[2] == "runs" else None
+        if run is None or run["thread_id"] != thread_id:
+            return _error(404, f"Unknown path {path}")
+        if route == ("GET", 4, "threads", "runs"):
+            return 200, _public(state.advance_run(run))
+        if method == "POST" and parts[4:] == ["cancel"]:
+            return 200, _public(state.cancel_run(run))
+        if method == "GET" and parts[4:] == ["steps"]:
+            return 200, _page(state.steps[run["id"]], query)
+        return _error(404, f"Unknown path {path}")
+
+
+class FakeFabricServer:
+    """
+    The fake server on a background thread; use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, config: Optional[FakeServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            config (FakeServerConfig, optional): Timings, error rates and payload size
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 for any free port
+        """
+        self.config = config or FakeServerConfig()
+        self._httpd = ThreadingHTTPServer((host, port), _FakeFabricHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = _FakeFabricState(self.config)
+        self._thread = None
+
+    @property
+    def state(self) -> _FakeFabricState:
+        return self._httpd.state
+
+    @property
+    def data_agent_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{DATA_AGENT_PATH}"
+
+    def start(self) -> "FakeFabricServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-fabric-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class FakeCredential:
+    """
+    Credential that hands out a dummy token, for use with TokenBroker against the fake server.
+    """
+
+    def get_token(self, *scopes, **kwargs) -> AccessToken:
+        return AccessToken("fake-token", int(time.time()) + 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for a Fabric Data Agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--queue-time", type=float, default=0.05, help="seconds a run stays queued")
+    parser.add_argument("--run-time", type=float, default=0.5, help="seconds a run stays in_progress")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds of throttled requests")
+    parser.add_argument("--capacity-rps", type=float, help="requests per second served before answering HTTP 429")
+    parser.add_argument("--run-failure-rate", type=float, default=0.0, help="share of runs that fail")
+    parser.add_argument("--rows", type=int, default=100, help="rows per tool output")
+    parser.add_argument("--steps", type=int, default=2, help="tool call steps per run")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(queue_time=args.queue_time, run_time=args.run_time, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                              capacity_rps=args.capacity_rps,
+                              run_failure_rate=args.run_failure_rate, rows=args.rows, steps=args.steps)
+    server = FakeFabricServer(config, host=args.host, port=args.port)
+    print(f"Fake Fabric Data Agent listening, DATA_AGENT_URL={server.data_agent_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ from agent_framework import (
     ai_function,
 )
 from typing import Annotated
-from fabric_data_agent_client import FabricDataAgentClient
+from fabric_data_agent_client import RunTimeoutError, get_shared_client
 from agent_framework.azure import AzureAIAgentClient
 from agent_framework import (
     WorkflowBuilder,
@@ -36,37 +36,51 @@ os.environ.setdefault("AZURE_AI_MODEL_DEPLOYMENT_NAME", "gpt-4.1")
 
 
 @ai_function
-def get_cities_by_sales(query: Annotated[str, "query to ask Fabric Data Agent"]) -> Annotated[str, "Returns the cities by sales."]:
+async def get_cities_by_sales(query: Annotated[str, "query to ask Fabric Data Agent"]) -> Annotated[str, "Returns the cities by sales."]:
 	"""Simple tool function used by the agent.
 	
 	test
 	"""
 	
-	client = FabricDataAgentClient(
+	# Shared, already signed-in client instead of re-authenticating on every tool call;
+	# the first call signs in, so keep it off the event loop
+	client = await asyncio.to_thread(
+		get_shared_client,
 		tenant_id="", #your tenantid
-		data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai"
+		data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai",
+		async_client=True
 	)
 
-	# Ask a simple question
-	response = client.ask(query)
+	# Ask a simple question; a run cancelled at its deadline raises instead of answering
+	try:
+		response = await client.ask(query)
+	except RunTimeoutError as e:
+		return f"The Fabric Data Agent did not answer in time: {e}."
 	
 	return f"{response}."
 
 
 @ai_function
-def get_customer_by_sales(query: Annotated[str, "query to ask Fabric Data Agent"]) -> Annotated[str, "Returns the customers by sales."]:
+async def get_customer_by_sales(query: Annotated[str, "query to ask Fabric Data Agent"]) -> Annotated[str, "Returns the customers by sales."]:
 	"""Simple tool function used by the agent.
 	
 	test
 	"""
 	
-	client = FabricDataAgentClient(
+	# Shared, already signed-in client instead of re-authenticating on every tool call;
+	# the first call signs in, so keep it off the event loop
+	client = await asyncio.to_thread(
+		get_shared_client,
 		tenant_id="", #your tenantid
-		data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai"
+		data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai",
+		async_client=True
 	)
 
-	# Ask a simple question
-	response = client.ask(query)
+	# Ask a simple question; a run cancelled at its deadline raises instead of answering
+	try:
+		response = await client.ask(query)
+	except RunTimeoutError as e:
+		return f"The Fabric Data Agent did not answer in time: {e}."
 
 	return f"{response}."
 
@@ -1,19 +1,51 @@
-from fastapi import FastAPI, Query
+import asyncio
 
-from fabric_data_agent_client import FabricDataAgentClient
-from fabric_data_agent_client import FabricDataAgentClient
+import math
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse
+
+from fabric_data_agent_client import (
+    CircuitOpenError, FabricAgentError, FabricThrottledError, RunTimeoutError, aclose_shared_clients, configure_logging,
+    get_shared_client
+)
+
+# Only warnings and errors, written from a background thread so requests never wait on console I/O
+configure_logging(quiet=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Thread deletes still queued on this event loop are lost once it ends; close the shared client first
+    await aclose_shared_clients()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(FabricAgentError)
+async def fabric_error(request: Request, error: FabricAgentError):
+    # Pass throttling and timeouts on to our own callers instead of turning them into a generic 500
+    if isinstance(error, RunTimeoutError):
+        status_code = 504
+    elif isinstance(error, (FabricThrottledError, CircuitOpenError)):
+        status_code = 503
+    else:
+        status_code = 502
+    headers = {"Retry-After": str(math.ceil(error.retry_after))} if error.retry_after else None
+    return JSONResponse({"error": str(error)}, status_code=status_code, headers=headers)
 
 @app.get("/fabric")
-def fabric(text: str = Query(..., min_length=1, description="query to ask Fabric Data Agent")):
-    client = FabricDataAgentClient(
+async def fabric(text: str = Query(..., min_length=1, description="query to ask Fabric Data Agent")):
+    # Reuse one signed-in client across requests; the first call may sign in, so keep it off the event loop
+    client = await asyncio.to_thread(
+        get_shared_client,
         tenant_id="",
-        data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai"
+        data_agent_url="https://api.fabric.microsoft.com/v1/workspaces/{workspaceid}/dataagents/{dataagentid}/aiassistant/openai",
+        async_client=True
     )
 
     # Ask a simple question
-    response = client.ask(text)
+    response = await client.ask(text)
     return {"response": response}
 
 @app.get("/")
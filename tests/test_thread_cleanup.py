@@ -0,0 +1,123 @@
+"""
+Thread cleanup against the local fake Fabric server (fake_fabric_server.py).
+
+Run from the repository root:
+    python -m pytest -q
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from fabric_data_agent_client import AsyncFabricDataAgentClient, FabricDataAgentClient, ThreadCleanupQueue, TokenBroker
+from fake_fabric_server import FakeCredential, FakeFabricServer, FakeServerConfig
+
+
+@pytest.fixture
+def server():
+    with FakeFabricServer(FakeServerConfig(queue_time=0.01, run_time=0.02, rows=5, steps=1)) as server:
+        yield server
+
+
+def make_client(server, client_class=FabricDataAgentClient, **options):
+    return client_class(tenant_id="local", data_agent_url=server.data_agent_url,
+                        token_broker=TokenBroker(FakeCredential(), background_refresh=False), **options)
+
+
+def test_conversation_close_deletes_thread(server):
+    client = make_client(server)
+    conversation = client.conversation()
+    conversation.ask("Top customers?")
+    thread_id = conversation.thread["id"]
+    assert thread_id in server.state.threads
+
+    conversation.close()
+    client.close()
+
+    assert thread_id not in server.state.threads
+    assert client.thread_cleanup.stats()["failed"] == 0
+
+
+def test_idle_conversation_deletes_expired_thread(server):
+    client = make_client(server)
+    conversation = client.conversation(idle_timeout=0.05)
+    conversation.ask("Top customers?")
+    expired_thread_id = conversation.thread["id"]
+
+    time.sleep(0.1)
+    conversation.ask("And the top cities?")
+    assert conversation.thread["id"] != expired_thread_id
+    client.thread_cleanup.flush(timeout=5)
+    assert expired_thread_id not in server.state.threads
+
+    conversation.close()
+    client.close()
+    assert not server.state.threads
+
+
+def test_async_conversation_close_deletes_thread(server):
+    async def scenario():
+        client = make_client(server, AsyncFabricDataAgentClient)
+        async with client.conversation() as conversation:
+            await conversation.ask("Top customers?")
+            thread_id = conversation.thread["id"]
+            assert thread_id in server.state.threads
+        await client.aclose()
+        return client, thread_id
+
+    client, thread_id = asyncio.run(scenario())
+    assert thread_id not in server.state.threads
+    assert client.thread_cleanup.stats()["failed"] == 0
+
+
+def test_async_idle_conversation_deletes_expired_thread(server):
+    async def scenario():
+        client = make_client(server, AsyncFabricDataAgentClient)
+        conversation = client.conversation(idle_timeout=0.05)
+        await conversation.ask("Top customers?")
+        expired_thread_id = conversation.thread["id"]
+
+        await asyncio.sleep(0.1)
+        await conversation.ask("And the top cities?")
+        assert conversation.thread["id"] != expired_thread_id
+        await client.thread_cleanup.aflush(timeout=5)
+        assert expired_thread_id not in server.state.threads
+
+        await conversation.aclose()
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert not server.state.threads
+
+
+def test_sweep_deletes_orphaned_threads(server, tmp_path):
+    cleanup = ThreadCleanupQueue(journal_path=str(tmp_path / "threads.sqlite"))
+    orphan = server.state.lookup_thread("external-client-thread-orphan")
+    cleanup.track(orphan["id"], "external-client-thread-orphan")
+
+    client = make_client(server, thread_cleanup=cleanup)
+    assert client.sweep_orphaned_threads(min_age=0) == 1
+    cleanup.flush(timeout=5)
+    client.close()
+    cleanup.close()
+
+    assert orphan["id"] not in server.state.threads
+    assert cleanup.stats()["deleted"] == 1
+
+
+def test_cleanup_queue_is_reusable_across_event_loops(server):
+    # One delete at a time, so deletes wait on the semaphore
+    cleanup = ThreadCleanupQueue(max_workers=1)
+
+    async def scenario():
+        client = make_client(server, AsyncFabricDataAgentClient, thread_cleanup=cleanup)
+        await asyncio.gather(*[client.ask(f"Top {count} customers?") for count in (3, 5, 10)])
+        await client.aclose()
+
+    asyncio.run(scenario())
+    asyncio.run(scenario())
+    cleanup.close()
+
+    assert cleanup.stats() == {"deleted": 6, "failed": 0, "retries": 0, "pending": 0}
+    assert not server.state.threads